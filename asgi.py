@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+"""
+Point d'entrée ASGI (mode async, voir src/async_api.py)
+    uvicorn asgi:app --host 0.0.0.0 --port $PORT --workers 4
+Le mode sync reste : gunicorn app:app
+"""
+import sys
+import os
+
+# Ajouter le répertoire src au Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from async_api import app
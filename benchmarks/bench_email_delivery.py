@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark de l'envoi des emails de réservation contre le faux serveur Resend.
+
+Compare, pour N réservations (2 emails chacune) :
+- l'ancienne méthode : deux `requests.request` indépendants (nouvelle
+  connexion à chaque fois), comme le fait `resend.Emails.send` ;
+- le client `email_provider.ResendClient` : session persistante et un seul
+  appel `/emails/batch` par réservation.
+
+Usage : python benchmarks/bench_email_delivery.py [--bookings 200] [--latency 0.005]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from email_provider import ResendClient  # noqa: E402
+from fake_resend import start_fake_resend  # noqa: E402
+
+
+def _booking_messages(i):
+    base = {'from': 'noreply@etudiantesolidaire.com', 'html': '<p>bench</p>'}
+    return [
+        dict(base, to=[f'student{i}@example.com'], subject=f'Confirmation {i}'),
+        dict(base, to=['admin@example.com'], subject=f'NOUVEAU RDV {i}'),
+    ]
+
+
+def run_legacy(url, bookings):
+    headers = {'Authorization': 'Bearer test', 'Accept': 'application/json'}
+    for i in range(bookings):
+        for message in _booking_messages(i):
+            requests.request('post', f'{url}/emails', json=message, headers=headers)
+
+
+def run_client(url, bookings):
+    client = ResendClient('test', api_url=url)
+    for i in range(bookings):
+        client.send_batch(_booking_messages(i))
+
+
+def measure(fn, url, server, bookings):
+    before = server.state.snapshot()
+    start = time.perf_counter()
+    fn(url, bookings)
+    elapsed = time.perf_counter() - start
+    after = server.state.snapshot()
+    return {
+        'seconds': round(elapsed, 3),
+        'emails_per_second': round(bookings * 2 / elapsed, 1),
+        'http_requests': after['requests'] - before['requests'],
+        'requests_per_booking': round((after['requests'] - before['requests']) / bookings, 2),
+        'tcp_connections': after['connections'] - before['connections'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--bookings', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.0, help='latence serveur simulée (s)')
+    args = parser.parse_args()
+
+    server, url = start_fake_resend(latency=args.latency)
+    try:
+        results = {
+            'bookings': args.bookings,
+            'latency_s': args.latency,
+            'legacy_per_email_requests': measure(run_legacy, url, server, args.bookings),
+            'pooled_batch_client': measure(run_client, url, server, args.bookings),
+        }
+    finally:
+        server.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark du rendu des emails de réservation.
+
+Compare l'ancienne méthode (jinja2.Template(source) reconstruit à chaque
+envoi) au registre partagé `email_templates` (compilé une fois), ainsi que
+`render_many` pour un lot de contextes.
+
+Usage : python benchmarks/bench_email_templates.py [--iterations 2000]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from jinja2 import Template  # noqa: E402
+import email_templates  # noqa: E402
+
+CONTEXT = {
+    'prenom': 'Awa',
+    'nom': 'Diallo',
+    'email': 'awa.diallo@example.com',
+    'telephone': '+33 6 12 34 56 78',
+    'pays': 'Sénégal',
+    'type_rdv': 'orientation',
+    'date_rdv': '12/03/2025',
+    'heure_rdv': '10:30',
+    'consultation_type': 'visio',
+    'sujet': 'Inscription en master',
+    'message': "Bonjour, j'aimerais des conseils pour mon dossier.",
+}
+
+
+def _read_source(name):
+    path = os.path.join(email_templates.TEMPLATES_DIR, email_templates.EMAIL_TEMPLATES[name])
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def bench(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    user_source = _read_source('rdv_user')
+    admin_source = _read_source('rdv_admin')
+
+    def before():
+        # Ancien comportement : parse + compile des deux templates à chaque réservation
+        Template(user_source).render(**CONTEXT)
+        Template(admin_source).render(**CONTEXT)
+
+    def after():
+        email_templates.render('rdv_user', **CONTEXT)
+        email_templates.render('rdv_admin', **CONTEXT)
+
+    batch = [CONTEXT] * 100
+
+    def after_batch():
+        email_templates.render_many('rdv_user', batch)
+        email_templates.render_many('rdv_admin', batch)
+
+    # Premier appel hors mesure : création de l'Environment et chargement des templates
+    start = time.perf_counter()
+    email_templates.get_environment()
+    warmup_ms = (time.perf_counter() - start) * 1000
+
+    before_us = bench(before, args.iterations)
+    after_us = bench(after, args.iterations)
+    batch_us = bench(after_batch, max(args.iterations // 100, 1)) / len(batch)
+
+    print(json.dumps({
+        'iterations': args.iterations,
+        'environment_warmup_ms': round(warmup_ms, 2),
+        'per_booking_us': {
+            'inline_template': round(before_us, 1),
+            'registry_render': round(after_us, 1),
+            'registry_render_many': round(batch_us, 1),
+        },
+        'speedup': round(before_us / after_us, 1) if after_us else None,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark du hachage des mots de passe : inline vs pool de process.
+
+Simule un worker gunicorn à threads pendant un pic de logins :
+`--threads` threads vérifient des mots de passe en boucle pendant
+`--seconds` secondes, et un thread "sonde" mesure en parallèle la latence
+d'une petite tâche Python (l'équivalent d'un endpoint léger comme
+/api/check-auth). Les deux modes sont lancés dans des process séparés
+pour que PASSWORD_HASH_WORKERS soit lu à l'import.
+
+Usage : python benchmarks/bench_password_hashing.py [--threads 8] [--seconds 5] [--pool-size 2]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+
+
+def _percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * pct / 100), len(values) - 1)]
+
+
+def run_mode(threads, seconds):
+    sys.path.insert(0, SRC)
+    import password_hashing
+
+    stored = password_hashing.hash_password('Motdepasse1!')
+    stop = threading.Event()
+    logins = []
+    probe_latencies = []
+
+    def login_loop():
+        count = 0
+        while not stop.is_set():
+            password_hashing.verify_password(stored, 'Motdepasse1!')
+            count += 1
+        logins.append(count)
+
+    def probe_loop():
+        payload = {'id': 1, 'username': 'etudiant', 'email': 'etudiant@example.com'}
+        while not stop.is_set():
+            start = time.perf_counter()
+            for _ in range(200):
+                json.dumps(payload)
+            probe_latencies.append((time.perf_counter() - start) * 1000)
+            time.sleep(0.005)
+
+    workers = [threading.Thread(target=login_loop) for _ in range(threads)]
+    probe = threading.Thread(target=probe_loop)
+    for t in workers + [probe]:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in workers + [probe]:
+        t.join()
+    password_hashing.shutdown()
+
+    total = sum(logins)
+    # Cœurs que le hachage peut occuper : tous les threads en inline, la taille du pool sinon
+    cores = min(password_hashing.POOL_SIZE or threads, os.cpu_count() or 1)
+    return {
+        'cores_for_hashing': cores,
+        'pool_size': password_hashing.POOL_SIZE,
+        'method': password_hashing.HASH_METHOD,
+        'logins_per_second': round(total / seconds, 1),
+        'logins_per_second_per_core': round(total / seconds / cores, 1),
+        'probe_ms_p50': round(statistics.median(probe_latencies), 3) if probe_latencies else None,
+        'probe_ms_p99': round(_percentile(probe_latencies, 99), 3) if probe_latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--pool-size', type=int, default=2)
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_mode(args.threads, args.seconds)))
+        return
+
+    results = {}
+    for label, pool_size in (('inline', 0), ('process_pool', args.pool_size)):
+        env = dict(os.environ, PASSWORD_HASH_WORKERS=str(pool_size))
+        output = subprocess.run(
+            [sys.executable, __file__, '--child', '--threads', str(args.threads), '--seconds', str(args.seconds)],
+            env=env, capture_output=True, text=True, check=True,
+        ).stdout
+        results[label] = json.loads(output.strip().splitlines()[-1])
+
+    print(json.dumps({'threads': args.threads, 'seconds': args.seconds, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
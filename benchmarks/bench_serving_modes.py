@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Benchmark : mode sync (gunicorn app:app) vs mode async (uvicorn asgi:app).
+
+Pour chaque mode, démarre le serveur avec le même nombre de workers puis
+envoie des requêtes concurrentes pendant --duration secondes sur :
+- GET  /api/rdv/disponibilites/<date>
+- POST /api/rdv/reserver (un créneau différent à chaque requête)
+
+Le cache des disponibilités est désactivé par défaut pour que chaque GET
+aille en base (--availability-cache pour le réactiver). Le rate limiting
+est désactivé, les emails restent dans l'outbox (EMAIL_WORKER_MODE=external).
+
+SQLite local répond en quelques microsecondes : l'écart entre les modes
+n'apparaît vraiment qu'avec une base distante (latence réseau) :
+    DATABASE_URL=postgresql://... python benchmarks/bench_serving_modes.py
+
+Usage :
+    python benchmarks/bench_serving_modes.py [--workers 2] [--concurrency 64] [--duration 10]
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+MODES = {
+    'sync': lambda port, workers: [
+        sys.executable, '-m', 'gunicorn', 'app:app', '--workers', str(workers),
+        '--bind', f'127.0.0.1:{port}', '--log-level', 'warning',
+    ],
+    'async': lambda port, workers: [
+        sys.executable, '-m', 'uvicorn', 'asgi:app', '--workers', str(workers),
+        '--host', '127.0.0.1', '--port', str(port), '--log-level', 'warning', '--no-access-log',
+    ],
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/health')
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Le serveur ne répond pas sur le port {port}")
+
+
+def percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(int(len(values) * p / 100), len(values) - 1)]
+
+
+def run_load(port, concurrency, duration, make_request):
+    """Retourne {requests, rps, statuses, p50_ms, p95_ms, p99_ms}"""
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    counter = iter(range(10 ** 9))
+    stop_at = time.perf_counter() + duration
+
+    def worker():
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        local_latencies = []
+        local_statuses = {}
+        while time.perf_counter() < stop_at:
+            with lock:
+                n = next(counter)
+            method, path, body = make_request(n)
+            headers = {'Content-Type': 'application/json'} if body is not None else {}
+            start = time.perf_counter()
+            try:
+                connection.request(method, path, body=body, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+                status = 'error'
+            local_latencies.append(time.perf_counter() - start)
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+        with lock:
+            latencies.extend(local_latencies)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 1),
+        'statuses': {str(k): v for k, v in sorted(statuses.items(), key=str)},
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def disponibilites_request(n):
+    day = date(2099, 1, 1) + timedelta(days=n % 365)
+    return 'GET', f'/api/rdv/disponibilites/{day.isoformat()}', None
+
+
+def make_reserver_request(mode_offset):
+    def reserver_request(n):
+        # Un créneau unique par requête : chaque réservation est un vrai INSERT (201)
+        slot = mode_offset + n
+        day = date(2100, 1, 1) + timedelta(days=slot // 1440)
+        heure = f'{(slot % 1440) // 60:02d}:{slot % 60:02d}'
+        body = json.dumps({
+            'prenom': 'Bench', 'nom': f'Serving{n}', 'email': f'bench{n}@example.com',
+            'pays': 'FR', 'type_rdv': 'orientation', 'consultation_type': 'visio',
+            'date_rdv': day.isoformat(), 'heure_rdv': heure,
+        })
+        return 'POST', '/api/rdv/reserver', body
+    return reserver_request
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=64)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--modes', default='sync,async')
+    parser.add_argument('--availability-cache', action='store_true')
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    env = dict(os.environ)
+    if not env.get('DATABASE_URL'):
+        env['DATABASE_URL'] = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+    env.update({
+        'EMAIL_WORKER_MODE': 'external',
+        'RATE_LIMIT_ENABLED': '0',
+        'AVAILABILITY_CACHE_FILE': os.path.join(directory, 'availability.bin'),
+        'AVAILABILITY_CACHE_TTL_SECONDS': '300' if args.availability_cache else '0',
+        'REVISIONS_DIR': directory,
+        'USER_CACHE_FILE': os.path.join(directory, 'users.bin'),
+        'RATE_LIMIT_SQLITE_PATH': os.path.join(directory, 'ratelimit.db'),
+        'DB_AUTO_MIGRATE': '0',
+    })
+    env.pop('RESEND_API_KEY', None)
+
+    # Migrations une seule fois, avant le démarrage des workers
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'db', 'upgrade'],
+                   cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+
+    results = {}
+    for index, mode in enumerate(args.modes.split(',')):
+        port = free_port()
+        server = subprocess.Popen(MODES[mode](port, args.workers), cwd=ROOT, env=env,
+                                  stdout=subprocess.DEVNULL)
+        try:
+            wait_ready(port)
+            results[mode] = {
+                'get_disponibilites': run_load(port, args.concurrency, args.duration, disponibilites_request),
+                'reserver_rdv': run_load(port, args.concurrency, args.duration,
+                                         make_reserver_request(index * 10 ** 7)),
+            }
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    print(json.dumps({
+        'database': env['DATABASE_URL'].split('@')[-1],
+        'workers': args.workers,
+        'concurrency': args.concurrency,
+        'duration_seconds': args.duration,
+        'availability_cache': args.availability_cache,
+        'results': results,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
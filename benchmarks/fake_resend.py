@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Faux serveur Resend local.
+
+Implémente POST /emails et POST /emails/batch, compte les requêtes reçues et
+les messages, et peut simuler une latence réseau ou des erreurs. Utilisé par
+les benchmarks ; peut aussi tourner seul pour développer sans vraie clé :
+
+    python benchmarks/fake_resend.py --port 8025
+    RESEND_API_KEY=test RESEND_API_URL=http://127.0.0.1:8025 python app.py
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeResendState:
+    def __init__(self, latency=0.0, failure_rate=0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.messages = 0
+        self.connections = set()
+        self._next_id = 0
+
+    def next_id(self):
+        with self.lock:
+            self._next_id += 1
+            return f'fake-{self._next_id}'
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'requests': self.requests,
+                'messages': self.messages,
+                'connections': len(self.connections),
+            }
+
+
+class FakeResendHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Sinon en keep-alive, en-têtes et corps partent en deux segments et le
+    # delayed ACK du client ajoute ~40ms par requête
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        state = self.server.state
+        length = int(self.headers.get('Content-Length', 0))
+        payload = json.loads(self.rfile.read(length) or b'null')
+
+        with state.lock:
+            state.requests += 1
+            state.connections.add(self.client_address)
+
+        if state.latency:
+            time.sleep(state.latency)
+        if state.failure_rate and random.random() < state.failure_rate:
+            return self._reply(500, {'statusCode': 500, 'name': 'internal_server_error', 'message': 'fake failure'})
+
+        if self.path == '/emails':
+            with state.lock:
+                state.messages += 1
+            return self._reply(200, {'id': state.next_id()})
+        if self.path == '/emails/batch':
+            if not isinstance(payload, list):
+                return self._reply(422, {'statusCode': 422, 'name': 'validation_error', 'message': 'expected a list'})
+            with state.lock:
+                state.messages += len(payload)
+            return self._reply(200, {'data': [{'id': state.next_id()} for _ in payload]})
+        return self._reply(404, {'statusCode': 404, 'name': 'not_found', 'message': self.path})
+
+
+def start_fake_resend(port=0, latency=0.0, failure_rate=0.0):
+    """Démarrer le serveur dans un thread. Retourne (server, base_url)."""
+    server = ThreadingHTTPServer(('127.0.0.1', port), FakeResendHandler)
+    server.daemon_threads = True
+    server.state = FakeResendState(latency=latency, failure_rate=failure_rate)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=8025)
+    parser.add_argument('--latency', type=float, default=0.0, help='latence simulée en secondes')
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, url = start_fake_resend(args.port, args.latency, args.failure_rate)
+    print(f'Fake Resend listening on {url}', flush=True)
+    try:
+        while True:
+            time.sleep(5)
+            print(json.dumps(server.state.snapshot()), flush=True)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
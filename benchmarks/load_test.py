@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Test de charge reproductible des routes les plus sollicitées.
+
+Démarre l'application (create_app(), via gunicorn ou le serveur werkzeug
+du process) sur une base SQLite jetable ou sur DATABASE_URL (Postgres
+local), avec un faux Resend (benchmarks/fake_resend.py) : les emails
+passent par l'outbox et le vrai client HTTP, sans rien envoyer.
+
+Des utilisateurs virtuels (--concurrency), chacun avec sa connexion et son
+cookie de session, enchaînent un mélange pondéré de :
+
+    login            POST /api/login
+    check_auth       GET  /api/check-auth
+    disponibilites   GET  /api/rdv/disponibilites/<date>
+    reserver         POST /api/rdv/reserver        (un créneau libre par requête)
+    mes_reservations GET  /api/rdv/mes-reservations?email=...
+
+Le rate limiting est désactivé. Le résultat (débit, p50/p95/p99 par route
+et global) est écrit en JSON sur stdout ou dans --output, pour comparer
+deux versions du code :
+
+    python benchmarks/load_test.py --duration 20 --output before.json
+    DATABASE_URL=postgresql://... python benchmarks/load_test.py --server gunicorn --workers 4
+
+Le tirage des routes et des dates est déterministe (--seed) ; le nombre de
+requêtes dépend évidemment de la vitesse du serveur.
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from http.cookies import SimpleCookie
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from bench_serving_modes import free_port, percentile, wait_ready  # noqa: E402
+from fake_resend import start_fake_resend  # noqa: E402
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+DEFAULT_MIX = 'login=5,check_auth=30,disponibilites=35,reserver=10,mes_reservations=20'
+PASSWORD = 'LoadTest1!'
+# Dates consultées : quelques jours chargés, comme en production
+HOT_DAYS = 60
+
+
+def parse_mix(value):
+    mix = {}
+    for part in value.split(','):
+        name, weight = part.split('=')
+        if name not in SCENARIOS:
+            raise SystemExit(f"Scénario inconnu: {name} (connus: {', '.join(SCENARIOS)})")
+        mix[name] = float(weight)
+    return mix
+
+
+# ============ UTILISATEUR VIRTUEL ============
+
+class VirtualUser:
+    """Une connexion keep-alive et un cookie de session"""
+
+    def __init__(self, port, index, rng):
+        self.port = port
+        self.index = index
+        self.rng = rng
+        self.username = f'load{index}'
+        self.email = f'load{index}@example.com'
+        self.cookies = SimpleCookie()
+        self.csrf_token = None
+        self.connection = None
+
+    def request(self, method, path, payload=None, headers=None):
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=30)
+        headers = dict(headers or {})
+        body = None
+        if payload is not None:
+            body = json.dumps(payload)
+            headers['Content-Type'] = 'application/json'
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{k}={m.value}' for k, m in self.cookies.items())
+        try:
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            data = response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = None
+            return 'error', None
+        for cookie in response.headers.get_all('Set-Cookie') or []:
+            self.cookies.load(cookie)
+        return response.status, data
+
+    def fetch_csrf(self):
+        status, data = self.request('GET', '/api/csrf-token')
+        if status == 200:
+            self.csrf_token = json.loads(data)['csrf_token']
+
+    # ============ SCÉNARIOS ============
+
+    def login(self, state):
+        if self.csrf_token is None:
+            self.fetch_csrf()
+        return self.request('POST', '/api/login', {'username': self.username, 'password': PASSWORD},
+                            headers={'X-CSRF-Token': self.csrf_token or ''})[0]
+
+    def check_auth(self, state):
+        return self.request('GET', '/api/check-auth')[0]
+
+    def disponibilites(self, state):
+        # Loi de Zipf grossière : les premiers jours reçoivent l'essentiel des requêtes
+        day = date(2099, 1, 1) + timedelta(days=min(int(self.rng.paretovariate(1.2)) - 1, HOT_DAYS - 1))
+        return self.request('GET', f'/api/rdv/disponibilites/{day.isoformat()}')[0]
+
+    def reserver(self, state):
+        slot = state.next_slot()
+        day = date(2100, 1, 1) + timedelta(days=slot // 1440)
+        return self.request('POST', '/api/rdv/reserver', {
+            'prenom': 'Load', 'nom': f'User{self.index}', 'email': self.email,
+            'pays': 'FR', 'type_rdv': 'orientation', 'consultation_type': 'visio',
+            'date_rdv': day.isoformat(), 'heure_rdv': f'{(slot % 1440) // 60:02d}:{slot % 60:02d}',
+        })[0]
+
+    def mes_reservations(self, state):
+        return self.request('GET', f'/api/rdv/mes-reservations?email={self.email}&scope=all&limit=20')[0]
+
+
+SCENARIOS = ['login', 'check_auth', 'disponibilites', 'reserver', 'mes_reservations']
+
+
+class LoadState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._slot = 0
+        self.latencies = {}
+        self.statuses = {}
+
+    def next_slot(self):
+        with self.lock:
+            self._slot += 1
+            return self._slot
+
+    def merge(self, latencies, statuses):
+        with self.lock:
+            for name, values in latencies.items():
+                self.latencies.setdefault(name, []).extend(values)
+            for name, counts in statuses.items():
+                merged = self.statuses.setdefault(name, {})
+                for status, count in counts.items():
+                    merged[status] = merged.get(status, 0) + count
+
+
+def run_user(port, index, args, mix, state, warmup_until, stop_at):
+    rng = random.Random(args.seed * 100003 + index)
+    user = VirtualUser(port, index % args.users, rng)
+    user.login(state)
+    names, weights = list(mix), list(mix.values())
+    latencies = {}
+    statuses = {}
+    while True:
+        now = time.perf_counter()
+        if now >= stop_at:
+            break
+        name = rng.choices(names, weights)[0]
+        start = time.perf_counter()
+        status = getattr(user, name)(state)
+        elapsed = time.perf_counter() - start
+        if start >= warmup_until:
+            latencies.setdefault(name, []).append(elapsed)
+            counts = statuses.setdefault(name, {})
+            counts[str(status)] = counts.get(str(status), 0) + 1
+    state.merge(latencies, statuses)
+
+
+def summarize(latencies, statuses, elapsed):
+    return {
+        'requests': len(latencies),
+        'rps': round(len(latencies) / elapsed, 1),
+        'statuses': dict(sorted(statuses.items())),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+# ============ PRÉPARATION ============
+
+def seed_database(users, reservations_per_user):
+    """Utilisateurs (email vérifié) et historique de réservations, dans le process du harness"""
+    from main import app
+    from database.db import db
+    from models.rdv import RDV
+    from models.user import User
+
+    with app.app_context():
+        password_hash = None
+        for index in range(users):
+            username = f'load{index}'
+            if User.query.filter_by(username=username).first():
+                continue
+            user = User(username=username, email=f'{username}@example.com', email_verified=True)
+            # Un seul calcul de hash : le coût du KDF est mesuré au login, pas au seed
+            if password_hash is None:
+                user.set_password(PASSWORD)
+                password_hash = user.password_hash
+            else:
+                user.password_hash = password_hash
+            db.session.add(user)
+            for n in range(reservations_per_user):
+                db.session.add(RDV(
+                    prenom='Load', nom=username, email=user.email, pays='FR', type_rdv='orientation',
+                    consultation_type='visio', date_rdv=date(2098, 1, 1) + timedelta(days=index * 31 + n),
+                    heure_rdv='10:00', statut='confirmed',
+                ))
+        db.session.commit()
+        db.engine.dispose()
+    return app
+
+
+def start_server(args, env, port):
+    """Retourne une fonction d'arrêt"""
+    if args.server == 'gunicorn':
+        server = subprocess.Popen([
+            sys.executable, '-m', 'gunicorn', 'app:app', '--workers', str(args.workers),
+            '--threads', str(args.threads), '--bind', f'127.0.0.1:{port}', '--log-level', 'warning',
+        ], cwd=ROOT, env=env, stdout=subprocess.DEVNULL)
+
+        def stop():
+            server.terminate()
+            server.wait(timeout=30)
+        return stop
+
+    from werkzeug.serving import make_server
+    from main import app
+    server = make_server('127.0.0.1', port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.shutdown
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--warmup', type=float, default=2, help='secondes exclues des mesures')
+    parser.add_argument('--mix', default=DEFAULT_MIX)
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--reservations-per-user', type=int, default=30)
+    parser.add_argument('--server', choices=['gunicorn', 'werkzeug'], default='gunicorn')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--resend-latency', type=float, default=0.05, help='latence du faux Resend (s)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+    mix = parse_mix(args.mix)
+
+    directory = tempfile.mkdtemp()
+    resend, resend_url = start_fake_resend(latency=args.resend_latency)
+    if not os.environ.get('DATABASE_URL'):
+        os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(directory, 'load.db')}"
+    os.environ.update({
+        'RESEND_API_KEY': 'load-test',
+        'RESEND_API_URL': resend_url,
+        'EMAIL_WORKER_MODE': 'thread',
+        'RATE_LIMIT_ENABLED': '0',
+        # Migrations dans le process du harness ; les workers du serveur ne migrent pas
+        'DB_AUTO_MIGRATE': '1',
+        'AVAILABILITY_CACHE_FILE': os.path.join(directory, 'availability.bin'),
+        'USER_CACHE_FILE': os.path.join(directory, 'users.bin'),
+        'REVISIONS_DIR': directory,
+        'RATE_LIMIT_SQLITE_PATH': os.path.join(directory, 'ratelimit.db'),
+        'METRICS_DIR': os.path.join(directory, 'metrics'),
+    })
+
+    seed_database(args.users, args.reservations_per_user)
+    env = dict(os.environ, DB_AUTO_MIGRATE='0')
+
+    port = free_port()
+    stop_server = start_server(args, env, port)
+    try:
+        wait_ready(port)
+        state = LoadState()
+        start = time.perf_counter()
+        warmup_until = start + args.warmup
+        stop_at = warmup_until + args.duration
+        threads = [threading.Thread(target=run_user, args=(port, i, args, mix, state, warmup_until, stop_at))
+                   for i in range(args.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - warmup_until
+    finally:
+        stop_server()
+        resend.shutdown()
+
+    all_latencies = [value for values in state.latencies.values() for value in values]
+    all_statuses = {}
+    for counts in state.statuses.values():
+        for status, count in counts.items():
+            all_statuses[status] = all_statuses.get(status, 0) + count
+
+    report = {
+        'database': os.environ['DATABASE_URL'].split('@')[-1],
+        'server': args.server,
+        'workers': args.workers if args.server == 'gunicorn' else 1,
+        'concurrency': args.concurrency,
+        'duration_seconds': args.duration,
+        'mix': mix,
+        'seed': args.seed,
+        'overall': summarize(all_latencies, all_statuses, elapsed) if all_latencies else None,
+        'endpoints': {
+            name: summarize(state.latencies[name], state.statuses[name], elapsed)
+            for name in SCENARIOS if state.latencies.get(name)
+        },
+        'emails_delivered': resend.state.snapshot()['messages'],
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
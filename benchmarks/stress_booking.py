@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test de charge : réservations concurrentes du même créneau.
+
+Lance N threads qui réservent simultanément les mêmes créneaux via
+/api/rdv/reserver et vérifie qu'il y a exactement une réservation active
+(une réponse 201) par créneau, toutes les autres recevant 409.
+
+Usage :
+    python benchmarks/stress_booking.py [--threads 32] [--slots 5]
+    DATABASE_URL=postgresql://... python benchmarks/stress_booking.py
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--slots', type=int, default=5)
+    args = parser.parse_args()
+
+    if not os.environ.get('DATABASE_URL'):
+        db_path = os.path.join(tempfile.mkdtemp(), 'stress.db')
+        os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ.setdefault('EMAIL_WORKER_MODE', 'external')
+    os.environ['RATE_LIMIT_ENABLED'] = '0'
+    # Base jetable : migrée à la création de l'application
+    os.environ['DB_AUTO_MIGRATE'] = '1'
+    os.environ.pop('RESEND_API_KEY', None)
+
+    from main import app
+    from models.rdv import RDV, ACTIVE_STATUSES
+    from database.db import db
+
+    barrier = threading.Barrier(args.threads)
+    results = Counter()
+    results_lock = threading.Lock()
+    # Date tirée au hasard parmi ~2,5 millions de jours (2100-8944) : deux
+    # exécutions sur la même base ne réservent pas les mêmes créneaux
+    date_rdv = (date(2100, 1, 1) + timedelta(days=uuid.uuid4().int % 2_500_000)).isoformat()
+    slots = [f'{9 + i:02d}:00' for i in range(args.slots)]
+
+    def worker(index):
+        client = app.test_client()
+        barrier.wait()
+        for slot in slots:
+            response = client.post('/api/rdv/reserver', json={
+                'prenom': 'Stress', 'nom': f'Test{index}', 'email': f'stress{index}@example.com',
+                'pays': 'FR', 'type_rdv': 'orientation', 'consultation_type': 'visio',
+                'date_rdv': date_rdv, 'heure_rdv': slot,
+            })
+            with results_lock:
+                results[(slot, response.status_code)] += 1
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        active = Counter(
+            heure for (heure,) in db.session.query(RDV.heure_rdv).filter(
+                RDV.date_rdv == date.fromisoformat(date_rdv),
+                RDV.statut.in_(ACTIVE_STATUSES),
+            )
+        )
+
+    ok = all(results[(slot, 201)] == 1 and active[slot] == 1 for slot in slots)
+    print(json.dumps({
+        'threads': args.threads,
+        'slots': args.slots,
+        'seconds': round(elapsed, 3),
+        'responses': {f'{slot} {status}': count for (slot, status), count in sorted(results.items())},
+        'active_rows_per_slot': dict(active),
+        'ok': ok,
+    }, indent=2))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == '__main__':
+    main()
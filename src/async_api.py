@@ -0,0 +1,327 @@
+"""
+Mode de service async (ASGI), en plus du mode sync par défaut (gunicorn app:app).
+
+    uvicorn asgi:app --host 0.0.0.0 --port $PORT --workers 4
+
+Les routes les plus sollicitées, dominées par l'attente de la base, sont
+des handlers async natifs sur le moteur asyncio de SQLAlchemy (psycopg
+async pour Postgres, aiosqlite pour SQLite) :
+
+- GET  /api/rdv/disponibilites/<date>
+- POST /api/rdv/reserver
+
+Un worker uvicorn garde ainsi des dizaines de requêtes en vol pendant
+qu'elles attendent la base, là où un worker sync n'en traite qu'une. Toutes
+les autres routes sont servies par l'application Flask à travers asgiref
+(pool de threads) : mêmes sessions, CSRF, cookies et réponses qu'en mode sync.
+
+Les deux handlers réutilisent la logique des vues Flask (validation,
+INSERT ... ON CONFLICT DO NOTHING, outbox dans la même transaction, cache
+et ETag des disponibilités) ; seules les E/S base sont async.
+"""
+import asyncio
+import json
+import time
+from datetime import datetime
+
+import sqlalchemy as sa
+from asgiref.wsgi import WsgiToAsgi
+from sqlalchemy.ext.asyncio import create_async_engine
+from werkzeug.http import parse_etags, quote_etag
+
+from availability_cache import availability_cache, decode_slots, encode_slots
+from conditional import revision_etag
+from database.pool import engine_options
+from email_queue import notify_outbox, outbox_values, start_email_workers
+from email_utils import rdv_confirmation_emails
+from metrics import current_endpoint, instrument_engine, observe_request
+from main import ALLOWED_ORIGINS, app as flask_app
+from models.outbox import EmailOutbox
+from models.rdv import RDV, ACTIVE_STATUSES
+from rate_limit import ENABLED as RATE_LIMIT_ENABLED, forwarded_client_ip, reservation_limit
+from routes.rdv import validate_rdv_form
+
+MAX_BODY_BYTES = 64 * 1024
+
+rdv_table = RDV.__table__
+outbox_table = EmailOutbox.__table__
+
+
+def async_database_url(database_url):
+    """URL du moteur asyncio (postgresql+psycopg sert aux deux modes)"""
+    if database_url.startswith('sqlite:'):
+        return database_url.replace('sqlite:', 'sqlite+aiosqlite:', 1)
+    return database_url
+
+
+def create_engine_async(database_url):
+    options = engine_options(database_url)
+    # Les moteurs asyncio utilisent AsyncAdaptedQueuePool, pas le QueuePool instrumenté
+    options.pop('poolclass')
+    return create_async_engine(async_database_url(database_url), **options)
+
+
+# ============ HTTP ============
+
+def _header(scope, name):
+    for key, value in scope['headers']:
+        if key == name:
+            return value.decode('latin-1')
+    return None
+
+
+def _client_identifier(scope):
+    """Même identifiant que rate_limit.get_client_identifier (même règle que ProxyFix)"""
+    client = scope.get('client')
+    peer = client[0] if client and client[0] else 'unknown'
+    return forwarded_client_ip(peer, _header(scope, b'x-forwarded-for'))
+
+
+async def _read_json(receive):
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise ValueError('Corps de requête trop volumineux')
+        chunks.append(chunk)
+        if not message.get('more_body'):
+            break
+    body = b''.join(chunks)
+    return json.loads(body) if body else {}
+
+
+async def send_json(scope, send, status, payload=None, headers=None):
+    body = b'' if payload is None else json.dumps(payload).encode()
+    response_headers = {'Content-Type': 'application/json'} if payload is not None else {}
+    response_headers.update(headers or {})
+    origin = _header(scope, b'origin')
+    if origin in ALLOWED_ORIGINS:
+        response_headers.update({
+            'Access-Control-Allow-Origin': origin,
+            'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
+            'Access-Control-Allow-Headers': 'Content-Type,Authorization,X-CSRF-Token',
+            'Access-Control-Allow-Credentials': 'true',
+        })
+    response_headers['Content-Length'] = str(len(body))
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(k.lower().encode('latin-1'), v.encode('latin-1')) for k, v in response_headers.items()],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+# ============ APPLICATION ============
+
+class AsyncAPI:
+    """Application ASGI : handlers async natifs, le reste délégué à Flask"""
+
+    def __init__(self, app):
+        self.flask_app = app
+        self.wsgi = WsgiToAsgi(app)
+        self._engine = None
+
+    @property
+    def engine(self):
+        # Créé dans le process du worker (après le fork d'uvicorn)
+        if self._engine is None:
+            self._engine = create_engine_async(self.flask_app.config['SQLALCHEMY_DATABASE_URI'])
+            instrument_engine(self._engine.sync_engine)
+        return self._engine
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] == 'http':
+            handler, argument = self._match(scope['method'], scope['path'])
+            if handler is not None:
+                return await self._observed(handler, scope, receive, send, *argument)
+        return await self.wsgi(scope, receive, send)
+
+    async def _observed(self, handler, scope, receive, send, *argument):
+        """Mêmes métriques que les vues Flask (même nom d'endpoint)"""
+        endpoint = f'rdv.{handler.__name__}'
+        status = 500
+        token = current_endpoint.set(endpoint)
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            return await handler(scope, receive, send_with_status, *argument)
+        finally:
+            observe_request(endpoint, scope['method'], status, time.perf_counter() - start)
+            current_endpoint.reset(token)
+
+    def _match(self, method, path):
+        if method == 'POST' and path == '/api/rdv/reserver':
+            return self.reserver_rdv, ()
+        prefix = '/api/rdv/disponibilites/'
+        if method == 'GET' and path.startswith(prefix) and '/' not in path[len(prefix):]:
+            return self.get_disponibilites, (path[len(prefix):],)
+        return None, ()
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                start_email_workers(self.flask_app)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self._engine is not None:
+                    await self._engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    # ============ RDV ============
+
+    async def load_heures_occupees(self, date_obj):
+        async with self.engine.connect() as connection:
+            result = await connection.execute(
+                sa.select(rdv_table.c.heure_rdv).where(
+                    rdv_table.c.date_rdv == date_obj,
+                    rdv_table.c.statut.in_(ACTIVE_STATUSES)
+                )
+            )
+            return list(result.scalars())
+
+    async def get_disponibilites(self, scope, receive, send, date):
+        """Version async de routes.rdv.get_disponibilites"""
+        try:
+            try:
+                date_obj = datetime.strptime(date, '%Y-%m-%d').date()
+            except ValueError:
+                return await send_json(scope, send, 400, {'error': 'Format de date invalide (YYYY-MM-DD)'})
+
+            etag = revision_etag('disponibilites', availability_cache.versions, date_obj)
+            cache_headers = {'ETag': quote_etag(etag), 'Cache-Control': 'no-cache'}
+            if parse_etags(_header(scope, b'if-none-match')).contains_weak(etag):
+                return await send_json(scope, send, 304, headers=cache_headers)
+
+            version, cached = availability_cache.lookup(date_obj)
+            if cached is None:
+                heures = await self.load_heures_occupees(date_obj)
+                availability_cache.prime(date_obj, version, heures)
+                cached = decode_slots(*encode_slots(heures)), len(heures)
+            heures_occupees, total = cached
+
+            return await send_json(scope, send, 200, {
+                'date': date,
+                'heures_occupees': heures_occupees,
+                'total_reservations': total
+            }, headers=cache_headers)
+        except Exception as e:
+            print(f"Erreur lors de la récupération des disponibilités: {e}")
+            return await send_json(scope, send, 500, {'error': 'Erreur lors de la récupération des disponibilités'})
+
+    def _insert_rdv_statement(self, values):
+        if self.engine.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif self.engine.dialect.name == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            raise RuntimeError(f"Base de données non supportée pour la réservation atomique: {self.engine.dialect.name}")
+        return (
+            insert(rdv_table)
+            .values(**values)
+            .on_conflict_do_nothing(
+                index_elements=[rdv_table.c.date_rdv, rdv_table.c.heure_rdv],
+                index_where=rdv_table.c.statut.in_(ACTIVE_STATUSES),
+            )
+            .returning(*rdv_table.c)
+        )
+
+    def _hit_rate_limit(self, identifier):
+        # Le backend "database" a besoin du contexte de l'application Flask
+        with self.flask_app.app_context():
+            return reservation_limit.hit(identifier)
+
+    async def reserver_rdv(self, scope, receive, send):
+        """Version async de routes.rdv.reserver_rdv"""
+        if RATE_LIMIT_ENABLED:
+            is_limited, remaining_time = await asyncio.to_thread(self._hit_rate_limit, _client_identifier(scope))
+            if is_limited:
+                minutes, seconds = divmod(remaining_time, 60)
+                return await send_json(scope, send, 429, {
+                    'error': f'Trop de requêtes. Réessayez dans {minutes}m {seconds}s'
+                }, headers={'Retry-After': str(remaining_time)})
+        try:
+            try:
+                data = await _read_json(receive)
+            except ValueError:
+                data = None
+            if not isinstance(data, dict):
+                data = {}
+
+            errors = validate_rdv_form(data)
+            if errors:
+                return await send_json(scope, send, 400, {'error': 'Données invalides', 'details': errors})
+
+            try:
+                date_obj = datetime.strptime(data['date_rdv'], '%Y-%m-%d').date()
+            except ValueError:
+                return await send_json(scope, send, 400, {
+                    'error': 'Données invalides', 'details': {'date_rdv': 'Date invalide (YYYY-MM-DD)'}
+                })
+
+            now = datetime.utcnow()
+            statement = self._insert_rdv_statement(dict(
+                prenom=data['prenom'],
+                nom=data['nom'],
+                email=data['email'],
+                telephone=data.get('telephone', ''),
+                pays=data['pays'],
+                type_rdv=data['type_rdv'],
+                consultation_type=data['consultation_type'],
+                sujet=data.get('sujet', ''),
+                message=data.get('message', ''),
+                date_rdv=date_obj,
+                heure_rdv=data['heure_rdv'],
+                statut='pending',
+                user_id=data.get('user_id'),
+                created_at=now,
+                updated_at=now,
+                email_user_sent=False,
+                email_admin_sent=False,
+            ))
+
+            async with self.engine.begin() as connection:
+                row = (await connection.execute(statement)).first()
+                if row is None:
+                    rdv = None
+                else:
+                    # Instance non attachée : sert aux templates et à to_dict()
+                    rdv = RDV(**row._mapping)
+                    # Les emails partent dans la même transaction que la réservation (outbox)
+                    await connection.execute(outbox_table.insert(), [
+                        outbox_values(kind, to_address, subject, html, rdv_id=rdv.id)
+                        for kind, to_address, subject, html in rdv_confirmation_emails(rdv)
+                    ])
+
+            if rdv is None:
+                return await send_json(scope, send, 409, {
+                    'error': 'Ce créneau est déjà réservé',
+                    'details': {'slot': 'Ce créneau n\'est plus disponible. Veuillez en choisir un autre.'}
+                })
+
+            notify_outbox()
+            availability_cache.slot_booked(date_obj, data['heure_rdv'])
+
+            return await send_json(scope, send, 201, {
+                'success': True,
+                'message': 'Réservation créée avec succès',
+                'rdv': rdv.to_dict()
+            })
+        except Exception as e:
+            print(f"Erreur lors de la création de la réservation: {e}")
+            return await send_json(scope, send, 500, {'error': 'Erreur lors de la création de la réservation'})
+
+
+app = AsyncAPI(flask_app)
@@ -0,0 +1,265 @@
+"""
+Cache en mémoire des créneaux occupés par date (/rdv/disponibilites/<date>).
+
+Chaque worker gunicorn garde, pour les dates récemment consultées, un bitmap
+des minutes occupées de la journée (1 bit par minute, 1440 bits). Une lecture
+en cache ne touche pas la base.
+
+Invalidation entre workers : un petit fichier partagé (mmap) contient un
+compteur de version par "bucket" de date. Toute écriture sur une date
+(réservation, annulation...) incrémente son compteur après le commit ; un
+worker dont la version en cache ne correspond plus recharge depuis la base.
+Lire la version coûte une lecture mémoire, sans appel système.
+"""
+import mmap
+import os
+import secrets
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou inter-process, cache local seulement
+    fcntl = None
+
+BUCKETS = 4096
+_COUNTER = struct.Struct('<Q')
+_EPOCH_OFFSET = BUCKETS * _COUNTER.size
+MINUTES_PER_DAY = 24 * 60
+
+
+def _bucket(date_obj):
+    return date_obj.toordinal() % BUCKETS
+
+
+def encode_slots(heures):
+    """Transformer une liste de "HH:MM" en (bitmap, heures non standard)"""
+    bitmap = 0
+    extras = []
+    for heure in heures:
+        minute = _minute_of_day(heure)
+        if minute is None:
+            extras.append(heure)
+        else:
+            bitmap |= 1 << minute
+    return bitmap, tuple(sorted(extras))
+
+
+def decode_slots(bitmap, extras=()):
+    heures = []
+    while bitmap:
+        low = bitmap & -bitmap
+        minute = low.bit_length() - 1
+        heures.append(f'{minute // 60:02d}:{minute % 60:02d}')
+        bitmap ^= low
+    return heures + list(extras)
+
+
+def _minute_of_day(heure):
+    try:
+        hours, minutes = heure.split(':')
+        if len(hours) != 2 or len(minutes) != 2:
+            return None
+        value = int(hours) * 60 + int(minutes)
+    except (AttributeError, ValueError):
+        return None
+    return value if 0 <= value < MINUTES_PER_DAY else None
+
+
+class SharedVersions:
+    """
+    Compteurs de version partagés entre process via un fichier mmap.
+    `bucket(key)` choisit le compteur d'une clé (date par défaut).
+
+    Le fichier contient aussi une "époque" aléatoire tirée à sa création :
+    les compteurs repartent de 0 si le fichier est recréé (redéploiement),
+    l'époque évite alors de réutiliser un ETag déjà distribué.
+    """
+
+    def __init__(self, path, bucket=_bucket):
+        self.path = path
+        self.bucket = bucket
+        self._map = None
+        self._fd = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _ensure_open(self):
+        if self._map is not None and self._pid == os.getpid():
+            return self._map
+        with self._lock:
+            if self._map is None or self._pid != os.getpid():
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+                size = (BUCKETS + 1) * _COUNTER.size
+                if fcntl:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                try:
+                    if os.fstat(fd).st_size < size:
+                        os.ftruncate(fd, size)
+                    shared = mmap.mmap(fd, size)
+                    if _COUNTER.unpack_from(shared, _EPOCH_OFFSET)[0] == 0:
+                        _COUNTER.pack_into(shared, _EPOCH_OFFSET, secrets.randbits(63) | 1)
+                finally:
+                    if fcntl:
+                        fcntl.flock(fd, fcntl.LOCK_UN)
+                self._map = shared
+                self._fd = fd
+                self._pid = os.getpid()
+        return self._map
+
+    @property
+    def epoch(self):
+        return _COUNTER.unpack_from(self._ensure_open(), _EPOCH_OFFSET)[0]
+
+    def get(self, key):
+        return _COUNTER.unpack_from(self._ensure_open(), self.bucket(key) * _COUNTER.size)[0]
+
+    def bump(self, key):
+        """Incrémenter la version d'une clé. Retourne la nouvelle version."""
+        shared = self._ensure_open()
+        offset = self.bucket(key) * _COUNTER.size
+        with self._lock:
+            if fcntl:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                version = _COUNTER.unpack_from(shared, offset)[0] + 1
+                _COUNTER.pack_into(shared, offset, version)
+            finally:
+                if fcntl:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+        return version
+
+    def bump_all(self):
+        """Incrémenter toutes les versions (écritures en masse hors de l'API)"""
+        shared = self._ensure_open()
+        with self._lock:
+            if fcntl:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                for offset in range(0, BUCKETS * _COUNTER.size, _COUNTER.size):
+                    _COUNTER.pack_into(shared, offset, _COUNTER.unpack_from(shared, offset)[0] + 1)
+            finally:
+                if fcntl:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+
+class AvailabilityCache:
+    """
+    Cache LRU borné {date: (version, bitmap, extras, count, expires_at)}.
+    Le TTL est un filet de sécurité pour les écritures faites hors de l'API.
+    """
+
+    def __init__(self, versions, max_dates=512, ttl=300):
+        self.versions = versions
+        self.max_dates = max_dates
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def versions_for(self, dates):
+        """Versions partagées d'une liste de dates (sert aussi à construire un ETag)"""
+        return [self.versions.get(date_obj) for date_obj in dates]
+
+    def get(self, date_obj, loader):
+        """
+        Retourner (heures_occupees, total_reservations) pour une date.
+        `loader(date_obj)` est appelé en cas de miss et retourne la liste des heures.
+        """
+        version, cached = self.lookup(date_obj)
+        if cached is not None:
+            return cached
+
+        # La version est lue AVANT la requête : si une écriture arrive entre
+        # les deux, la version stockée sera déjà périmée au prochain accès.
+        heures = loader(date_obj)
+        self.prime(date_obj, version, heures)
+        return decode_slots(*encode_slots(heures)), len(heures)
+
+    def lookup(self, date_obj):
+        """
+        Retourner (version, (heures_occupees, total) ou None si absent/périmé).
+        En cas de miss, l'appelant charge les heures puis appelle prime(date, version, heures).
+        """
+        version = self.versions.get(date_obj)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(date_obj)
+            if entry and entry[0] == version and entry[4] > now:
+                self._entries.move_to_end(date_obj)
+                self.hits += 1
+                return version, (decode_slots(entry[1], entry[2]), entry[3])
+            self.misses += 1
+        return version, None
+
+    def prime(self, date_obj, version, heures):
+        """Stocker les heures d'une date lues en base alors que la version valait `version`"""
+        bitmap, extras = encode_slots(heures)
+        with self._lock:
+            self._entries[date_obj] = (version, bitmap, extras, len(heures), time.monotonic() + self.ttl)
+            self._entries.move_to_end(date_obj)
+            while len(self._entries) > self.max_dates:
+                self._entries.popitem(last=False)
+
+    def slot_booked(self, date_obj, heure):
+        self._apply(date_obj, heure, +1)
+
+    def slot_released(self, date_obj, heure):
+        self._apply(date_obj, heure, -1)
+
+    def invalidate(self, date_obj):
+        """Invalider une date dans tous les workers (après commit)"""
+        self.versions.bump(date_obj)
+        with self._lock:
+            self._entries.pop(date_obj, None)
+
+    def invalidate_all(self):
+        """Invalider toutes les dates dans tous les workers (import, données de test...)"""
+        self.versions.bump_all()
+        with self._lock:
+            self._entries.clear()
+
+    def _apply(self, date_obj, heure, delta):
+        """
+        Mettre à jour l'entrée locale sans recharger si personne d'autre n'a
+        écrit sur ce bucket entre-temps, sinon simplement l'invalider.
+        Toujours appelé après le commit.
+        """
+        new_version = self.versions.bump(date_obj)
+        minute = _minute_of_day(heure)
+        with self._lock:
+            entry = self._entries.get(date_obj)
+            if (not entry or entry[0] != new_version - 1 or minute is None
+                    or entry[3] != entry[1].bit_count() + len(entry[2])):
+                self._entries.pop(date_obj, None)
+                return
+            version, bitmap, extras, count, expires_at = entry
+            bit = 1 << minute
+            if delta > 0 and not bitmap & bit:
+                bitmap |= bit
+                count += 1
+            elif delta < 0 and bitmap & bit:
+                bitmap &= ~bit
+                count -= 1
+            else:
+                # Doublon ou incohérence : on laisse la base trancher
+                self._entries.pop(date_obj, None)
+                return
+            self._entries[date_obj] = (new_version, bitmap, extras, count, expires_at)
+
+
+def _default_path():
+    return os.environ.get('AVAILABILITY_CACHE_FILE') or os.path.join(
+        tempfile.gettempdir(), 'etudiantesolidaire-availability.bin'
+    )
+
+
+availability_cache = AvailabilityCache(
+    SharedVersions(_default_path()),
+    max_dates=int(os.environ.get('AVAILABILITY_CACHE_MAX_DATES', 512)),
+    ttl=float(os.environ.get('AVAILABILITY_CACHE_TTL_SECONDS', 300)),
+)
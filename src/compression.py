@@ -0,0 +1,190 @@
+"""
+Compression des réponses HTTP.
+
+- Réponses dynamiques (JSON...) : compressées à la volée en brotli ou gzip
+  selon Accept-Encoding, au-delà de COMPRESSION_MIN_SIZE octets.
+- Fichiers statiques : jamais compressés par requête. Des fichiers
+  `.br` / `.gz` sont générés une fois au déploiement :
+
+      flask --app app compress-static
+
+  puis servis tels quels (sendfile) au client qui les accepte.
+
+brotli est optionnel : sans le paquet `Brotli`, seul gzip est proposé.
+"""
+import gzip
+import mimetypes
+import os
+
+import click
+from flask import request, send_from_directory
+from werkzeug.exceptions import NotFound
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # gzip seulement
+    brotli = None
+
+MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 6))
+# Qualité brotli pour la compression à la volée (11 = max, beaucoup trop lent par requête)
+BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4))
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'text/css',
+    'text/csv',
+    'text/html',
+    'text/javascript',
+    'text/plain',
+    'image/svg+xml',
+}
+# Extension de fichier précompressé -> Content-Encoding
+SIDECARS = (('.br', 'br'), ('.gz', 'gzip'))
+# Un fichier précompressé n'est gardé que s'il gagne au moins 10 %
+SIDECAR_MAX_RATIO = 0.9
+# Formats déjà compressés : gzip/brotli n'y gagnent presque rien
+ALREADY_COMPRESSED_MIMETYPES = {'image/png', 'image/jpeg', 'image/gif', 'image/webp', 'font/woff2'}
+
+
+def _accepted_encodings():
+    accept = request.accept_encodings
+    encodings = []
+    if brotli is not None and accept['br']:
+        encodings.append('br')
+    if accept['gzip']:
+        encodings.append('gzip')
+    return encodings
+
+
+def _add_vary(response):
+    response.vary.add('Accept-Encoding')
+
+
+def compress_response(response):
+    """after_request : compresser les réponses dynamiques assez grosses"""
+    if (request.method == 'HEAD'
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or 'no-transform' in (response.headers.get('Cache-Control') or '')):
+        return response
+
+    _add_vary(response)
+    data = response.get_data()
+    if len(data) < MIN_SIZE:
+        return response
+    encodings = _accepted_encodings()
+    if not encodings:
+        return response
+
+    if encodings[0] == 'br':
+        compressed = brotli.compress(data, quality=BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encodings[0]
+
+    # Même contenu, autre représentation : l'ETag devient faible
+    # (If-None-Match utilise la comparaison faible, voir conditional.py)
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def send_precompressed(directory, filename, **kwargs):
+    """
+    send_from_directory qui sert `filename.br` / `filename.gz` s'ils existent
+    et que le client les accepte. Le type MIME reste celui du fichier d'origine.
+    """
+    path = safe_join(directory, filename)
+    if path is None:
+        raise NotFound()
+    mimetype = kwargs.pop('mimetype', None) or mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+
+    encodings = _accepted_encodings()
+    for suffix, encoding in SIDECARS:
+        if encoding in encodings and os.path.isfile(path + suffix):
+            response = send_from_directory(directory, filename + suffix, mimetype=mimetype, **kwargs)
+            response.headers['Content-Encoding'] = encoding
+            _add_vary(response)
+            return response
+
+    response = send_from_directory(directory, filename, mimetype=mimetype, **kwargs)
+    if any(os.path.isfile(path + suffix) for suffix, _ in SIDECARS):
+        _add_vary(response)
+    return response
+
+
+# ============ PRÉCOMPRESSION (déploiement) ============
+
+def _is_compressible(filename):
+    mimetype = mimetypes.guess_type(filename)[0]
+    return (mimetype is not None and mimetype not in ALREADY_COMPRESSED_MIMETYPES
+            and not filename.endswith(tuple(s for s, _ in SIDECARS)))
+
+
+def _write_sidecar(path, suffix, compress):
+    """Écrire path+suffix si absent/périmé et s'il gagne assez. Retourne la taille écrite ou None."""
+    target = path + suffix
+    source_mtime = os.path.getmtime(path)
+    if os.path.isfile(target) and os.path.getmtime(target) >= source_mtime:
+        return None
+    with open(path, 'rb') as f:
+        data = f.read()
+    compressed = compress(data)
+    if len(compressed) > len(data) * SIDECAR_MAX_RATIO:
+        if os.path.isfile(target):
+            os.remove(target)
+        return None
+    tmp = target + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(compressed)
+    os.replace(tmp, target)
+    os.utime(target, (source_mtime, source_mtime))
+    return len(compressed)
+
+
+def compress_static_folder(folder, echo=print):
+    """Générer les fichiers .gz (et .br si brotli est installé) d'un dossier statique"""
+    compressors = [('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        compressors.insert(0, ('.br', lambda data: brotli.compress(data, quality=11)))
+    written = 0
+    for root, _dirs, files in os.walk(folder):
+        for filename in files:
+            if not _is_compressible(filename):
+                continue
+            path = os.path.join(root, filename)
+            for suffix, compress in compressors:
+                size = _write_sidecar(path, suffix, compress)
+                if size is not None:
+                    written += 1
+                    echo(f"[compress] {os.path.relpath(path, folder)}{suffix} "
+                         f"{os.path.getsize(path)} -> {size} octets")
+    return written
+
+
+def init_compression(app):
+    if os.environ.get('COMPRESSION_ENABLED', '1') == '1':
+        app.after_request(compress_response)
+
+    # Fichiers statiques servis avec leurs versions précompressées
+    def static(filename):
+        return send_precompressed(app.static_folder, filename,
+                                  max_age=app.get_send_file_max_age(filename))
+
+    app.view_functions['static'] = static
+
+    @app.cli.command('compress-static')
+    def compress_static_command():
+        """Générer les fichiers .br/.gz du dossier static (une fois au déploiement)"""
+        written = compress_static_folder(app.static_folder)
+        if brotli is None:
+            click.echo("[compress] Brotli non installé : fichiers .gz uniquement")
+        click.echo(f"[compress] {written} fichier(s) précompressé(s)")
@@ -0,0 +1,90 @@
+"""
+ETag et GET conditionnels pour les lectures répétées du SPA.
+
+Les ETag sont calculés à partir de compteurs de révision partagés entre
+workers (voir availability_cache.SharedVersions), jamais à partir du corps de
+la réponse : un `If-None-Match` qui correspond reçoit un 304 sans requête SQL
+ni sérialisation JSON.
+
+Révisions par utilisateur :
+- profil / check-auth : compteur du cache utilisateur (current_user.invalidate_user)
+- progress, bookmarks : compteurs ci-dessous, incrémentés après chaque commit
+
+Les compteurs ne voient que les écritures faites par l'API. Pour les autres
+(SQL manuel, scripts, autre déploiement), l'ETag contient aussi une époque
+qui change toutes les ETAG_MAX_AGE_SECONDS : une telle écriture est servie
+au plus tard après ce délai, comme avec le TTL du cache utilisateur.
+"""
+import hashlib
+import os
+import tempfile
+import time
+
+from flask import jsonify, make_response, request
+
+from availability_cache import BUCKETS, SharedVersions
+
+
+def _user_bucket(user_id):
+    return user_id % BUCKETS
+
+
+def _revisions_path(name):
+    directory = os.environ.get('REVISIONS_DIR') or tempfile.gettempdir()
+    return os.path.join(directory, f'etudiantesolidaire-{name}-revisions.bin')
+
+
+ETAG_MAX_AGE_SECONDS = float(os.environ.get('ETAG_MAX_AGE_SECONDS', 30))
+
+progress_revisions = SharedVersions(_revisions_path('progress'), bucket=_user_bucket)
+bookmark_revisions = SharedVersions(_revisions_path('bookmarks'), bucket=_user_bucket)
+
+
+def make_etag(*parts):
+    return hashlib.sha1(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def _time_epoch():
+    return int(time.time() // ETAG_MAX_AGE_SECONDS) if ETAG_MAX_AGE_SECONDS > 0 else 0
+
+
+def revision_etag(name, versions, key, version=None):
+    """
+    ETag d'une ressource dont la révision est suivie par `versions` (SharedVersions).
+    `version` : révision déjà lue (ex: liste des versions d'une plage de dates).
+    """
+    if version is None:
+        version = versions.get(key)
+    return make_etag(name, key, versions.epoch, version, _time_epoch())
+
+
+def _cache_control(private):
+    return 'private, no-cache' if private else 'no-cache'
+
+
+def not_modified_response(etag, private=True):
+    """Réponse 304 si le client a déjà cette version (If-None-Match), sinon None"""
+    # Comparaison faible : l'ETag devient W/"..." quand la réponse est compressée
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    response = make_response('', 304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = _cache_control(private)
+    return response
+
+
+def with_etag(response, etag, private=True):
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = _cache_control(private)
+    return response
+
+
+def conditional_json(etag, build, private=True):
+    """
+    304 si le client a déjà cette version, sinon jsonify(build()) avec l'ETag.
+    `build` n'est appelé que si le corps doit vraiment être envoyé.
+    """
+    response = not_modified_response(etag, private)
+    if response is not None:
+        return response
+    return with_etag(jsonify(build()), etag, private)
@@ -0,0 +1,139 @@
+"""
+Utilisateur connecté, résolu au plus une fois par requête.
+
+- current_user_snapshot() : dict `User.to_dict()` de l'utilisateur de la
+  session, pour les lectures (check-auth, profil). Servi par un cache TTL
+  par worker : la plupart des lectures authentifiées ne touchent pas la base.
+- current_user() : instance ORM, pour les routes qui modifient l'utilisateur.
+- current_user_is_admin() : droit admin relu en base à chaque requête, un
+  retrait de droit (même fait hors de l'API) ne doit pas attendre le TTL.
+
+Les deux sont mémorisés dans `flask.g` pour la durée de la requête.
+
+Toute écriture sur un utilisateur (profil, mot de passe, login, vérification
+email, promotion admin) doit appeler invalidate_user(user_id) après le commit.
+Comme pour le cache des disponibilités, un compteur de version partagé (mmap)
+propage l'invalidation à tous les workers ; le TTL couvre les écritures
+faites hors de l'API.
+"""
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from flask import g, session
+
+from availability_cache import BUCKETS, SharedVersions
+from database.db import db
+from models.user import User
+
+_MISSING = object()
+
+
+class UserSnapshotCache:
+    """Cache LRU borné {user_id: (version, snapshot, expires_at)}"""
+
+    def __init__(self, versions, max_entries=10000, ttl=30):
+        self.versions = versions
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id, loader):
+        """
+        Snapshot d'un utilisateur, ou None s'il n'existe pas.
+        `loader(user_id)` est appelé en cas de miss et retourne un User ou None.
+        """
+        if self.ttl <= 0:
+            user = loader(user_id)
+            return user.to_dict() if user else None
+
+        version = self.versions.get(user_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] == version and entry[2] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # Version lue AVANT la requête (voir AvailabilityCache.get)
+        user = loader(user_id)
+        if user is None:
+            return None
+        snapshot = user.to_dict()
+        self.prime(user_id, version, snapshot)
+        return snapshot
+
+    def prime(self, user_id, version, snapshot):
+        with self._lock:
+            self._entries[user_id] = (version, snapshot, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id):
+        """Invalider un utilisateur dans tous les workers (après commit)"""
+        self.versions.bump(user_id)
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+def _default_path():
+    return os.environ.get('USER_CACHE_FILE') or os.path.join(
+        tempfile.gettempdir(), 'etudiantesolidaire-users.bin'
+    )
+
+
+user_cache = UserSnapshotCache(
+    SharedVersions(_default_path(), bucket=lambda user_id: user_id % BUCKETS),
+    max_entries=int(os.environ.get('USER_CACHE_MAX_ENTRIES', 10000)),
+    ttl=float(os.environ.get('USER_CACHE_TTL_SECONDS', 30)),
+)
+
+
+def _load_user(user_id):
+    user = g.get('_current_user', _MISSING)
+    if user is _MISSING:
+        user = db.session.get(User, user_id)
+        g._current_user = user
+    return user
+
+
+def current_user_id():
+    return session.get('user_id')
+
+
+def current_user_snapshot():
+    """dict de l'utilisateur connecté (None si non connecté ou supprimé)"""
+    snapshot = g.get('_current_user_snapshot', _MISSING)
+    if snapshot is _MISSING:
+        user_id = current_user_id()
+        snapshot = user_cache.get(user_id, _load_user) if user_id is not None else None
+        g._current_user_snapshot = snapshot
+    return snapshot
+
+
+def current_user():
+    """Instance User de l'utilisateur connecté, pour les écritures"""
+    user_id = current_user_id()
+    if user_id is None:
+        return None
+    return _load_user(user_id)
+
+
+def current_user_is_admin():
+    """L'utilisateur connecté est-il admin (lu en base, jamais depuis le cache) ?"""
+    user = current_user()
+    return bool(user and user.is_admin)
+
+
+def invalidate_user(user_id):
+    """À appeler après le commit de toute modification d'un utilisateur"""
+    user_cache.invalidate(user_id)
+    g.pop('_current_user_snapshot', None)
@@ -1,28 +1,47 @@
 from flask_sqlalchemy import SQLAlchemy
 import os
+from database.migrate import check_schema, db_cli, upgrade
+from database.pool import engine_options
+from database.routing import REPLICA_BIND, RoutingSession, init_routing
+import database.index_checks  # noqa: F401  (enregistre `flask db check-indexes`)
+import database.synthetic  # noqa: F401  (enregistre `flask db seed-synthetic`)
 
-db = SQLAlchemy()
-
-def init_db(app):
-    database_url = os.environ.get('DATABASE_URL')
+# RoutingSession : lectures des routes @read_replica sur DATABASE_REPLICA_URL
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
+def normalize_database_url(database_url):
     # Normaliser l'ancien schéma et forcer le driver psycopg v3 pour SQLAlchemy
-    if database_url and database_url.startswith('postgres://'):
+    if database_url.startswith('postgres://'):
         database_url = database_url.replace('postgres://', 'postgresql://', 1)
-    if database_url and database_url.startswith('postgresql://') and '+psycopg' not in database_url:
+    if database_url.startswith('postgresql://') and '+psycopg' not in database_url:
         database_url = database_url.replace('postgresql://', 'postgresql+psycopg://', 1)
 
-    # Fallback SQLite si pas de DATABASE_URL (en conteneur)
-    if not database_url:
-        database_url = 'sqlite:////tmp/app.db'
-
     # Éviter les blocages si Postgres ne répond pas
     if database_url.startswith('postgresql+psycopg://') and 'connect_timeout=' not in database_url:
         sep = '&' if '?' in database_url else '?'
         database_url = f"{database_url}{sep}connect_timeout=5"
+    return database_url
+
+def mask_database_url(database_url):
+    if database_url.startswith('postgresql+psycopg://'):
+        return 'postgresql+psycopg://***:***@' + database_url.split('@', 1)[1]
+    return database_url
+
+def init_db(app):
+    # Fallback SQLite si pas de DATABASE_URL (en conteneur)
+    database_url = normalize_database_url(os.environ.get('DATABASE_URL') or 'sqlite:////tmp/app.db')
 
     app.config['SQLALCHEMY_DATABASE_URI'] = database_url
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Pool, pre-ping et statement_timeout réglables par variables d'environnement
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(database_url)
+
+    # Réplica en lecture seule optionnel (voir database/routing.py)
+    replica_url = os.environ.get('DATABASE_REPLICA_URL')
+    if replica_url:
+        replica_url = normalize_database_url(replica_url)
+        app.config['SQLALCHEMY_BINDS'] = {REPLICA_BIND: {'url': replica_url, **engine_options(replica_url)}}
+
     # SECRET_KEY doit être défini en tant que variable d'environnement
     secret_key = os.environ.get('SECRET_KEY')
     if not secret_key:
@@ -32,33 +51,31 @@ def init_db(app):
     app.config['SECRET_KEY'] = secret_key
 
     db.init_app(app)
+    init_routing(app)
 
     # Log masqué pour confirmer la base utilisée
     try:
-        masked = database_url
-        if masked.startswith('postgresql+psycopg://'):
-            masked = 'postgresql+psycopg://***:***@' + masked.split('@', 1)[1]
-        print(f"[info] Using database: {masked}", flush=True)
+        print(f"[info] Using database: {mask_database_url(database_url)}", flush=True)
+        if replica_url:
+            print(f"[info] Using read replica: {mask_database_url(replica_url)}", flush=True)
     except Exception:
         pass
 
-    # Ne bloque pas le démarrage si la DB est indisponible
+    app.cli.add_command(db_cli)
+
+    # Aucun DDL au démarrage : le schéma est migré une fois au déploiement
+    # (`flask --app app db upgrade`). On vérifie seulement la version.
+    # DB_AUTO_MIGRATE=1 applique les migrations manquantes au démarrage
+    # (développement uniquement ; désactivé par défaut, y compris pour la base
+    # SQLite de repli, que railway.json migre aussi avant gunicorn).
+    auto_migrate = os.environ.get('DB_AUTO_MIGRATE', '0') == '1'
     try:
         with app.app_context():
-            db.create_all()
-
-            # ============ ÉTAPE 6 : Migration pour ajouter colonnes email ============
-            # Ajouter les colonnes email_verified si elles n'existent pas
-            try:
-                from sqlalchemy import text
-                db.session.execute(text('ALTER TABLE users ADD COLUMN IF NOT EXISTS email_verified BOOLEAN DEFAULT FALSE'))
-                db.session.execute(text('ALTER TABLE users ADD COLUMN IF NOT EXISTS email_verification_token VARCHAR(255) UNIQUE'))
-                db.session.execute(text('ALTER TABLE users ADD COLUMN IF NOT EXISTS email_token_expires_at TIMESTAMP'))
-                db.session.commit()
-                print("[info] Email verification columns ensured in database", flush=True)
-            except Exception as e:
-                db.session.rollback()
-                print(f"[warn] Could not ensure email columns: {e}", flush=True)
-            # ============ FIN ÉTAPE 6 ============
+            current, head = check_schema(db.engine)
+            if current < head and auto_migrate:
+                upgrade(db.engine)
+            elif current < head:
+                print(f"[warn] Database schema is at version {current}, expected {head}. "
+                      f"Run `flask --app app db upgrade`.", flush=True)
     except Exception as e:
-        print(f"[warn] Database initialization skipped due to error: {e}", flush=True)
+        print(f"[warn] Database schema check skipped due to error: {e}", flush=True)
@@ -0,0 +1,73 @@
+"""
+Vérification des plans d'exécution des recherches d'authentification.
+
+    flask --app app db check-indexes
+
+Lance un EXPLAIN (SQLite ou Postgres) sur chaque recherche utilisée par les
+routes d'authentification et échoue si l'une d'elles parcourt toute la table
+au lieu d'utiliser un index. Sur Postgres, les parcours séquentiels sont
+désactivés pour la vérification : sur une petite table le planificateur
+préférerait un Seq Scan même avec un index disponible.
+
+La même vérification est faite par tests/test_indexes.py (SQLite, et
+Postgres si TEST_POSTGRES_URL est défini).
+"""
+import sys
+
+import sqlalchemy as sa
+
+from database.migrate import db_cli
+
+
+def auth_lookups():
+    from models.user import User
+    return {
+        'login / forgot_password / register (email)':
+            sa.select(User.id).where(sa.func.lower(User.email) == 'etudiant@example.com'),
+        'login (username)':
+            sa.select(User.id).where(User.username == 'etudiant'),
+        'verify_email (token)':
+            sa.select(User.id).where(User.email_verification_token == 'token'),
+        'reset_password (token)':
+            sa.select(User.id).where(User.password_reset_token == 'token'),
+    }
+
+
+def explain(connection, statement):
+    """Lignes du plan d'exécution d'une requête"""
+    sql = str(statement.compile(dialect=connection.dialect, compile_kwargs={'literal_binds': True}))
+    if connection.dialect.name == 'sqlite':
+        return [row[-1] for row in connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}')]
+    return [row[0] for row in connection.exec_driver_sql(f'EXPLAIN {sql}')]
+
+
+def uses_index(dialect_name, plan):
+    text = '\n'.join(plan)
+    if dialect_name == 'sqlite':
+        return 'USING INDEX' in text or 'USING COVERING INDEX' in text
+    return 'Index' in text and 'Seq Scan' not in text
+
+
+def check_auth_indexes(engine):
+    """Retourne {nom: (utilise_un_index, plan)}"""
+    results = {}
+    with engine.connect() as connection:
+        with connection.begin():
+            if connection.dialect.name == 'postgresql':
+                connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+            for name, statement in auth_lookups().items():
+                plan = explain(connection, statement)
+                results[name] = (uses_index(connection.dialect.name, plan), plan)
+    return results
+
+
+@db_cli.command('check-indexes')
+def check_indexes_command():
+    """Vérifier que les recherches d'authentification utilisent un index"""
+    from database.db import db
+    results = check_auth_indexes(db.engine)
+    failed = False
+    for name, (ok, plan) in results.items():
+        print(f"{'OK  ' if ok else 'SCAN'} {name}: {' | '.join(line.strip() for line in plan)}")
+        failed = failed or not ok
+    sys.exit(1 if failed else 0)
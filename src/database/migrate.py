@@ -0,0 +1,210 @@
+"""
+Migrations de schéma versionnées.
+
+Chaque fichier `database/migrations/NNNN_nom.py` définit `upgrade(connection)`.
+Les versions appliquées sont enregistrées dans la table `schema_migrations`.
+Les migrations sont lancées une fois au déploiement :
+
+    flask --app app db upgrade
+    flask --app app db current
+
+Les workers gunicorn ne font plus de DDL au démarrage : init_db vérifie
+seulement que la base est à jour.
+"""
+import contextlib
+import importlib.util
+import os
+import re
+import warnings
+from datetime import datetime
+
+import click
+import sqlalchemy as sa
+from flask.cli import AppGroup
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+_MIGRATION_FILE = re.compile(r'^(\d{4})_(\w+)\.py$')
+# Clé arbitraire pour pg_advisory_lock : un seul `db upgrade` à la fois
+_ADVISORY_LOCK_KEY = 727_001
+
+_metadata = sa.MetaData()
+schema_migrations = sa.Table(
+    'schema_migrations', _metadata,
+    sa.Column('version', sa.Integer, primary_key=True),
+    sa.Column('name', sa.String(100), nullable=False),
+    sa.Column('applied_at', sa.DateTime, nullable=False),
+)
+
+
+class Migration:
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+
+    def load(self):
+        spec = importlib.util.spec_from_file_location(f'migration_{self.version:04d}_{self.name}', self.path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+
+def discover_migrations():
+    """Migrations disponibles, triées par version"""
+    migrations = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = _MIGRATION_FILE.match(filename)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+    migrations.sort(key=lambda m: m.version)
+    versions = [m.version for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Numéros de migration en double dans {MIGRATIONS_DIR}")
+    return migrations
+
+
+def head_version():
+    migrations = discover_migrations()
+    return migrations[-1].version if migrations else 0
+
+
+def current_version(connection):
+    """Version appliquée (0 si la table schema_migrations n'existe pas encore)"""
+    if not sa.inspect(connection).has_table('schema_migrations'):
+        return 0
+    return connection.execute(sa.select(sa.func.max(schema_migrations.c.version))).scalar() or 0
+
+
+@contextlib.contextmanager
+def _sqlite_file_lock(engine):
+    """
+    Équivalent SQLite du pg_advisory_lock : verrou flock sur <base>.migrate.lock,
+    pour que plusieurs process (DB_AUTO_MIGRATE=1) ne migrent pas en même temps.
+    """
+    database = engine.url.database if engine.dialect.name == 'sqlite' else None
+    if not database or database == ':memory:' or fcntl is None:
+        yield
+        return
+    fd = os.open(f'{database}.migrate.lock', os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        yield
+    finally:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+def upgrade(engine, target=None, echo=print):
+    """Appliquer les migrations manquantes, chacune dans sa propre transaction"""
+    applied = []
+    with _sqlite_file_lock(engine), engine.connect() as lock_connection:
+        if engine.dialect.name == 'postgresql':
+            lock_connection.execute(sa.text('SELECT pg_advisory_lock(:key)'), {'key': _ADVISORY_LOCK_KEY})
+            lock_connection.commit()
+        try:
+            with engine.begin() as connection:
+                _metadata.create_all(connection, checkfirst=True)
+                version = current_version(connection)
+
+            for migration in discover_migrations():
+                if migration.version <= version or (target is not None and migration.version > target):
+                    continue
+                echo(f"[migrate] {migration.version:04d}_{migration.name}")
+                module = migration.load()
+                with engine.begin() as connection:
+                    if engine.dialect.name == 'postgresql':
+                        # Pas de DB_STATEMENT_TIMEOUT_MS pour les DDL (CREATE INDEX...)
+                        connection.execute(sa.text('SET LOCAL statement_timeout = 0'))
+                    module.upgrade(connection)
+                    connection.execute(schema_migrations.insert().values(
+                        version=migration.version, name=migration.name, applied_at=datetime.utcnow()
+                    ))
+                applied.append(migration.version)
+        finally:
+            if engine.dialect.name == 'postgresql':
+                lock_connection.execute(sa.text('SELECT pg_advisory_unlock(:key)'), {'key': _ADVISORY_LOCK_KEY})
+                lock_connection.commit()
+    return applied
+
+
+def check_schema(engine):
+    """Retourne (version appliquée, dernière version disponible) sans aucun DDL"""
+    with engine.connect() as connection:
+        return current_version(connection), head_version()
+
+
+# ============ Helpers pour les fichiers de migration ============
+
+def execute_all(connection, statements):
+    for statement in statements:
+        connection.execute(sa.text(statement))
+
+
+def add_column_if_missing(connection, table, column, ddl):
+    """ALTER TABLE ADD COLUMN portable (SQLite ne connaît pas ADD COLUMN IF NOT EXISTS)"""
+    existing = {c['name'] for c in sa.inspect(connection).get_columns(table)}
+    if column not in existing:
+        connection.execute(sa.text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl}'))
+
+
+def has_unique_on(connection, table, column, exclude=None):
+    """Contrainte ou index unique sur la seule colonne `column` (hors index `exclude`)"""
+    inspector = sa.inspect(connection)
+    with warnings.catch_warnings():
+        # Index sur expression (idx_users_email_lower) non reflétés : sans importance ici
+        warnings.simplefilter('ignore', sa.exc.SAWarning)
+        constraints = inspector.get_unique_constraints(table)
+        indexes = inspector.get_indexes(table)
+    for constraint in constraints:
+        if constraint['column_names'] == [column] and constraint['name'] != exclude:
+            return True
+    for index in indexes:
+        if index['unique'] and index['column_names'] == [column] and index['name'] != exclude:
+            return True
+    return False
+
+
+def create_unique_index_if_needed(connection, name, table, column):
+    """
+    Index unique sur `column`, sauf si la colonne est déjà unique (bases créées
+    par db.create_all() avec unique=True) : un second index ne ferait que
+    doubler le coût des écritures.
+    """
+    if not has_unique_on(connection, table, column):
+        connection.execute(sa.text(f'CREATE UNIQUE INDEX IF NOT EXISTS {name} ON {table} ({column})'))
+
+
+# ============ CLI ============
+
+db_cli = AppGroup('db', help='Migrations de schéma')
+
+
+@db_cli.command('upgrade')
+@click.option('--target', type=int, default=None, help='Version maximale à appliquer')
+def upgrade_command(target):
+    """Appliquer les migrations en attente"""
+    from database.db import db
+    try:
+        applied = upgrade(db.engine, target=target)
+    except RuntimeError as e:
+        # Migration arrêtée volontairement (données à corriger à la main)
+        raise click.ClickException(str(e))
+    current, head = check_schema(db.engine)
+    if applied:
+        print(f"[migrate] {len(applied)} migration(s) appliquée(s), version {current}/{head}")
+    else:
+        print(f"[migrate] Base déjà à jour (version {current}/{head})")
+
+
+@db_cli.command('current')
+def current_command():
+    """Afficher la version du schéma"""
+    from database.db import db
+    current, head = check_schema(db.engine)
+    status = 'à jour' if current >= head else f'{head - current} migration(s) en attente'
+    print(f"Version {current} (dernière : {head}) — {status}")
@@ -0,0 +1,97 @@
+"""
+Schéma initial : tables users, user_progress, user_bookmarks,
+rdv_reservations et email_outbox telles qu'elles existaient avant
+l'introduction des migrations versionnées.
+
+Les tables déjà présentes (bases de production créées par db.create_all())
+sont laissées telles quelles ; les colonnes ajoutées ensuite sont gérées
+par les migrations suivantes.
+"""
+import sqlalchemy as sa
+
+metadata = sa.MetaData()
+
+sa.Table(
+    'users', metadata,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('username', sa.String(80), unique=True, nullable=False),
+    sa.Column('email', sa.String(120), unique=True, nullable=False),
+    sa.Column('password_hash', sa.String(255), nullable=False),
+    sa.Column('first_name', sa.String(50)),
+    sa.Column('last_name', sa.String(50)),
+    sa.Column('nationality', sa.String(50)),
+    sa.Column('study_level', sa.String(50)),
+    sa.Column('field_of_study', sa.String(100)),
+    sa.Column('created_at', sa.DateTime),
+    sa.Column('last_login', sa.DateTime),
+    sa.Column('is_active', sa.Boolean),
+    sa.Column('is_admin', sa.Boolean),
+)
+
+sa.Table(
+    'user_progress', metadata,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('user_id', sa.Integer, sa.ForeignKey('users.id'), nullable=False, index=True),
+    sa.Column('category', sa.String(100), nullable=False),
+    sa.Column('step', sa.String(100), nullable=False),
+    sa.Column('completed', sa.Boolean),
+    sa.Column('notes', sa.Text),
+    sa.Column('created_at', sa.DateTime),
+    sa.Column('completed_at', sa.DateTime),
+)
+
+sa.Table(
+    'user_bookmarks', metadata,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('user_id', sa.Integer, sa.ForeignKey('users.id'), nullable=False, index=True),
+    sa.Column('title', sa.String(255), nullable=False),
+    sa.Column('url', sa.String(500), nullable=False),
+    sa.Column('category', sa.String(100)),
+    sa.Column('created_at', sa.DateTime),
+)
+
+sa.Table(
+    'rdv_reservations', metadata,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('prenom', sa.String(50), nullable=False),
+    sa.Column('nom', sa.String(50), nullable=False),
+    sa.Column('email', sa.String(120), nullable=False),
+    sa.Column('telephone', sa.String(20)),
+    sa.Column('pays', sa.String(50), nullable=False),
+    sa.Column('type_rdv', sa.String(50), nullable=False),
+    sa.Column('consultation_type', sa.String(20), nullable=False),
+    sa.Column('sujet', sa.String(255)),
+    sa.Column('message', sa.Text),
+    sa.Column('date_rdv', sa.Date, nullable=False),
+    sa.Column('heure_rdv', sa.String(5), nullable=False),
+    sa.Column('statut', sa.String(20)),
+    sa.Column('created_at', sa.DateTime),
+    sa.Column('updated_at', sa.DateTime),
+    sa.Column('user_id', sa.Integer, sa.ForeignKey('users.id'), index=True),
+    sa.Column('notes_admin', sa.Text),
+    sa.Column('email_admin_sent', sa.Boolean),
+    sa.Column('email_user_sent', sa.Boolean),
+)
+
+sa.Table(
+    'email_outbox', metadata,
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('kind', sa.String(30), nullable=False),
+    sa.Column('sender', sa.String(120), nullable=False),
+    sa.Column('to_address', sa.String(120), nullable=False),
+    sa.Column('subject', sa.String(255), nullable=False),
+    sa.Column('html', sa.Text, nullable=False),
+    sa.Column('rdv_id', sa.Integer, sa.ForeignKey('rdv_reservations.id')),
+    sa.Column('status', sa.String(20), nullable=False),
+    sa.Column('attempts', sa.Integer, nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime, nullable=False),
+    sa.Column('locked_at', sa.DateTime),
+    sa.Column('last_error', sa.Text),
+    sa.Column('created_at', sa.DateTime),
+    sa.Column('sent_at', sa.DateTime),
+    sa.Index('idx_email_outbox_due', 'status', 'next_attempt_at'),
+)
+
+
+def upgrade(connection):
+    metadata.create_all(connection, checkfirst=True)
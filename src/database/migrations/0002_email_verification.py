@@ -0,0 +1,12 @@
+"""
+Colonnes de vérification d'email (ex migration_add_email_verification.sql,
+auparavant rejouée par init_db à chaque démarrage).
+"""
+from database.migrate import add_column_if_missing, create_unique_index_if_needed
+
+
+def upgrade(connection):
+    add_column_if_missing(connection, 'users', 'email_verified', 'BOOLEAN DEFAULT FALSE')
+    add_column_if_missing(connection, 'users', 'email_verification_token', 'VARCHAR(255)')
+    add_column_if_missing(connection, 'users', 'email_token_expires_at', 'TIMESTAMP')
+    create_unique_index_if_needed(connection, 'uq_users_email_verification_token', 'users', 'email_verification_token')
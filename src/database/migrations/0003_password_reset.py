@@ -0,0 +1,14 @@
+"""
+Colonnes de réinitialisation de mot de passe (ex migration_add_password_reset.sql).
+"""
+from database.migrate import add_column_if_missing, create_unique_index_if_needed, execute_all
+
+
+def upgrade(connection):
+    add_column_if_missing(connection, 'users', 'password_reset_token', 'VARCHAR(255)')
+    add_column_if_missing(connection, 'users', 'password_reset_expires_at', 'TIMESTAMP')
+    create_unique_index_if_needed(connection, 'uq_users_password_reset_token', 'users', 'password_reset_token')
+    execute_all(connection, [
+        'CREATE INDEX IF NOT EXISTS idx_password_reset_expires_at ON users (password_reset_expires_at) '
+        'WHERE password_reset_expires_at IS NOT NULL',
+    ])
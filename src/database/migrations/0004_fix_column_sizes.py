@@ -0,0 +1,24 @@
+"""
+Corriger les VARCHAR créés avec une mauvaise taille sur Postgres
+(ex fix_column_sizes.sql). Sans effet sur SQLite, qui ignore les tailles.
+"""
+from database.migrate import execute_all
+
+
+def upgrade(connection):
+    if connection.dialect.name != 'postgresql':
+        return
+    execute_all(connection, [
+        """
+        ALTER TABLE users
+          ALTER COLUMN username SET DATA TYPE VARCHAR(80),
+          ALTER COLUMN email SET DATA TYPE VARCHAR(120),
+          ALTER COLUMN password_hash SET DATA TYPE VARCHAR(255),
+          ALTER COLUMN first_name SET DATA TYPE VARCHAR(50),
+          ALTER COLUMN last_name SET DATA TYPE VARCHAR(50),
+          ALTER COLUMN nationality SET DATA TYPE VARCHAR(50),
+          ALTER COLUMN study_level SET DATA TYPE VARCHAR(50),
+          ALTER COLUMN field_of_study SET DATA TYPE VARCHAR(100),
+          ALTER COLUMN email_verification_token SET DATA TYPE VARCHAR(255)
+        """,
+    ])
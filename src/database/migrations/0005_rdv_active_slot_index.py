@@ -0,0 +1,46 @@
+"""
+Un seul RDV actif (pending/confirmed) par créneau : index unique partiel
+utilisé par l'INSERT ... ON CONFLICT de reserver_rdv.
+
+Des doublons actifs existants (réservations concurrentes acceptées avant
+l'index) empêcheraient sa création. Ce sont de vraies réservations de
+clients : la migration ne les modifie pas, elle s'arrête avec la liste des
+ids en conflit. Après résolution manuelle (annuler ou déplacer les
+réservations en trop, prévenir les clients), relancer `flask --app app db upgrade`.
+"""
+import sqlalchemy as sa
+
+from database.migrate import execute_all
+
+ACTIVE = "statut IN ('pending', 'confirmed')"
+
+
+def active_slot_conflicts(connection):
+    """[(date_rdv, heure_rdv, [ids])] des créneaux avec plusieurs réservations actives"""
+    rows = connection.execute(sa.text(
+        f"SELECT id, date_rdv, heure_rdv FROM rdv_reservations r WHERE {ACTIVE} AND EXISTS ("
+        "SELECT 1 FROM rdv_reservations o WHERE o.statut IN ('pending', 'confirmed') "
+        "AND o.date_rdv = r.date_rdv AND o.heure_rdv = r.heure_rdv AND o.id <> r.id) "
+        "ORDER BY date_rdv, heure_rdv, id"
+    ))
+    conflicts = {}
+    for row in rows:
+        conflicts.setdefault((row.date_rdv, row.heure_rdv), []).append(row.id)
+    return [(date_rdv, heure_rdv, ids) for (date_rdv, heure_rdv), ids in conflicts.items()]
+
+
+def upgrade(connection):
+    conflicts = active_slot_conflicts(connection)
+    if conflicts:
+        details = '\n'.join(f"  {date_rdv} {heure_rdv} : ids {', '.join(map(str, ids))}"
+                            for date_rdv, heure_rdv, ids in conflicts)
+        raise RuntimeError(
+            f"{len(conflicts)} créneau(x) avec plusieurs réservations actives, à résoudre "
+            f"manuellement avant de créer uq_rdv_active_slot :\n{details}"
+        )
+
+    execute_all(connection, [
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_rdv_active_slot "
+        "ON rdv_reservations (date_rdv, heure_rdv) "
+        f"WHERE {ACTIVE}",
+    ])
@@ -0,0 +1,11 @@
+"""
+Index composite (email, date_rdv) pour /rdv/mes-reservations : recherche
+par email triée par date sans parcourir toute la table.
+"""
+from database.migrate import execute_all
+
+
+def upgrade(connection):
+    execute_all(connection, [
+        'CREATE INDEX IF NOT EXISTS idx_rdv_email_date ON rdv_reservations (email, date_rdv)',
+    ])
@@ -0,0 +1,16 @@
+"""
+Table des compteurs de rate limiting (RATE_LIMIT_BACKEND=database),
+partagée par tous les workers et conteneurs.
+"""
+from database.migrate import execute_all
+
+
+def upgrade(connection):
+    execute_all(connection, [
+        'CREATE TABLE IF NOT EXISTS rate_limits ('
+        ' key VARCHAR(255) PRIMARY KEY,'
+        ' tokens FLOAT NOT NULL,'
+        ' updated_at FLOAT NOT NULL,'
+        ' allowed INTEGER NOT NULL'
+        ')',
+    ])
@@ -0,0 +1,12 @@
+"""
+Index fonctionnel sur lower(email) : les recherches d'email insensibles à la
+casse (login, forgot_password, register) n'ont plus à parcourir la table.
+Supporté par Postgres et SQLite (>= 3.9).
+"""
+from database.migrate import execute_all
+
+
+def upgrade(connection):
+    execute_all(connection, [
+        'CREATE INDEX IF NOT EXISTS idx_users_email_lower ON users (lower(email))',
+    ])
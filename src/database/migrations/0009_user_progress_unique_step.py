@@ -0,0 +1,30 @@
+"""
+Une seule ligne de progression par (user_id, category, step) : base de
+l'upsert de POST /progress et /progress/batch.
+
+Les doublons existants sont fusionnés dans la ligne la plus récente, qui
+reste complétée si l'un des doublons l'était (avec la première date de
+complétion), puis les autres sont supprimés.
+"""
+from database.migrate import execute_all
+
+SAME_STEP = (
+    "p.user_id = user_progress.user_id AND p.category = user_progress.category "
+    "AND p.step = user_progress.step"
+)
+
+
+def upgrade(connection):
+    execute_all(connection, [
+        "UPDATE user_progress SET "
+        "completed = TRUE, "
+        f"completed_at = (SELECT MIN(p.completed_at) FROM user_progress p WHERE {SAME_STEP}) "
+        "WHERE id IN (SELECT MAX(id) FROM user_progress GROUP BY user_id, category, step HAVING COUNT(*) > 1) "
+        f"AND EXISTS (SELECT 1 FROM user_progress p WHERE {SAME_STEP} AND p.completed = TRUE)",
+
+        "DELETE FROM user_progress "
+        "WHERE id NOT IN (SELECT MAX(id) FROM user_progress GROUP BY user_id, category, step)",
+
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_user_progress_step "
+        "ON user_progress (user_id, category, step)",
+    ])
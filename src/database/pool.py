@@ -0,0 +1,125 @@
+"""
+Pool de connexions SQLAlchemy : réglages par variables d'environnement et
+instrumentation.
+
+Dimensionnement : chaque worker gunicorn a son propre pool. Avec des workers
+à threads, DB_POOL_SIZE doit couvrir le nombre de threads par worker, et
+(workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW)) rester sous max_connections de
+Postgres. Les compteurs exposés par /internal/pool montrent si les requêtes
+attendent une connexion (wait, overflow, timeouts).
+"""
+import os
+import threading
+import time
+
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.pool import QueuePool
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _env_bool(name, default):
+    return os.environ.get(name, '1' if default else '0') == '1'
+
+
+class PoolStats:
+    """Compteurs d'un pool (par process)"""
+
+    def __init__(self, slow_wait_seconds=0.1):
+        self.slow_wait_seconds = slow_wait_seconds
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.slow_waits = 0
+        self.overflow_connections = 0
+        self.timeouts = 0
+
+    def record_checkout(self, waited, overflowed):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += waited
+            self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            if waited >= self.slow_wait_seconds:
+                self.slow_waits += 1
+            if overflowed:
+                self.overflow_connections += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self, pool):
+        with self._lock:
+            data = {
+                'checkouts': self.checkouts,
+                'wait_seconds_total': round(self.wait_seconds_total, 6),
+                'wait_seconds_avg': round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0,
+                'wait_seconds_max': round(self.wait_seconds_max, 6),
+                'slow_waits': self.slow_waits,
+                'overflow_connections': self.overflow_connections,
+                'timeouts': self.timeouts,
+            }
+        data.update({
+            'pool_size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': max(pool.overflow(), 0),
+            'max_overflow': pool._max_overflow,
+        })
+        return data
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool qui mesure le temps d'obtention d'une connexion"""
+
+    stats = None  # PoolStats, fixé par instrumented_pool_class()
+
+    def connect(self):
+        overflow_before = self._overflow
+        start = time.perf_counter()
+        try:
+            connection = super().connect()
+        except sa_exc.TimeoutError:
+            self.stats.record_timeout()
+            raise
+        # _overflow > 0 : une connexion au-delà de pool_size a été ouverte
+        overflowed = self._overflow > overflow_before and self._overflow > 0
+        self.stats.record_checkout(time.perf_counter() - start, overflowed)
+        return connection
+
+
+def instrumented_pool_class(stats):
+    # Une classe par pool : Pool.recreate() (dispose) garde ainsi les mêmes compteurs
+    return type('InstrumentedQueuePool', (InstrumentedQueuePool,), {'stats': stats})
+
+
+def engine_options(database_url):
+    """SQLALCHEMY_ENGINE_OPTIONS à partir des variables DB_POOL_* / DB_STATEMENT_TIMEOUT_MS"""
+    stats = PoolStats(slow_wait_seconds=_env_int('DB_POOL_SLOW_WAIT_MS', 100) / 1000)
+    options = {
+        'poolclass': instrumented_pool_class(stats),
+        'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', True),
+        'pool_size': _env_int('DB_POOL_SIZE', 5),
+        'max_overflow': _env_int('DB_MAX_OVERFLOW', 10),
+        'pool_timeout': _env_int('DB_POOL_TIMEOUT', 30),
+    }
+    if database_url.startswith('postgresql'):
+        # Recycler avant que Postgres / un proxy ne coupe les connexions inactives
+        options['pool_recycle'] = _env_int('DB_POOL_RECYCLE', 1800)
+        # Toute requête plus longue est annulée par Postgres (0 = pas de limite).
+        # Les migrations (db upgrade) lèvent cette limite, voir migrate.upgrade.
+        statement_timeout = _env_int('DB_STATEMENT_TIMEOUT_MS', 15000)
+        if statement_timeout > 0:
+            options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout}'}
+    return options
+
+
+def pool_snapshot(engine):
+    """Compteurs et état du pool d'un engine (None s'il n'est pas instrumenté)"""
+    stats = getattr(engine.pool, 'stats', None)
+    if stats is None:
+        return None
+    return stats.snapshot(engine.pool)
@@ -0,0 +1,60 @@
+"""
+Routage lecture / écriture entre la base principale et un réplica.
+
+Avec DATABASE_REPLICA_URL, les routes décorées par @read_replica envoient
+leurs SELECT au réplica ; tout le reste (écritures, flush, SQL brut, routes
+non décorées, CLI, worker email) reste sur la base principale.
+
+Read-your-writes : une requête qui a écrit épingle le client (cookie de
+session) à la base principale pendant DB_READ_YOUR_WRITES_SECONDS, le temps
+que le réplica rattrape son retard. Une requête qui a déjà écrit lit aussi
+la base principale jusqu'à sa fin.
+
+Les lectures qui remplissent un cache partagé (disponibilités) ne passent
+pas par le réplica : une valeur en retard y resterait jusqu'au TTL.
+"""
+import os
+import time
+from functools import wraps
+
+from flask import g, has_request_context, session as flask_session
+from flask_sqlalchemy.session import Session
+
+REPLICA_BIND = 'replica'
+READ_YOUR_WRITES_SECONDS = float(os.environ.get('DB_READ_YOUR_WRITES_SECONDS', 5))
+_PIN_KEY = '_db_primary_until'
+
+
+def _pinned_to_primary():
+    return flask_session.get(_PIN_KEY, 0) > time.time()
+
+
+class RoutingSession(Session):
+    """Session qui choisit l'engine (principal ou réplica) requête par requête"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            is_write = self._flushing or clause is None or not getattr(clause, 'is_select', False)
+            if is_write:
+                g._db_wrote = True
+            elif (g.get('_db_read_replica') and not g.get('_db_wrote')
+                    and REPLICA_BIND in self._db.engines and not _pinned_to_primary()):
+                return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def read_replica(f):
+    """Décorateur : les lectures de cette route peuvent être servies par le réplica"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g._db_read_replica = True
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def init_routing(app):
+    @app.after_request
+    def pin_after_write(response):
+        if g.get('_db_wrote') and REPLICA_BIND in app.config.get('SQLALCHEMY_BINDS', {}):
+            flask_session[_PIN_KEY] = time.time() + READ_YOUR_WRITES_SECONDS
+        return response
@@ -0,0 +1,313 @@
+"""
+Données synthétiques pour tester l'application à grande échelle.
+
+    flask --app app db seed-synthetic --users 200000 --reservations 5000000 \\
+        --progress 3000000 --bookmarks 1000000 --seed 42
+
+Les données sont déterministes pour une graine donnée et volontairement
+déséquilibrées, comme en production :
+- quelques utilisateurs très actifs concentrent réservations, progression
+  et favoris ;
+- les dates récentes et les créneaux de milieu de matinée / d'après-midi
+  sont les plus demandés. Un créneau déjà pris par une réservation active
+  donne une réservation annulée (la contrainte uq_rdv_active_slot tient).
+
+Chargement en masse sans l'ORM : COPY sur Postgres (psycopg 3), executemany
+par lots sur SQLite, le tout dans une seule transaction (un échec ne laisse
+rien en base). Les créneaux actifs déjà en base sont lus avant la
+génération : relancer avec une autre graine ne viole pas uq_rdv_active_slot.
+Le cache des disponibilités est invalidé dans tous les workers à la fin.
+
+Tous les comptes générés ont le mot de passe SYNTHETIC_PASSWORD (un seul
+hash calculé) et un email vérifié.
+"""
+import random
+import time
+from datetime import date, datetime, timedelta
+
+import click
+import sqlalchemy as sa
+from werkzeug.security import generate_password_hash
+
+from database.migrate import db_cli
+
+SYNTHETIC_PASSWORD = 'Synthetic1!'
+
+FIRST_NAMES = ['Aminata', 'Moussa', 'Fatou', 'Ibrahima', 'Awa', 'Mamadou', 'Mariam', 'Ousmane',
+               'Khadija', 'Youssef', 'Sarah', 'Karim', 'Ines', 'Lucas', 'Léa', 'Minh', 'Chloé', 'Omar']
+LAST_NAMES = ['Diallo', 'Traoré', 'Camara', 'Ndiaye', 'Koné', 'Benali', 'Martin', 'Bernard',
+              'Dubois', 'Tran', 'Haddad', 'Sow', 'Cissé', 'Petit', 'Moreau', 'Fofana']
+COUNTRIES = ['Sénégal', 'Mali', 'Guinée', "Côte d'Ivoire", 'Maroc', 'Algérie', 'Tunisie',
+             'Cameroun', 'Vietnam', 'Chine', 'Brésil', 'Liban', 'France']
+STUDY_LEVELS = ['Licence 1', 'Licence 2', 'Licence 3', 'Master 1', 'Master 2', 'Doctorat', 'BTS']
+FIELDS = ['Informatique', 'Droit', 'Économie', 'Médecine', 'Lettres', 'Mathématiques', 'Gestion', 'Biologie']
+RDV_TYPES = ['orientation', 'demarches', 'logement', 'visa', 'emploi', 'bourse']
+CONSULTATION_TYPES = ['visio', 'visio', 'visio', 'phone', 'presentiel']
+PROGRESS_STEPS = [(category, f'etape-{n}')
+                  for category in ('visa', 'logement', 'banque', 'caf', 'inscription', 'sante')
+                  for n in range(1, 9)]
+BOOKMARKS = [
+    ('Demande de titre de séjour', '/guides/titre-sejour', 'visa'),
+    ('Trouver un logement CROUS', '/guides/logement-crous', 'logement'),
+    ('Ouvrir un compte bancaire', '/guides/compte-bancaire', 'banque'),
+    ('Aide au logement (APL)', '/guides/apl', 'caf'),
+    ('Sécurité sociale étudiante', '/guides/securite-sociale', 'sante'),
+    ('Job étudiant : vos droits', '/guides/job-etudiant', 'emploi'),
+    ('Inscription administrative', '/guides/inscription', 'inscription'),
+]
+
+# Créneaux de 30 min de 8h à 20h, pondérés (pics 10h-12h et 14h-17h)
+SLOTS = [f'{minute // 60:02d}:{minute % 60:02d}' for minute in range(8 * 60, 20 * 60, 30)]
+SLOT_CUM_WEIGHTS = []
+for _slot in SLOTS:
+    _hour = int(_slot[:2])
+    _weight = 4 if 10 <= _hour < 12 else 3 if 14 <= _hour < 17 else 1
+    SLOT_CUM_WEIGHTS.append((SLOT_CUM_WEIGHTS[-1] if SLOT_CUM_WEIGHTS else 0) + _weight)
+
+
+def skewed_index(rng, n, skew):
+    """Indice dans [0, n) : plus `skew` est grand, plus les petits indices sont fréquents"""
+    return min(int(n * rng.random() ** skew), n - 1)
+
+
+# ============ GÉNÉRATEURS ============
+
+def generate_users(rng, count, first_id, tag, password_hash, now):
+    for n in range(count):
+        first_name = rng.choice(FIRST_NAMES)
+        last_name = rng.choice(LAST_NAMES)
+        username = f'synth{tag}_{n}'
+        created_at = now - timedelta(minutes=rng.randrange(3 * 365 * 24 * 60))
+        last_login = created_at + timedelta(minutes=rng.randrange(60 * 24 * 90)) if rng.random() < 0.8 else None
+        yield (
+            first_id + n, username, f'{username}@example.com', password_hash, first_name, last_name,
+            rng.choice(COUNTRIES), rng.choice(STUDY_LEVELS), rng.choice(FIELDS),
+            created_at, last_login, True, False, True,
+        )
+
+
+def generate_reservations(rng, count, users, first_user_id, tag, days, future_days, today, now, active_slots):
+    """`active_slots` : créneaux (date, heure) déjà occupés en base, complété au fil de la génération"""
+    # Un seul RDV actif par créneau : à venir, à peine plus de demandes que de créneaux
+    future_share = min(0.1, 1.5 * future_days * len(SLOTS) / max(count, 1))
+    for n in range(count):
+        if future_days and rng.random() < future_share:
+            day = today + timedelta(days=skewed_index(rng, future_days, 1.5))
+        else:
+            # Activité en croissance : les dates récentes sont les plus chargées
+            day = today - timedelta(days=1 + skewed_index(rng, days, 2))
+        heure = rng.choices(SLOTS, cum_weights=SLOT_CUM_WEIGHTS)[0]
+        if rng.random() < 0.7 and users:
+            user_index = skewed_index(rng, users, 3)
+            user_id = first_user_id + user_index
+            email = f'synth{tag}_{user_index}@example.com'
+        else:
+            user_id = None
+            email = f'guest{tag}_{skewed_index(rng, count, 2)}@example.com'
+
+        if day < today:
+            statut = 'completed' if rng.random() < 0.85 else 'cancelled'
+        elif (day, heure) in active_slots or rng.random() < 0.1:
+            statut = 'cancelled'
+        else:
+            statut = 'confirmed' if rng.random() < 0.6 else 'pending'
+            active_slots.add((day, heure))
+
+        created_at = min(datetime.combine(day, datetime.min.time()) - timedelta(minutes=rng.randrange(60 * 24 * 30)), now)
+        yield (
+            rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), email, f'06{rng.randrange(10 ** 8):08d}',
+            rng.choice(COUNTRIES), rng.choice(RDV_TYPES), rng.choice(CONSULTATION_TYPES),
+            None, None, day, heure, statut, created_at, created_at, user_id, True, True,
+        )
+
+
+def generate_progress(rng, count, users, first_user_id, now):
+    # Une ligne par (utilisateur, catégorie, étape) : les utilisateurs actifs avancent plus loin
+    next_step = {}
+    for _ in range(count):
+        user_index = skewed_index(rng, users, 3)
+        step_index = next_step.get(user_index, 0)
+        while step_index >= len(PROGRESS_STEPS):
+            user_index = rng.randrange(users)
+            step_index = next_step.get(user_index, 0)
+        next_step[user_index] = step_index + 1
+        category, step = PROGRESS_STEPS[step_index]
+        created_at = now - timedelta(minutes=rng.randrange(365 * 24 * 60))
+        completed = rng.random() < 0.6
+        yield (
+            first_user_id + user_index, category, step, completed, None, created_at,
+            created_at + timedelta(minutes=rng.randrange(60 * 24 * 14)) if completed else None,
+        )
+
+
+def generate_bookmarks(rng, count, users, first_user_id, now):
+    for _ in range(count):
+        title, url, category = rng.choice(BOOKMARKS)
+        yield (
+            first_user_id + skewed_index(rng, users, 3), title, url, category,
+            now - timedelta(minutes=rng.randrange(365 * 24 * 60)),
+        )
+
+
+TABLES = {
+    'users': ('id', 'username', 'email', 'password_hash', 'first_name', 'last_name', 'nationality',
+              'study_level', 'field_of_study', 'created_at', 'last_login', 'is_active', 'is_admin',
+              'email_verified'),
+    'rdv_reservations': ('prenom', 'nom', 'email', 'telephone', 'pays', 'type_rdv', 'consultation_type',
+                         'sujet', 'message', 'date_rdv', 'heure_rdv', 'statut', 'created_at', 'updated_at',
+                         'user_id', 'email_admin_sent', 'email_user_sent'),
+    'user_progress': ('user_id', 'category', 'step', 'completed', 'notes', 'created_at', 'completed_at'),
+    'user_bookmarks': ('user_id', 'title', 'url', 'category', 'created_at'),
+}
+
+
+# ============ CHARGEMENT ============
+
+def _sqlite_converters(table, columns):
+    """Même format que les types Date/DateTime de SQLAlchemy sur SQLite, colonne par colonne"""
+    from database.db import db
+    converters = []
+    for column in columns:
+        column_type = db.metadata.tables[table].c[column].type
+        if isinstance(column_type, sa.DateTime):
+            converters.append(lambda v: v.isoformat(' ', 'microseconds') if v is not None else None)
+        elif isinstance(column_type, sa.Date):
+            converters.append(lambda v: v.isoformat() if v is not None else None)
+        else:
+            converters.append(None)
+    return converters
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def bulk_load(connection, table, rows, batch_size=50000):
+    """
+    Insérer `rows` (tuples dans l'ordre de TABLES[table]) dans la transaction
+    en cours de `connection`. Retourne le nombre de lignes.
+    """
+    columns = TABLES[table]
+    count = 0
+    if connection.dialect.name == 'postgresql':
+        cursor = connection.connection.driver_connection.cursor()
+        with cursor.copy(f"COPY {table} ({', '.join(columns)}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row(row)
+                count += 1
+        return count
+
+    sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    converted = [(i, convert) for i, convert in enumerate(_sqlite_converters(table, columns)) if convert]
+    for batch in _batches(rows, batch_size):
+        if converted:
+            rows_out = []
+            for row in batch:
+                row = list(row)
+                for i, convert in converted:
+                    row[i] = convert(row[i])
+                rows_out.append(tuple(row))
+            batch = rows_out
+        connection.exec_driver_sql(sql, batch)
+        count += len(batch)
+    return count
+
+
+def existing_active_slots(connection, today):
+    """Créneaux à venir déjà pris par une réservation active (données réelles ou seed précédent)"""
+    from models.rdv import RDV, ACTIVE_STATUSES
+    rows = connection.execute(
+        sa.select(RDV.date_rdv, RDV.heure_rdv).where(RDV.date_rdv >= today, RDV.statut.in_(ACTIVE_STATUSES))
+    )
+    return {(row.date_rdv, row.heure_rdv) for row in rows}
+
+
+def _timed_load(connection, table, rows, batch_size):
+    start = time.perf_counter()
+    count = bulk_load(connection, table, rows, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    print(f"[info] {table}: {count} lignes en {elapsed:.1f}s ({count / max(elapsed, 1e-9):,.0f}/s)", flush=True)
+    return count
+
+
+@db_cli.command('seed-synthetic')
+@click.option('--users', type=int, default=10000)
+@click.option('--reservations', type=int, default=100000)
+@click.option('--progress', type=int, default=50000)
+@click.option('--bookmarks', type=int, default=20000)
+@click.option('--seed', type=int, default=42, help='Graine : mêmes options et graine = mêmes données')
+@click.option('--days', type=int, default=730, help='Historique de réservations (jours passés)')
+@click.option('--future-days', type=int, default=90, help='Réservations à venir (jours)')
+@click.option('--batch-size', type=int, default=50000)
+def seed_synthetic_command(users, reservations, progress, bookmarks, seed, days, future_days, batch_size):
+    """Générer et charger en masse des données synthétiques (tests de charge)"""
+    from availability_cache import availability_cache
+    from database.db import db
+
+    engine = db.engine
+    tag = str(seed)
+    with engine.connect() as connection:
+        if connection.execute(sa.text('SELECT 1 FROM users WHERE username = :u'),
+                              {'u': f'synth{tag}_0'}).first():
+            raise click.ClickException(f"Données déjà générées avec la graine {seed} (utilisez une autre --seed)")
+        first_user_id = (connection.execute(sa.text('SELECT MAX(id) FROM users')).scalar() or 0) + 1
+
+    if (progress or bookmarks or reservations) and not users:
+        raise click.ClickException("--users doit être > 0 pour générer progression, favoris et réservations")
+    if progress > users * len(PROGRESS_STEPS):
+        raise click.ClickException(f"--progress ne peut pas dépasser {len(PROGRESS_STEPS)} étapes par utilisateur")
+
+    now = datetime.utcnow().replace(microsecond=0)
+    today = now.date()
+    password_hash = generate_password_hash(SYNTHETIC_PASSWORD)
+    started = time.perf_counter()
+    total = 0
+
+    with engine.connect() as connection:
+        sqlite = connection.dialect.name == 'sqlite'
+        if sqlite:
+            # Données de test : la durabilité du commit importe peu
+            connection.exec_driver_sql('PRAGMA synchronous = OFF')
+            connection.commit()
+        try:
+            # Une seule transaction : un échec ne laisse aucune donnée à moitié chargée
+            with connection.begin():
+                rng = random.Random(f'{seed}-users')
+                total += _timed_load(connection, 'users',
+                                     generate_users(rng, users, first_user_id, tag, password_hash, now), batch_size)
+                if not sqlite:
+                    # Ids explicites : la séquence doit repartir après le dernier id
+                    connection.exec_driver_sql(
+                        "SELECT setval(pg_get_serial_sequence('users', 'id'), (SELECT MAX(id) FROM users))"
+                    )
+
+                rng = random.Random(f'{seed}-rdv')
+                total += _timed_load(connection, 'rdv_reservations', generate_reservations(
+                    rng, reservations, users, first_user_id, tag, days, future_days, today, now,
+                    existing_active_slots(connection, today)), batch_size)
+                rng = random.Random(f'{seed}-progress')
+                total += _timed_load(connection, 'user_progress',
+                                     generate_progress(rng, progress, users, first_user_id, now), batch_size)
+                rng = random.Random(f'{seed}-bookmarks')
+                total += _timed_load(connection, 'user_bookmarks',
+                                     generate_bookmarks(rng, bookmarks, users, first_user_id, now), batch_size)
+        finally:
+            if sqlite:
+                connection.exec_driver_sql('PRAGMA synchronous = FULL')
+                connection.commit()
+
+    if engine.dialect.name == 'postgresql':
+        with engine.begin() as connection:
+            connection.exec_driver_sql('ANALYZE')
+
+    # Réservations écrites hors de l'API : aucune date en cache n'est plus fiable
+    availability_cache.invalidate_all()
+    elapsed = time.perf_counter() - started
+    print(f"✅ {total} lignes générées en {elapsed:.1f}s (graine {seed}, mot de passe '{SYNTHETIC_PASSWORD}')")
@@ -0,0 +1,145 @@
+"""
+Client HTTP pour le fournisseur d'emails (Resend).
+
+Remplace les appels `resend.Emails.send` (une requête HTTPS neuve par email)
+par une session `requests` persistante avec pool de connexions, et permet
+d'envoyer plusieurs messages en une seule requête via `/emails/batch`.
+
+L'URL de l'API est configurable (RESEND_API_URL) pour pointer vers un faux
+serveur local (voir benchmarks/fake_resend.py) en test ou en benchmark.
+"""
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_API_URL = 'https://api.resend.com'
+# Limite de l'endpoint batch de Resend
+MAX_BATCH_SIZE = 100
+
+
+class EmailProviderError(Exception):
+    """Erreur renvoyée par le fournisseur (ou réseau)"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class BatchChunk:
+    """Résultat d'une tranche de send_batch : messages[start:stop], acceptés ou non"""
+
+    def __init__(self, start, stop, data=None, error=None, duration=0.0):
+        self.start = start
+        self.stop = stop
+        self.data = data
+        self.error = error
+        self.duration = duration
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class ResendClient:
+    """Client Resend avec une session HTTP persistante par thread"""
+
+    def __init__(self, api_key, api_url=DEFAULT_API_URL, timeout=10, pool_size=4):
+        self.api_key = api_key
+        self.api_url = api_url.rstrip('/')
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._local = threading.local()
+        self.requests_sent = 0
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers.update({
+                'Accept': 'application/json',
+                'Authorization': f'Bearer {self.api_key}',
+                'User-Agent': 'etudiantesolidaire-backend',
+            })
+            self._local.session = session
+        return session
+
+    def _post(self, path, payload):
+        self.requests_sent += 1
+        try:
+            response = self._session().post(f'{self.api_url}{path}', json=payload, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise EmailProviderError(f'Erreur réseau vers {path}: {e}') from e
+
+        if response.status_code >= 300:
+            try:
+                detail = response.json().get('message', response.text)
+            except ValueError:
+                detail = response.text
+            raise EmailProviderError(f'{response.status_code} {detail}', status_code=response.status_code)
+        try:
+            return response.json() if response.content else None
+        except ValueError:
+            # Accepté (2xx) mais corps illisible : ne pas le traiter comme un échec
+            return None
+
+    def send(self, params):
+        """Envoyer un email (même format que resend.Emails.send)"""
+        return self._post('/emails', params)
+
+    def send_batch(self, messages):
+        """
+        Envoyer plusieurs emails en une requête par tranche de MAX_BATCH_SIZE.
+        Resend traite chaque tranche en tout-ou-rien : retourne un BatchChunk
+        par tranche, une tranche en erreur n'empêche pas l'envoi des suivantes
+        (ni ne remet en cause les précédentes, déjà acceptées).
+        """
+        results = []
+        for i in range(0, len(messages), MAX_BATCH_SIZE):
+            chunk = messages[i:i + MAX_BATCH_SIZE]
+            start = time.perf_counter()
+            try:
+                if len(chunk) == 1:
+                    data = [self.send(chunk[0])]
+                else:
+                    response = self._post('/emails/batch', chunk) or {}
+                    data = response.get('data', []) if isinstance(response, dict) else response
+            except EmailProviderError as e:
+                results.append(BatchChunk(i, i + len(chunk), error=e, duration=time.perf_counter() - start))
+                continue
+            results.append(BatchChunk(i, i + len(chunk), data=data, duration=time.perf_counter() - start))
+        return results
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_email_client():
+    """
+    Client partagé du process, ou None si RESEND_API_KEY n'est pas défini.
+    Recréé si la clé ou l'URL changent (utile en test).
+    """
+    global _client
+    api_key = os.environ.get('RESEND_API_KEY')
+    if not api_key:
+        return None
+    api_url = os.environ.get('RESEND_API_URL', DEFAULT_API_URL)
+    client = _client
+    if client is None or client.api_key != api_key or client.api_url != api_url.rstrip('/'):
+        with _client_lock:
+            client = _client
+            if client is None or client.api_key != api_key or client.api_url != api_url.rstrip('/'):
+                client = ResendClient(
+                    api_key,
+                    api_url=api_url,
+                    timeout=float(os.environ.get('RESEND_TIMEOUT_SECONDS', 10)),
+                    pool_size=int(os.environ.get('EMAIL_WORKER_THREADS', 2)) + 2,
+                )
+                _client = client
+    return client
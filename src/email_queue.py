@@ -0,0 +1,281 @@
+"""
+File d'attente d'emails persistante (outbox).
+
+Les routes n'envoient plus les emails directement : elles insèrent une ligne
+dans `email_outbox` dans la même transaction que la donnée métier (réservation,
+utilisateur...). Un petit pool de threads par worker gunicorn, ou un process
+séparé lancé avec `flask --app app email-worker`, vide ensuite la table avec
+des tentatives multiples et un backoff exponentiel.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import click
+from sqlalchemy import and_, or_, select, update
+
+from database.db import db
+from email_provider import get_email_client
+from metrics import observe_email_send
+from models.outbox import EmailOutbox
+from models.rdv import RDV
+from profiling import span
+
+DEFAULT_SENDER = "noreply@etudiantesolidaire.com"
+
+MAX_ATTEMPTS = int(os.environ.get('EMAIL_MAX_ATTEMPTS', 6))
+BACKOFF_BASE_SECONDS = 30
+BACKOFF_MAX_SECONDS = 3600
+# Un message resté "sending" plus longtemps que ça est considéré comme abandonné
+# (worker tué pendant l'envoi) et peut être repris.
+LOCK_TIMEOUT_SECONDS = 300
+
+# Colonnes de RDV à mettre à jour quand un message lié est envoyé
+RDV_SENT_FLAGS = {
+    'rdv_user': 'email_user_sent',
+    'rdv_admin': 'email_admin_sent',
+}
+
+
+@span('email')
+def enqueue_email(kind, to_address, subject, html, rdv_id=None, sender=DEFAULT_SENDER):
+    """
+    Ajouter un email à l'outbox dans la session courante.
+    Le commit est fait par l'appelant, avec la donnée métier.
+    """
+    message = EmailOutbox(**outbox_values(kind, to_address, subject, html, rdv_id, sender))
+    db.session.add(message)
+    return message
+
+
+def outbox_values(kind, to_address, subject, html, rdv_id=None, sender=DEFAULT_SENDER):
+    """Colonnes d'un nouveau message (aussi utilisé pour les INSERT du mode async)"""
+    return dict(
+        kind=kind,
+        sender=sender,
+        to_address=to_address,
+        subject=subject,
+        html=html,
+        rdv_id=rdv_id,
+        status='pending',
+        attempts=0,
+        next_attempt_at=datetime.utcnow(),
+    )
+
+
+def _due_condition(now):
+    stale = now - timedelta(seconds=LOCK_TIMEOUT_SECONDS)
+    return or_(
+        and_(EmailOutbox.status == 'pending', EmailOutbox.next_attempt_at <= now),
+        and_(EmailOutbox.status == 'sending', EmailOutbox.locked_at < stale),
+    )
+
+
+def claim_due_messages(limit=20):
+    """
+    Réserver jusqu'à `limit` messages à envoyer.
+    Chaque réservation est un UPDATE conditionnel : si un autre worker a pris
+    le message entre-temps, rowcount vaut 0 et on passe au suivant.
+    """
+    now = datetime.utcnow()
+    candidate_ids = db.session.execute(
+        select(EmailOutbox.id)
+        .where(_due_condition(now))
+        .order_by(EmailOutbox.next_attempt_at)
+        .limit(limit)
+    ).scalars().all()
+
+    claimed_ids = []
+    for message_id in candidate_ids:
+        result = db.session.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id == message_id, _due_condition(now))
+            .values(status='sending', locked_at=now, attempts=EmailOutbox.attempts + 1)
+        )
+        if result.rowcount == 1:
+            claimed_ids.append(message_id)
+    db.session.commit()
+
+    if not claimed_ids:
+        return []
+    return EmailOutbox.query.filter(EmailOutbox.id.in_(claimed_ids)).all()
+
+
+def _backoff_delay(attempts):
+    return min(BACKOFF_BASE_SECONDS * (2 ** max(attempts - 1, 0)), BACKOFF_MAX_SECONDS)
+
+
+def _mark_failed(message, error, now):
+    message.last_error = str(error)[:1000]
+    message.locked_at = None
+    if message.attempts >= MAX_ATTEMPTS:
+        message.status = 'failed'
+        print(f"❌ Email {message.id} ({message.kind}) abandonné après {message.attempts} tentatives: {error}", flush=True)
+    else:
+        delay = _backoff_delay(message.attempts)
+        message.status = 'pending'
+        message.next_attempt_at = now + timedelta(seconds=delay)
+        print(f"⚠️ Email {message.id} ({message.kind}) en échec, nouvel essai dans {delay}s: {error}", flush=True)
+
+
+def _mark_sent(message, now):
+    message.status = 'sent'
+    message.sent_at = now
+    message.locked_at = None
+    message.last_error = None
+    flag = RDV_SENT_FLAGS.get(message.kind)
+    if flag and message.rdv_id:
+        RDV.query.filter_by(id=message.rdv_id).update({flag: True})
+    print(f"✅ Email {message.id} ({message.kind}) envoyé à {message.to_address}", flush=True)
+
+
+@span('email')
+def deliver_messages(messages):
+    """
+    Envoyer des messages réservés en requêtes batch et enregistrer le résultat.
+    Chaque tranche du batch Resend est tout-ou-rien : seuls les messages des
+    tranches en erreur sont replanifiés, ceux des tranches acceptées sont
+    marqués envoyés (jamais renvoyés).
+    """
+    if not messages:
+        return 0
+    client = get_email_client()
+    now = datetime.utcnow()
+
+    if client is None:
+        for message in messages:
+            print(f"⚠️ RESEND_API_KEY not set, skipping email {message.id} to {message.to_address}", flush=True)
+            message.status = 'skipped'
+            message.locked_at = None
+        db.session.commit()
+        return 0
+
+    sent = 0
+    for chunk in client.send_batch([message.to_params() for message in messages]):
+        chunk_messages = messages[chunk.start:chunk.stop]
+        observe_email_send([message.kind for message in chunk_messages], chunk.duration, ok=chunk.ok)
+        for message in chunk_messages:
+            if chunk.ok:
+                _mark_sent(message, now)
+            else:
+                _mark_failed(message, chunk.error, now)
+        sent += len(chunk_messages) if chunk.ok else 0
+    db.session.commit()
+    return sent
+
+
+def process_outbox_batch(limit=20):
+    """Envoyer un lot de messages dus. Retourne le nombre de messages traités."""
+    messages = claim_due_messages(limit)
+    try:
+        deliver_messages(messages)
+    except Exception as e:
+        db.session.rollback()
+        print(f"❌ Erreur inattendue sur le lot d'emails {[m.id for m in messages]}: {e}", flush=True)
+    return len(messages)
+
+
+class EmailWorkerPool:
+    """Pool de threads de taille fixe qui vide l'outbox en arrière-plan"""
+
+    def __init__(self, app, size=2, poll_interval=10, batch_size=20):
+        self.app = app
+        self.size = size
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for i in range(self.size):
+            thread = threading.Thread(target=self._run, name=f'email-worker-{i}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def notify(self):
+        self._wakeup.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            with self.app.app_context():
+                try:
+                    while not self._stop.is_set() and process_outbox_batch(self.batch_size):
+                        pass
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"❌ Erreur du worker email: {e}", flush=True)
+                finally:
+                    db.session.remove()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def notify_outbox():
+    """Réveiller le pool après un commit qui a ajouté des emails"""
+    if _pool is not None:
+        _pool.notify()
+
+
+def start_email_workers(app):
+    """Démarrer le pool de threads de ce process, une seule fois (après le fork)"""
+    global _pool
+    size = app.config.get('EMAIL_WORKER_THREADS', 0)
+    if _pool is not None or size <= 0:
+        return
+    with _pool_lock:
+        if _pool is None:
+            pool = EmailWorkerPool(app, size=size, poll_interval=app.config['EMAIL_OUTBOX_POLL_SECONDS'])
+            pool.start()
+            _pool = pool
+            # Vider ce qui a pu rester d'un précédent démarrage
+            pool.notify()
+
+
+def init_email_queue(app):
+    """
+    Brancher l'outbox sur l'application.
+
+    EMAIL_WORKER_MODE=thread (défaut) : pool de threads démarré au premier
+    request de chaque worker gunicorn (après le fork).
+    EMAIL_WORKER_MODE=external : aucun thread, l'outbox est vidée par
+    `flask --app app email-worker`.
+    """
+    mode = os.environ.get('EMAIL_WORKER_MODE', 'thread')
+    size = int(os.environ.get('EMAIL_WORKER_THREADS', 2))
+    poll_interval = float(os.environ.get('EMAIL_OUTBOX_POLL_SECONDS', 10))
+
+    app.config['EMAIL_WORKER_THREADS'] = size if mode == 'thread' else 0
+    app.config['EMAIL_OUTBOX_POLL_SECONDS'] = poll_interval
+
+    if mode == 'thread' and size > 0:
+        @app.before_request
+        def start_email_workers_before_request():
+            start_email_workers(app)
+            return None
+
+    @app.cli.command('email-worker')
+    @click.option('--once', is_flag=True, help="Vider l'outbox une fois puis quitter")
+    @click.option('--batch-size', default=20, show_default=True)
+    def email_worker_command(once, batch_size):
+        """Vider la file d'emails (process dédié)"""
+        print(f"[info] Email worker started (poll {poll_interval}s)", flush=True)
+        while True:
+            try:
+                while process_outbox_batch(batch_size):
+                    pass
+            except Exception as e:
+                db.session.rollback()
+                print(f"❌ Erreur du worker email: {e}", flush=True)
+            if once:
+                break
+            time.sleep(poll_interval)
@@ -0,0 +1,70 @@
+"""
+Registre des templates d'emails transactionnels.
+
+Un seul `jinja2.Environment` partagé charge les fichiers de
+`templates/emails/` une fois par process ; le bytecode compilé est aussi
+mis en cache sur disque pour que les workers suivants n'aient pas à
+re-parser les templates au démarrage.
+"""
+import os
+import tempfile
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+
+from profiling import span
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates', 'emails')
+
+# Templates connus (nom logique -> fichier)
+EMAIL_TEMPLATES = {
+    'rdv_user': 'rdv_user.html',
+    'rdv_admin': 'rdv_admin.html',
+    'verification': 'verification.html',
+    'password_reset': 'password_reset.html',
+}
+
+_env = None
+
+
+def _bytecode_cache_dir():
+    directory = os.environ.get('EMAIL_TEMPLATE_CACHE_DIR') or os.path.join(
+        tempfile.gettempdir(), 'etudiantesolidaire-email-templates'
+    )
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError:
+        return None
+    return directory
+
+
+def get_environment():
+    """Environment Jinja partagé (créé et préchargé au premier appel)"""
+    global _env
+    if _env is None:
+        cache_dir = _bytecode_cache_dir()
+        env = Environment(
+            loader=FileSystemLoader(TEMPLATES_DIR),
+            bytecode_cache=FileSystemBytecodeCache(cache_dir) if cache_dir else None,
+            autoescape=select_autoescape(['html']),
+            # Les fichiers ne changent pas en production : pas de stat() à chaque rendu
+            auto_reload=False,
+        )
+        for filename in EMAIL_TEMPLATES.values():
+            env.get_template(filename)
+        _env = env
+    return _env
+
+
+def get_template(name):
+    return get_environment().get_template(EMAIL_TEMPLATES[name])
+
+
+@span('email')
+def render(name, **context):
+    """Rendre un template d'email par son nom logique"""
+    return get_template(name).render(**context)
+
+
+def render_many(name, contexts):
+    """Rendre le même template pour une liste de contextes"""
+    template = get_template(name)
+    return [template.render(**context) for context in contexts]
@@ -1,12 +1,37 @@
 import os
 from flask import Flask, request, make_response
+from werkzeug.middleware.proxy_fix import ProxyFix
 from database.db import init_db, db
 from routes.user import user_bp
 from routes.rdv import rdv_bp
+from routes.internal import internal_bp
+from routes.admin import admin_bp
+from email_queue import init_email_queue
+from compression import init_compression
+from spa import init_spa
+from metrics import init_metrics
+from profiling import init_profiling
+from rdv_transfer import rdv_cli
+from rate_limit import TRUSTED_PROXY_HOPS
+
+# Liste des origines autorisées (CORS), aussi utilisée par le mode async (async_api.py)
+ALLOWED_ORIGINS = [
+    "http://localhost:3000",
+    "http://localhost:5173",
+    "https://etudiantesolidaire.com",
+    "https://www.etudiantesolidaire.com",
+    "https://lovely-empanada-61146c.netlify.app",
+    "https://api.etudiantesolidaire.com"
+]
 
 def create_app():
     app = Flask(__name__)
 
+    # Derrière le proxy de Railway/Render : request.remote_addr = IP du client
+    # (rate limiting), pas celle du proxy. Voir TRUSTED_PROXY_HOPS (rate_limit.py).
+    if TRUSTED_PROXY_HOPS > 0:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS, x_proto=TRUSTED_PROXY_HOPS)
+
     # ============ CONFIGURATION SÉCURITÉ SESSION ============
     # Ces paramètres sécurisent les cookies de session
     app.config['SESSION_COOKIE_SECURE'] = True  # Envoie le cookie SEULEMENT en HTTPS
@@ -15,16 +40,6 @@ def create_app():
     app.config['PERMANENT_SESSION_LIFETIME'] = 86400  # La session expire après 24 heures
     # ============ FIN CONFIGURATION SESSION ============
 
-    # Liste des origines autorisées
-    allowed_origins = [
-        "http://localhost:3000",
-        "http://localhost:5173",
-        "https://etudiantesolidaire.com",
-        "https://www.etudiantesolidaire.com",
-        "https://lovely-empanada-61146c.netlify.app",
-        "https://api.etudiantesolidaire.com"
-    ]
-
     # Handler pour les requêtes OPTIONS (preflight)
     @app.before_request
     def handle_preflight():
@@ -33,7 +48,7 @@ def create_app():
             response = make_response()
             response.status_code = 200
 
-            if origin in allowed_origins:
+            if origin in ALLOWED_ORIGINS:
                 response.headers['Access-Control-Allow-Origin'] = origin
             response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
             # Autoriser tous les headers nécessaires incluant X-CSRF-Token
@@ -48,7 +63,7 @@ def create_app():
     @app.after_request
     def add_cors_headers(response):
         origin = request.headers.get('Origin')
-        if origin in allowed_origins:
+        if origin in ALLOWED_ORIGINS:
             response.headers['Access-Control-Allow-Origin'] = origin
             response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
             # Autoriser X-CSRF-Token pour les requêtes CSRF
@@ -57,12 +72,21 @@ def create_app():
         return response
 
     init_db(app)
+    init_metrics(app)
+    init_profiling(app)
+    init_email_queue(app)
+    init_compression(app)
     app.register_blueprint(user_bp, url_prefix='/api')
     app.register_blueprint(rdv_bp, url_prefix='/api')
+    app.register_blueprint(admin_bp, url_prefix='/api/admin')
+    app.register_blueprint(internal_bp, url_prefix='/internal')
+    app.cli.add_command(rdv_cli)
 
-    @app.route('/')
-    def home():
-        return {"message": "API Etudiant Solidaire", "status": "running"}
+    # Frontend (src/static) servi par Flask si le build est présent, sinon "/" décrit l'API
+    if not init_spa(app):
+        @app.route('/')
+        def home():
+            return {"message": "API Etudiant Solidaire", "status": "running"}
 
     @app.route('/health')
     def health():
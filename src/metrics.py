@@ -0,0 +1,404 @@
+"""
+Métriques internes au format texte Prometheus.
+
+    GET /internal/metrics   (header X-Internal-Token, voir routes/internal.py)
+
+Enregistré :
+- http_requests_total{endpoint, method, status}
+- http_request_duration_seconds{endpoint}      histogramme
+- db_queries_total{endpoint}, db_query_duration_seconds_total{endpoint}
+- emails_sent_total{kind}, email_send_failures_total{kind}
+- email_send_duration_seconds{outcome}         histogramme (appel au fournisseur)
+
+Multiprocess : chaque worker gunicorn garde ses compteurs en mémoire et les
+écrit dans METRICS_DIR/metrics-<pid>-<démarrage>.json au plus toutes les
+METRICS_FLUSH_SECONDS (le démarrage distingue deux process qui réutilisent
+le même pid). Le worker qui répond au scrape additionne les fichiers de
+tous les workers. Les fichiers des workers morts sont ajoutés à
+metrics-aggregate.json puis supprimés : les compteurs restent monotones et
+le répertoire ne grossit pas avec les redémarrages.
+"""
+import contextvars
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+import sqlalchemy as sa
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', 5))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+# nom -> (type, aide)
+METRICS = {
+    'http_requests_total': ('counter', 'Requêtes HTTP par endpoint, méthode et statut'),
+    'http_request_duration_seconds': ('histogram', 'Durée des requêtes HTTP par endpoint'),
+    'db_queries_total': ('counter', 'Requêtes SQL exécutées, par endpoint'),
+    'db_query_duration_seconds_total': ('counter', 'Temps passé dans les requêtes SQL, par endpoint'),
+    'emails_sent_total': ('counter', 'Emails acceptés par le fournisseur'),
+    'email_send_failures_total': ('counter', "Emails en échec d'envoi (avant nouvel essai)"),
+    'email_send_duration_seconds': ('histogram', "Durée d'un appel d'envoi au fournisseur"),
+}
+
+# Endpoint de la requête en cours (thread Flask ou tâche asyncio)
+current_endpoint = contextvars.ContextVar('metrics_endpoint', default=None)
+
+
+class Registry:
+    """Compteurs et histogrammes d'un process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self.started = time.time_ns()
+        self.counters = {}
+        self.histograms = {}
+
+    def _check_pid(self):
+        # Après un fork, le worker repart de zéro (le parent a son propre fichier)
+        if self._pid != os.getpid():
+            self._reset()
+
+    def inc(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._check_pid()
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._check_pid()
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {'buckets': list(buckets), 'counts': [0] * len(buckets),
+                                                    'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(histogram['buckets']):
+                if value <= bound:
+                    histogram['counts'][i] += 1
+                    break
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def file_name(self):
+        with self._lock:
+            self._check_pid()
+            return f'metrics-{self._pid}-{self.started}.json'
+
+    def snapshot(self):
+        with self._lock:
+            self._check_pid()
+            return {
+                'counters': [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, list(labels), dict(h, counts=list(h['counts']))]
+                               for (name, labels), h in self.histograms.items()],
+            }
+
+
+registry = Registry()
+
+
+# ============ MULTIPROCESS ============
+
+def metrics_dir():
+    return os.environ.get('METRICS_DIR') or os.path.join(tempfile.gettempdir(), 'etudiantesolidaire-metrics')
+
+
+AGGREGATE_FILE = 'metrics-aggregate.json'
+# metrics-<pid>.json : ancien format, sans date de démarrage
+_WORKER_FILE = re.compile(r'^metrics-(\d+)(?:-(\d+))?\.json$')
+
+
+def _write_json(path, data):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _read_json(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+_last_flush = 0.0
+_flush_lock = threading.Lock()
+
+
+def flush(force=False):
+    """Écrire les métriques de ce process dans son fichier (au plus toutes les FLUSH_SECONDS)"""
+    global _last_flush
+    now = time.monotonic()
+    if not force and now - _last_flush < FLUSH_SECONDS:
+        return
+    if not _flush_lock.acquire(blocking=force):
+        return
+    try:
+        _last_flush = now
+        directory = metrics_dir()
+        os.makedirs(directory, exist_ok=True)
+        _write_json(os.path.join(directory, registry.file_name()), registry.snapshot())
+    except OSError as e:
+        print(f"[warn] Metrics flush failed: {e}", flush=True)
+    finally:
+        _flush_lock.release()
+
+
+def _merge(counters, histograms, data):
+    for name, labels, value in data['counters']:
+        key = (name, tuple(tuple(label) for label in labels))
+        counters[key] = counters.get(key, 0) + value
+    for name, labels, histogram in data['histograms']:
+        key = (name, tuple(tuple(label) for label in labels))
+        merged = histograms.get(key)
+        if merged is None:
+            histograms[key] = dict(histogram, counts=list(histogram['counts']))
+        else:
+            merged['counts'] = [a + b for a, b in zip(merged['counts'], histogram['counts'])]
+            merged['sum'] += histogram['sum']
+            merged['count'] += histogram['count']
+
+
+def _to_snapshot(counters, histograms):
+    return {
+        'counters': [[name, [list(label) for label in labels], value] for (name, labels), value in counters.items()],
+        'histograms': [[name, [list(label) for label in labels], histogram]
+                       for (name, labels), histogram in histograms.items()],
+    }
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _dead_worker_files(names):
+    """
+    Fichiers de workers terminés : pid disparu, ou pid réutilisé par un process
+    plus récent (seul le fichier au démarrage le plus récent peut être vivant).
+    """
+    latest = {}
+    workers = []
+    for name in names:
+        match = _WORKER_FILE.match(name)
+        if match:
+            pid, started = int(match.group(1)), int(match.group(2) or 0)
+            workers.append((name, pid, started))
+            latest[pid] = max(latest.get(pid, 0), started)
+    own = registry.file_name()
+    return [name for name, pid, started in workers
+            if name != own and (started < latest[pid] or not _pid_alive(pid))]
+
+
+class _DirectoryLock:
+    """
+    Verrou flock sur METRICS_DIR/metrics.lock : exclusif pour réécrire
+    l'agrégat et supprimer des fichiers, partagé pour les lire.
+    """
+
+    def __init__(self, directory, shared=False):
+        self.path = os.path.join(directory, 'metrics.lock')
+        self.mode = (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) if fcntl else None
+
+    def __enter__(self):
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl:
+            fcntl.flock(self.fd, self.mode)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        os.close(self.fd)
+
+
+def _fold_dead_workers(directory):
+    """
+    Ajouter les fichiers des workers morts à metrics-aggregate.json, puis les
+    supprimer. L'agrégat garde la liste des fichiers déjà ajoutés : un arrêt
+    entre l'écriture de l'agrégat et la suppression ne compte rien deux fois.
+    """
+    with _DirectoryLock(directory):
+        aggregate_path = os.path.join(directory, AGGREGATE_FILE)
+        aggregate = _read_json(aggregate_path) or {'counters': [], 'histograms': [], 'folded': []}
+        folded = set(aggregate['folded'])
+        dead = [name for name in _dead_worker_files(os.listdir(directory)) if name not in folded]
+        if dead:
+            counters, histograms = {}, {}
+            _merge(counters, histograms, aggregate)
+            for name in dead:
+                data = _read_json(os.path.join(directory, name))
+                if data is not None:
+                    _merge(counters, histograms, data)
+            folded.update(dead)
+            aggregate = dict(_to_snapshot(counters, histograms), folded=sorted(folded))
+            _write_json(aggregate_path, aggregate)
+        for name in folded:
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+        if folded:
+            # Fichiers supprimés : plus besoin de s'en souvenir
+            _write_json(aggregate_path, dict(aggregate, folded=[]))
+
+
+def collect():
+    """Additionner l'agrégat des workers terminés et les fichiers des workers vivants"""
+    flush(force=True)
+    directory = metrics_dir()
+    try:
+        _fold_dead_workers(directory)
+    except OSError as e:
+        print(f"[warn] Metrics cleanup failed: {e}", flush=True)
+    counters = {}
+    histograms = {}
+    # Verrou partagé : un repli concurrent (agrégat réécrit, fichiers supprimés)
+    # ne peut pas faire compter un worker deux fois ou pas du tout
+    with _DirectoryLock(directory, shared=True):
+        aggregate = _read_json(os.path.join(directory, AGGREGATE_FILE))
+        folded = set()
+        if aggregate is not None:
+            _merge(counters, histograms, aggregate)
+            folded = set(aggregate.get('folded', ()))
+        for name in os.listdir(directory):
+            if _WORKER_FILE.match(name) and name not in folded:
+                data = _read_json(os.path.join(directory, name))
+                if data is not None:
+                    _merge(counters, histograms, data)
+    return counters, histograms
+
+
+# ============ FORMAT PROMETHEUS ============
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus():
+    counters, histograms = collect()
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'counter':
+            for (metric, labels), value in sorted(counters.items()):
+                if metric == name:
+                    lines.append(f'{name}{_labels(labels)} {_number(value)}')
+        else:
+            for (metric, labels), histogram in sorted(histograms.items()):
+                if metric != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(histogram['buckets'], histogram['counts']):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_labels(labels, [("le", _number(float(bound)))])} {cumulative}')
+                lines.append(f'{name}_bucket{_labels(labels, [("le", "+Inf")])} {histogram["count"]}')
+                lines.append(f'{name}_sum{_labels(labels)} {_number(histogram["sum"])}')
+                lines.append(f'{name}_count{_labels(labels)} {histogram["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+# ============ ENREGISTREMENT ============
+
+def observe_request(endpoint, method, status, duration):
+    if not ENABLED:
+        return
+    registry.inc('http_requests_total', {'endpoint': endpoint, 'method': method, 'status': str(status)})
+    registry.observe('http_request_duration_seconds', {'endpoint': endpoint}, duration)
+    flush()
+
+
+def observe_email_send(kinds, duration, ok):
+    """Un appel au fournisseur pour des messages de types `kinds`"""
+    if not ENABLED:
+        return
+    registry.observe('email_send_duration_seconds', {'outcome': 'ok' if ok else 'error'}, duration)
+    for kind in kinds:
+        registry.inc('emails_sent_total' if ok else 'email_send_failures_total', {'kind': kind})
+    flush()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('metrics_query_start')
+    if not starts:
+        return
+    duration = time.perf_counter() - starts.pop()
+    endpoint = current_endpoint.get() or 'background'
+    registry.inc('db_queries_total', {'endpoint': endpoint})
+    registry.inc('db_query_duration_seconds_total', {'endpoint': endpoint}, duration)
+
+
+def instrument_engine(engine):
+    """Compter les requêtes SQL d'un engine (sync, ou async_engine.sync_engine)"""
+    if ENABLED and not sa.event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        sa.event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        sa.event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def init_metrics(app):
+    """Mesurer chaque requête Flask et les requêtes SQL des engines de l'application"""
+    if not ENABLED:
+        return
+    from flask import g, request
+    from database.db import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            instrument_engine(engine)
+
+    @app.before_request
+    def start_request_metrics():
+        g._metrics_start = time.perf_counter()
+        g._metrics_token = current_endpoint.set(request.endpoint or 'unmatched')
+
+    @app.after_request
+    def record_request_metrics(response):
+        start = g.pop('_metrics_start', None)
+        if start is not None:
+            observe_request(request.endpoint or 'unmatched', request.method,
+                            response.status_code, time.perf_counter() - start)
+        return response
+
+    @app.teardown_request
+    def reset_request_metrics(_exc):
+        token = g.pop('_metrics_token', None)
+        if token is not None:
+            current_endpoint.reset(token)
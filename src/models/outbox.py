@@ -0,0 +1,44 @@
+from datetime import datetime
+from database.db import db
+
+
+class EmailOutbox(db.Model):
+    __tablename__ = 'email_outbox'
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    # Type de message : rdv_user, rdv_admin, verification, password_reset
+    kind = db.Column(db.String(30), nullable=False)
+
+    # Contenu déjà rendu, prêt à être envoyé
+    sender = db.Column(db.String(120), nullable=False)
+    to_address = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    html = db.Column(db.Text, nullable=False)
+
+    # Réservation liée (pour mettre à jour email_user_sent / email_admin_sent)
+    rdv_id = db.Column(db.Integer, db.ForeignKey('rdv_reservations.id'), nullable=True)
+
+    # Statut et tentatives : pending, sending, sent, failed, skipped
+    status = db.Column(db.String(20), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('idx_email_outbox_due', 'status', 'next_attempt_at'),
+    )
+
+    def __repr__(self):
+        return f'<EmailOutbox {self.id} {self.kind} -> {self.to_address} ({self.status})>'
+
+    def to_params(self) -> dict:
+        return {
+            'from': self.sender,
+            'to': [self.to_address],
+            'subject': self.subject,
+            'html': self.html,
+        }
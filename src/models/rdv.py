@@ -1,6 +1,9 @@
 from datetime import datetime
 from database.db import db
 
+# Statuts qui occupent un créneau
+ACTIVE_STATUSES = ('pending', 'confirmed')
+
 
 class RDV(db.Model):
     __tablename__ = 'rdv_reservations'
@@ -39,9 +42,33 @@ class RDV(db.Model):
     email_admin_sent = db.Column(db.Boolean, default=False)
     email_user_sent = db.Column(db.Boolean, default=False)
 
+    # Un seul RDV actif par créneau : garanti par la base, même sous concurrence
+    __table_args__ = (
+        db.Index(
+            'uq_rdv_active_slot', 'date_rdv', 'heure_rdv',
+            unique=True,
+            postgresql_where=db.text("statut IN ('pending', 'confirmed')"),
+            sqlite_where=db.text("statut IN ('pending', 'confirmed')"),
+        ),
+        # Historique des réservations d'un email (/rdv/mes-reservations)
+        db.Index('idx_rdv_email_date', 'email', 'date_rdv'),
+    )
+
     def __repr__(self):
         return f'<RDV {self.nom} {self.prenom} - {self.date_rdv} {self.heure_rdv}>'
 
+    def to_summary_dict(self):
+        """Projection allégée pour l'historique des réservations"""
+        return {
+            'id': self.id,
+            'type_rdv': self.type_rdv,
+            'consultation_type': self.consultation_type,
+            'sujet': self.sujet,
+            'date_rdv': self.date_rdv.isoformat() if self.date_rdv else None,
+            'heure_rdv': self.heure_rdv,
+            'statut': self.statut,
+        }
+
     def to_dict(self):
         return {
             'id': self.id,
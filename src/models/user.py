@@ -1,6 +1,6 @@
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from database.db import db
+from password_hashing import hash_password, verify_password, needs_rehash
 
 
 class User(db.Model):
@@ -35,11 +35,41 @@ class User(db.Model):
     def __repr__(self):
         return f'<User {self.username}>'
 
+    @staticmethod
+    def normalize_email(email: str) -> str:
+        return (email or '').strip().lower()
+
+    @classmethod
+    def find_by_email(cls, email: str):
+        """Recherche insensible à la casse, servie par l'index idx_users_email_lower"""
+        return cls.query.filter(db.func.lower(cls.email) == cls.normalize_email(email)).first()
+
+    @classmethod
+    def find_by_login(cls, identifier: str):
+        """
+        Utilisateur correspondant à un identifiant de connexion (username ou email).
+        Deux recherches indexées plutôt qu'un OR sur deux colonnes : un username
+        sans '@' ne peut pas être un email valide.
+        """
+        if '@' in identifier:
+            user = cls.find_by_email(identifier)
+            if user:
+                return user
+        return cls.query.filter_by(username=identifier).first()
+
     def set_password(self, password: str) -> None:
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password: str) -> bool:
-        return check_password_hash(self.password_hash, password)
+        """
+        Vérifier le mot de passe. Si le hash utilise un ancien réglage de coût,
+        il est recalculé ; l'appelant le sauvegarde avec son commit.
+        """
+        if not verify_password(self.password_hash, password):
+            return False
+        if needs_rehash(self.password_hash):
+            self.password_hash = hash_password(password)
+        return True
 
     def to_dict(self) -> dict:
         return {
@@ -59,6 +89,10 @@ class User(db.Model):
         }
 
 
+# Recherches d'email insensibles à la casse (login, forgot_password, register)
+db.Index('idx_users_email_lower', db.func.lower(User.email))
+
+
 class UserProgress(db.Model):
     __tablename__ = 'user_progress'
 
@@ -71,6 +105,11 @@ class UserProgress(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     completed_at = db.Column(db.DateTime, nullable=True)
 
+    # Une ligne par étape : cible de l'upsert de /progress et /progress/batch
+    __table_args__ = (
+        db.Index('uq_user_progress_step', 'user_id', 'category', 'step', unique=True),
+    )
+
     def to_dict(self) -> dict:
         return {
             'id': self.id,
@@ -0,0 +1,117 @@
+"""
+Hachage des mots de passe hors du worker HTTP.
+
+Le KDF (scrypt par défaut chez Werkzeug) occupe un cœur pendant des dizaines
+de millisecondes. Les calculs sont envoyés à un petit pool de process
+(PASSWORD_HASH_WORKERS par worker gunicorn) avec un nombre de calculs en
+vol borné : un pic de logins ne peut pas monopoliser tous les cœurs, et avec
+des workers gunicorn à threads les autres requêtes continuent d'être servies
+pendant l'attente.
+
+Nombre total de process de hachage = workers gunicorn (WEB_CONCURRENCY)
+x PASSWORD_HASH_WORKERS. Par défaut les cœurs sont répartis entre les
+workers (au plus 2 process par worker).
+
+Le pool utilise le contexte multiprocessing "forkserver" : forker un worker
+gunicorn à threads (threads DB, email, verrous tenus) peut bloquer le fils.
+
+PASSWORD_HASH_METHOD fixe le coût (ex: "scrypt:32768:8:1",
+"pbkdf2:sha256:600000"). Les hash créés avec un autre réglage sont
+recalculés au prochain login réussi (voir User.check_password).
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, check_password_hash, generate_password_hash
+
+HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+# WEB_CONCURRENCY = nombre de workers gunicorn (lu aussi par gunicorn)
+_WEB_WORKERS = max(int(os.environ.get('WEB_CONCURRENCY', 1)), 1)
+POOL_SIZE = int(os.environ.get('PASSWORD_HASH_WORKERS', min(2, max((os.cpu_count() or 1) // _WEB_WORKERS, 1))))
+# Calculs en attente + en cours au maximum ; au-delà les requêtes attendent leur tour
+MAX_IN_FLIGHT = int(os.environ.get('PASSWORD_HASH_MAX_IN_FLIGHT', POOL_SIZE * 4))
+TIMEOUT_SECONDS = float(os.environ.get('PASSWORD_HASH_TIMEOUT_SECONDS', 10))
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+_in_flight = threading.BoundedSemaphore(max(MAX_IN_FLIGHT, 1))
+
+
+class PasswordHashingBusy(Exception):
+    """Trop de calculs de hash en attente"""
+
+
+def _get_executor():
+    """Pool créé au premier usage, dans chaque process (après le fork de gunicorn)"""
+    global _executor, _executor_pid
+    if _executor is None or _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor is None or _executor_pid != os.getpid():
+                # forkserver : les fils partent d'un process vierge à un seul
+                # thread, pas du worker (fork d'un process multithreadé)
+                _executor = ProcessPoolExecutor(
+                    max_workers=POOL_SIZE,
+                    mp_context=multiprocessing.get_context('forkserver' if os.name == 'posix' else 'spawn'),
+                )
+                _executor_pid = os.getpid()
+    return _executor
+
+
+def _run(fn, *args):
+    if POOL_SIZE <= 0:
+        return fn(*args)
+    if not _in_flight.acquire(timeout=TIMEOUT_SECONDS):
+        raise PasswordHashingBusy()
+    try:
+        return _get_executor().submit(fn, *args).result(timeout=TIMEOUT_SECONDS)
+    except FuturesTimeoutError:
+        raise PasswordHashingBusy()
+    except BrokenProcessPool:
+        # Un process du pool est mort (OOM...) : on recrée le pool au prochain appel
+        print("[warn] Password hashing pool broken, restarting it", flush=True)
+        shutdown()
+        return fn(*args)
+    finally:
+        _in_flight.release()
+
+
+def hash_password(password):
+    return _run(generate_password_hash, password, HASH_METHOD)
+
+
+def verify_password(password_hash, password):
+    return _run(check_password_hash, password_hash, password)
+
+
+def _normalize_method(method):
+    """
+    Méthode avec ses paramètres explicites, comme Werkzeug les applique :
+    "scrypt" -> ("scrypt", 32768, 8, 1), "pbkdf2" -> ("pbkdf2", "sha256", 1000000)
+    """
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        defaults = [2 ** 15, 8, 1]
+        return (name, *(int(value) for value in args + defaults[len(args):]))
+    if name == 'pbkdf2':
+        return (name, args[0] if args else 'sha256', int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS)
+    return (name, *args)
+
+
+def needs_rehash(password_hash):
+    """Le hash a-t-il été créé avec un autre algorithme ou un autre coût ?"""
+    try:
+        return _normalize_method(password_hash.split('$', 1)[0]) != _normalize_method(HASH_METHOD)
+    except ValueError:
+        # Paramètres illisibles : on recalcule au prochain login
+        return True
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,174 @@
+"""
+Profilage SQL par requête (opt-in : SQL_PROFILING=1).
+
+Pour chaque requête Flask, les événements d'engine SQLAlchemy comptent et
+chronomètrent les requêtes SQL. En fin de requête :
+
+- une même instruction exécutée au moins SQL_N_PLUS_ONE_THRESHOLD fois est
+  signalée comme N+1 probable ;
+- une requête plus lente que SQL_SLOW_QUERY_MS est loggée avec la forme de
+  ses paramètres (types, jamais les valeurs) ;
+- pour les requêtes échantillonnées (SQL_PROFILING_SAMPLE_RATE) et celles
+  des admins, la réponse porte un header Server-Timing visible dans les
+  devtools du navigateur :
+
+    Server-Timing: db;dur=4.1;desc="7 requetes", email;dur=1.3, render;dur=2.0, total;dur=7.4
+
+  db = temps SQL, email = préparation des emails (templates, outbox),
+  render = reste du traitement (vue, sérialisation).
+"""
+import functools
+import os
+import random
+import time
+
+import sqlalchemy as sa
+from flask import g, has_request_context, request, session
+
+ENABLED = os.environ.get('SQL_PROFILING', '0') == '1'
+SAMPLE_RATE = float(os.environ.get('SQL_PROFILING_SAMPLE_RATE', 0.01))
+SLOW_QUERY_SECONDS = float(os.environ.get('SQL_SLOW_QUERY_MS', 200)) / 1000
+N_PLUS_ONE_THRESHOLD = int(os.environ.get('SQL_N_PLUS_ONE_THRESHOLD', 5))
+
+
+class RequestProfile:
+    """Requêtes SQL et temps par section d'une requête HTTP"""
+
+    def __init__(self, sampled):
+        self.sampled = sampled
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.statements = {}  # instruction -> nombre d'exécutions
+        self.slow_queries = []  # (durée, instruction, forme des paramètres)
+        self.durations = {'db': 0.0, 'email': 0.0}
+
+    def record_query(self, statement, parameters, executemany, duration):
+        self.query_count += 1
+        self.durations['db'] += duration
+        self.statements[statement] = self.statements.get(statement, 0) + 1
+        if duration >= SLOW_QUERY_SECONDS:
+            self.slow_queries.append((duration, statement, parameter_shape(parameters, executemany)))
+
+    def repeated_statements(self):
+        return [(count, statement) for statement, count in self.statements.items()
+                if count >= N_PLUS_ONE_THRESHOLD]
+
+    def server_timing(self):
+        total = time.perf_counter() - self.started
+        render = max(total - self.durations['db'] - self.durations['email'], 0.0)
+        return ', '.join([
+            f'db;dur={self.durations["db"] * 1000:.1f};desc="{self.query_count} requetes"',
+            f'email;dur={self.durations["email"] * 1000:.1f}',
+            f'render;dur={render * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+
+def current_profile():
+    if not has_request_context():
+        return None
+    return g.get('_sql_profile')
+
+
+def parameter_shape(parameters, executemany=False):
+    """Types des paramètres liés, sans leurs valeurs (pas de données perso dans les logs)"""
+    if executemany:
+        if not parameters:
+            return '[]'
+        return f'{len(parameters)} x {parameter_shape(parameters[0])}'
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(f'{key}: {type(value).__name__}' for key, value in parameters.items()) + '}'
+    if isinstance(parameters, (list, tuple)):
+        return '(' + ', '.join(type(value).__name__ for value in parameters) + ')'
+    return type(parameters).__name__
+
+
+def _short(statement, length=300):
+    statement = ' '.join(statement.split())
+    return statement if len(statement) <= length else statement[:length] + '...'
+
+
+# ============ SECTIONS ============
+
+def span(name):
+    """Décorateur : ajouter la durée de la fonction à la section `name` de la requête en cours"""
+    def decorator(f):
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            profile = current_profile() if ENABLED else None
+            if profile is None:
+                return f(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            finally:
+                profile.durations[name] += time.perf_counter() - start
+        return wrapper
+    return decorator
+
+
+# ============ ÉVÉNEMENTS SQLALCHEMY ============
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_profile() is not None:
+        conn.info.setdefault('profiling_query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile()
+    starts = conn.info.get('profiling_query_start')
+    if profile is None or not starts:
+        return
+    profile.record_query(statement, parameters, executemany, time.perf_counter() - starts.pop())
+
+
+def instrument_engine(engine):
+    if not sa.event.contains(engine, 'before_cursor_execute', _before_cursor_execute):
+        sa.event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        sa.event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+# ============ FLASK ============
+
+def _is_admin():
+    if session.get('user_id') is None:
+        return False
+    from current_user import current_user_snapshot
+    snapshot = current_user_snapshot()
+    return bool(snapshot and snapshot.get('is_admin'))
+
+
+def init_profiling(app):
+    """Activer le profilage SQL si SQL_PROFILING=1"""
+    if not ENABLED:
+        return
+    from database.db import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            instrument_engine(engine)
+
+    print(f"[info] SQL profiling actif (échantillon {SAMPLE_RATE:.0%}, lent > {SLOW_QUERY_SECONDS * 1000:.0f} ms, "
+          f"N+1 >= {N_PLUS_ONE_THRESHOLD})", flush=True)
+
+    @app.before_request
+    def start_sql_profile():
+        g._sql_profile = RequestProfile(sampled=random.random() < SAMPLE_RATE)
+
+    @app.after_request
+    def report_sql_profile(response):
+        profile = g.pop('_sql_profile', None)
+        if profile is None:
+            return response
+
+        endpoint = request.endpoint or request.path
+        for count, statement in profile.repeated_statements():
+            print(f"[warn] N+1 probable sur {endpoint}: {count}x {_short(statement)}", flush=True)
+        for duration, statement, shape in profile.slow_queries:
+            print(f"[warn] Requête SQL lente sur {endpoint} ({duration * 1000:.0f} ms): "
+                  f"{_short(statement)} params={shape}", flush=True)
+
+        # La vérification admin peut elle-même requêter la base : profil déjà détaché
+        if profile.sampled or _is_admin():
+            response.headers['Server-Timing'] = profile.server_timing()
+        return response
@@ -0,0 +1,297 @@
+"""
+Limitation de débit (rate limiting) partagée entre workers gunicorn.
+
+Chaque limite est un token bucket : `max_attempts` jetons, rechargés
+linéairement sur `window_seconds`. Une vérification est O(1) quel que soit
+le nombre de tentatives passées.
+
+Backends (RATE_LIMIT_BACKEND) :
+- sqlite (défaut) : petit fichier SQLite local partagé par les workers du conteneur
+- database : table `rate_limits` de la base principale (plusieurs conteneurs)
+- memory : dictionnaire LRU par process (tests, développement)
+
+Les buckets inactifs depuis plus longtemps que la plus longue fenêtre sont
+pleins, donc équivalents à une absence de ligne : une écriture sur
+RATE_LIMIT_PRUNE_EVERY (tirage aléatoire) les supprime, la table reste bornée
+par le nombre de clients actifs sur la fenêtre.
+
+Identifiant client : l'adresse du pair TCP, ou derrière un proxy (Railway,
+Render) l'entrée de X-Forwarded-For ajoutée par le proxy de confiance.
+TRUSTED_PROXY_HOPS = nombre de proxies devant l'application (0 si exposée
+directement : X-Forwarded-For est alors ignoré, il serait falsifiable).
+"""
+import math
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+import sqlalchemy as sa
+from flask import jsonify, request
+
+# RATE_LIMIT_ENABLED=0 désactive toutes les limites (benchmarks, tests de charge)
+ENABLED = os.environ.get('RATE_LIMIT_ENABLED', '1') == '1'
+TRUSTED_PROXY_HOPS = int(os.environ.get('TRUSTED_PROXY_HOPS', 1))
+PRUNE_EVERY = int(os.environ.get('RATE_LIMIT_PRUNE_EVERY', 200))
+
+
+def forwarded_client_ip(peer, forwarded_for, hops=None):
+    """
+    Même règle que werkzeug ProxyFix(x_for=hops) : la `hops`-ième adresse en
+    partant de la droite de X-Forwarded-For (celle vue par le premier proxy
+    de confiance), sinon l'adresse du pair.
+    """
+    hops = TRUSTED_PROXY_HOPS if hops is None else hops
+    if hops > 0 and forwarded_for:
+        addresses = [address.strip() for address in forwarded_for.split(',')]
+        if len(addresses) >= hops and addresses[-hops]:
+            return addresses[-hops]
+    return peer
+
+
+def get_client_identifier():
+    """Récupérer l'identifiant du client (IP, déjà corrigée par ProxyFix, voir main.py)"""
+    return request.remote_addr or 'unknown'
+
+
+# ============ BACKENDS ============
+
+class MemoryBackend:
+    """Buckets en mémoire du process, bornés en nombre (LRU)"""
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _refill(self, key, capacity, rate, now):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            return capacity
+        tokens, updated_at = bucket
+        return min(capacity, tokens + (now - updated_at) * rate)
+
+    def peek(self, key, capacity, rate):
+        with self._lock:
+            return self._refill(key, capacity, rate, time.time())
+
+    def consume(self, key, capacity, rate, cost=1):
+        now = time.time()
+        with self._lock:
+            tokens = self._refill(key, capacity, rate, now)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return allowed, tokens
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
+
+    def prune(self, older_than):
+        # Déjà borné par max_keys
+        pass
+
+
+class SQLBackend:
+    """
+    Buckets dans une table SQL (SQLite ou Postgres).
+    `consume` est un seul INSERT ... ON CONFLICT DO UPDATE ... RETURNING,
+    atomique même avec plusieurs workers.
+    """
+
+    metadata = sa.MetaData()
+    table = sa.Table(
+        'rate_limits', metadata,
+        sa.Column('key', sa.String(255), primary_key=True),
+        sa.Column('tokens', sa.Float, nullable=False),
+        sa.Column('updated_at', sa.Float, nullable=False),
+        sa.Column('allowed', sa.Integer, nullable=False),
+    )
+
+    def __init__(self, engine_factory, create_table=False):
+        # engine_factory : appelé au premier usage (après le fork de gunicorn)
+        self._engine_factory = engine_factory
+        self._engine = None
+        self._create_table = create_table
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    engine = self._engine_factory()
+                    if self._create_table:
+                        self.metadata.create_all(engine, checkfirst=True)
+                    self._engine = engine
+        return self._engine
+
+    def peek(self, key, capacity, rate):
+        with self.engine.connect() as connection:
+            row = connection.execute(
+                sa.select(self.table.c.tokens, self.table.c.updated_at).where(self.table.c.key == key)
+            ).first()
+        if row is None:
+            return capacity
+        return min(capacity, row.tokens + (time.time() - row.updated_at) * rate)
+
+    def consume(self, key, capacity, rate, cost=1):
+        params = {'key': key, 'capacity': capacity, 'rate': rate, 'cost': cost, 'now': time.time()}
+        refill = (
+            "CASE WHEN rate_limits.tokens + (:now - rate_limits.updated_at) * :rate > :capacity "
+            "THEN :capacity ELSE rate_limits.tokens + (:now - rate_limits.updated_at) * :rate END"
+        )
+        statement = sa.text(
+            "INSERT INTO rate_limits (key, tokens, updated_at, allowed) "
+            "VALUES (:key, :capacity - :cost, :now, 1) "
+            "ON CONFLICT (key) DO UPDATE SET "
+            f"tokens = CASE WHEN {refill} >= :cost THEN {refill} - :cost ELSE {refill} END, "
+            f"allowed = CASE WHEN {refill} >= :cost THEN 1 ELSE 0 END, "
+            "updated_at = :now "
+            "RETURNING allowed, tokens"
+        )
+        with self.engine.begin() as connection:
+            allowed, tokens = connection.execute(statement, params).one()
+        return bool(allowed), tokens
+
+    def reset(self, key):
+        with self.engine.begin() as connection:
+            connection.execute(self.table.delete().where(self.table.c.key == key))
+
+    def prune(self, older_than):
+        """Supprimer les buckets inactifs depuis `older_than` (timestamp) : ils sont pleins"""
+        with self.engine.begin() as connection:
+            connection.execute(self.table.delete().where(self.table.c.updated_at < older_than))
+
+
+def _sqlite_file_engine():
+    path = os.environ.get('RATE_LIMIT_SQLITE_PATH') or os.path.join(
+        tempfile.gettempdir(), 'etudiantesolidaire-ratelimit.db'
+    )
+    engine = sa.create_engine(f'sqlite:///{path}', connect_args={'timeout': 5})
+
+    @sa.event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, _record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        cursor.close()
+
+    return engine
+
+
+def _database_engine():
+    from database.db import db
+    return db.engine
+
+
+def create_backend(name=None):
+    name = name or os.environ.get('RATE_LIMIT_BACKEND', 'sqlite')
+    if name == 'memory':
+        return MemoryBackend(max_keys=int(os.environ.get('RATE_LIMIT_MAX_KEYS', 10000)))
+    if name == 'database':
+        return SQLBackend(_database_engine)
+    if name == 'sqlite':
+        return SQLBackend(_sqlite_file_engine, create_table=True)
+    raise ValueError(f"RATE_LIMIT_BACKEND inconnu: {name}")
+
+
+backend = create_backend()
+
+
+# ============ LIMITES ============
+
+class RateLimit:
+    """Une limite nommée : `max_attempts` sur `window_seconds` par identifiant"""
+
+    # Plus longue fenêtre déclarée : au-delà, un bucket inactif est plein
+    max_window = 0
+
+    def __init__(self, name, max_attempts, window_seconds):
+        self.name = name
+        self.capacity = max_attempts
+        self.rate = max_attempts / window_seconds
+        RateLimit.max_window = max(RateLimit.max_window, window_seconds)
+
+    def _key(self, identifier):
+        return f'{self.name}:{identifier}'
+
+    def _retry_after(self, tokens):
+        return max(int(math.ceil((1 - tokens) / self.rate)), 1)
+
+    def check(self, identifier):
+        """
+        Vérifier sans consommer (ex : login, où seuls les échecs comptent).
+        Retourne (is_limited: bool, remaining_time: int en secondes)
+        """
+        if not ENABLED:
+            return False, 0
+        try:
+            tokens = backend.peek(self._key(identifier), self.capacity, self.rate)
+        except Exception as e:
+            print(f"[warn] Rate limit '{self.name}' indisponible: {e}", flush=True)
+            return False, 0
+        if tokens < 1:
+            return True, self._retry_after(tokens)
+        return False, 0
+
+    def hit(self, identifier):
+        """Consommer une tentative. Retourne (is_limited, remaining_time)."""
+        if not ENABLED:
+            return False, 0
+        try:
+            allowed, tokens = backend.consume(self._key(identifier), self.capacity, self.rate)
+            if PRUNE_EVERY > 0 and random.randrange(PRUNE_EVERY) == 0:
+                backend.prune(time.time() - RateLimit.max_window)
+        except Exception as e:
+            print(f"[warn] Rate limit '{self.name}' indisponible: {e}", flush=True)
+            return False, 0
+        if not allowed:
+            return True, self._retry_after(tokens)
+        return False, 0
+
+    def record(self, identifier):
+        """Enregistrer une tentative échouée"""
+        self.hit(identifier)
+
+    def clear(self, identifier):
+        """Effacer les tentatives (ex : après une connexion réussie)"""
+        try:
+            backend.reset(self._key(identifier))
+        except Exception as e:
+            print(f"[warn] Rate limit '{self.name}' indisponible: {e}", flush=True)
+
+
+def too_many_requests(remaining_time, message='Trop de requêtes'):
+    minutes = remaining_time // 60
+    seconds = remaining_time % 60
+    response = jsonify({'error': f'{message}. Réessayez dans {minutes}m {seconds}s'})
+    response.headers['Retry-After'] = str(remaining_time)
+    return response, 429
+
+
+def rate_limited(limit, message='Trop de requêtes'):
+    """Décorateur : une tentative consommée par appel, par adresse IP"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            is_limited, remaining_time = limit.hit(get_client_identifier())
+            if is_limited:
+                return too_many_requests(remaining_time, message)
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+
+login_limit = RateLimit('login', max_attempts=5, window_seconds=5 * 60)
+forgot_password_limit = RateLimit('forgot_password', max_attempts=5, window_seconds=15 * 60)
+resend_verification_limit = RateLimit('resend_verification', max_attempts=3, window_seconds=15 * 60)
+reservation_limit = RateLimit('reservation', max_attempts=10, window_seconds=60 * 60)
@@ -0,0 +1,296 @@
+"""
+Export et import en masse des réservations (CSV ou NDJSON).
+
+    GET  /api/admin/rdv/export?format=csv|ndjson&from=2025-01-01&to=2025-02-01&statut=pending,confirmed
+    POST /api/admin/rdv/import   (corps text/csv ou application/x-ndjson, header X-CSRF-Token)
+
+    flask --app app rdv export --format csv --from 2025-01-01 -o reservations.csv
+    flask --app app rdv import reservations.csv
+
+L'export lit la table avec un curseur côté serveur (yield_per) et envoie
+les lignes au fil de l'eau : la mémoire reste constante quelle que soit la
+taille de la table.
+
+L'import valide chaque ligne avec les règles de validate_rdv_form, puis
+traite les lignes par lots : un seul SELECT par lot vérifie les créneaux
+déjà occupés (date, heure) IN (...), et les lignes valides sont insérées
+en un seul INSERT multi-lignes. Aucun email n'est envoyé. Le cache des
+disponibilités est invalidé pour les dates de chaque lot dès son commit.
+"""
+import csv
+import io
+import json
+import re
+from datetime import datetime
+
+import click
+import sqlalchemy as sa
+from flask.cli import AppGroup
+
+from availability_cache import availability_cache
+from database.db import db
+from models.rdv import RDV, ACTIVE_STATUSES
+from routes.rdv import validate_rdv_form
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+EXPORT_BATCH = 2000
+IMPORT_BATCH = 1000
+# Détail des lignes rejetées renvoyé au plus pour ce nombre de lignes
+MAX_REPORTED_ERRORS = 100
+
+STATUSES = ('pending', 'confirmed', 'cancelled', 'completed')
+HEURE_PATTERN = re.compile(r'^([01]\d|2[0-3]):[0-5]\d$')
+
+EXPORT_COLUMNS = (
+    'id', 'prenom', 'nom', 'email', 'telephone', 'pays', 'type_rdv', 'consultation_type',
+    'sujet', 'message', 'date_rdv', 'heure_rdv', 'statut', 'created_at', 'updated_at', 'user_id',
+)
+IMPORT_TEXT_COLUMNS = (
+    'prenom', 'nom', 'email', 'telephone', 'pays', 'type_rdv', 'consultation_type',
+    'sujet', 'message', 'date_rdv', 'heure_rdv', 'statut',
+)
+
+
+# ============ EXPORT ============
+
+def parse_export_filters(date_from=None, date_to=None, statuts=None):
+    """Filtres SQL (ValueError si une date ou un statut est invalide). `date_to` est exclu."""
+    filters = []
+    if date_from:
+        filters.append(RDV.date_rdv >= datetime.strptime(date_from, '%Y-%m-%d').date())
+    if date_to:
+        filters.append(RDV.date_rdv < datetime.strptime(date_to, '%Y-%m-%d').date())
+    if statuts:
+        values = [s.strip() for s in statuts.split(',') if s.strip()]
+        unknown = set(values) - set(STATUSES)
+        if unknown:
+            raise ValueError(f"Statut inconnu: {', '.join(sorted(unknown))}")
+        filters.append(RDV.statut.in_(values))
+    return filters
+
+
+def _export_value(value):
+    # date et datetime
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def export_rows(filters):
+    """Tuples (dans l'ordre EXPORT_COLUMNS), lus par lots de EXPORT_BATCH"""
+    query = (
+        sa.select(*(RDV.__table__.c[name] for name in EXPORT_COLUMNS))
+        .where(*filters)
+        .order_by(RDV.id)
+        .execution_options(yield_per=EXPORT_BATCH)
+    )
+    for row in db.session.execute(query):
+        yield tuple(_export_value(value) for value in row)
+
+
+def generate_export(filters, export_format):
+    """Morceaux de texte à envoyer (un par lot de lignes)"""
+    buffer = io.StringIO()
+    if export_format == 'csv':
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+    pending = 0
+    for row in export_rows(filters):
+        if export_format == 'csv':
+            writer.writerow(['' if value is None else value for value in row])
+        else:
+            buffer.write(json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + '\n')
+        pending += 1
+        if pending >= EXPORT_BATCH:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+# ============ IMPORT ============
+
+def read_import_rows(stream, import_format):
+    """(numéro de ligne, dict) depuis un flux texte (CSV avec en-tête, ou NDJSON)"""
+    if import_format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(stream, start=1):
+        line = line.strip()
+        if line:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield number, row if isinstance(row, dict) else {'_invalid': line}
+
+
+def validate_import_row(row):
+    """(valeurs pour l'INSERT, None) ou (None, erreurs)"""
+    if '_invalid' in row:
+        return None, {'ligne': 'JSON invalide'}
+    data = {name: '' if row.get(name) is None else str(row.get(name)).strip() for name in IMPORT_TEXT_COLUMNS}
+
+    errors = validate_rdv_form(data)
+    date_obj = None
+    if 'date_rdv' not in errors:
+        try:
+            date_obj = datetime.strptime(data['date_rdv'], '%Y-%m-%d').date()
+        except ValueError:
+            errors['date_rdv'] = 'Date invalide (YYYY-MM-DD)'
+    if 'heure_rdv' not in errors and not HEURE_PATTERN.match(data['heure_rdv']):
+        errors['heure_rdv'] = 'Heure invalide (HH:MM)'
+    statut = data['statut'] or 'pending'
+    if statut not in STATUSES:
+        errors['statut'] = f"Statut invalide ({', '.join(STATUSES)})"
+
+    user_id = row.get('user_id')
+    if user_id in ('', None):
+        user_id = None
+    else:
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            errors['user_id'] = 'user_id invalide'
+    if errors:
+        return None, errors
+
+    now = datetime.utcnow()
+    return dict(
+        prenom=data['prenom'], nom=data['nom'], email=data['email'], telephone=data['telephone'],
+        pays=data['pays'], type_rdv=data['type_rdv'], consultation_type=data['consultation_type'],
+        sujet=data['sujet'], message=data['message'], date_rdv=date_obj, heure_rdv=data['heure_rdv'],
+        statut=statut, user_id=user_id, created_at=now, updated_at=now,
+        email_user_sent=False, email_admin_sent=False,
+    ), None
+
+
+def _occupied_slots(slots):
+    """Créneaux (date, heure) de `slots` déjà pris par une réservation active, en une requête"""
+    if not slots:
+        return set()
+    rows = db.session.execute(
+        sa.select(RDV.date_rdv, RDV.heure_rdv).where(
+            sa.tuple_(RDV.date_rdv, RDV.heure_rdv).in_(list(slots)),
+            RDV.statut.in_(ACTIVE_STATUSES),
+        )
+    )
+    return {(row.date_rdv, row.heure_rdv) for row in rows}
+
+
+class ImportReport:
+    def __init__(self):
+        self.inserted = 0
+        self.rejected = 0
+        self.errors = []
+
+    def reject(self, line, errors):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def to_dict(self):
+        return {'inserted': self.inserted, 'rejected': self.rejected,
+                'errors': sorted(self.errors, key=lambda error: error['line'])}
+
+
+def _import_batch(batch, report):
+    """batch = [(numéro de ligne, valeurs)] déjà validées"""
+    active = {}
+    for line, values in batch:
+        if values['statut'] in ACTIVE_STATUSES:
+            active.setdefault((values['date_rdv'], values['heure_rdv']), []).append(line)
+    taken = _occupied_slots(active.keys())
+
+    accepted = []
+    for line, values in batch:
+        slot = (values['date_rdv'], values['heure_rdv'])
+        if values['statut'] in ACTIVE_STATUSES:
+            if slot in taken:
+                report.reject(line, {'slot': 'Créneau déjà réservé'})
+                continue
+            if active[slot][0] != line:
+                report.reject(line, {'slot': 'Créneau en double dans le fichier'})
+                continue
+        accepted.append((line, values))
+    if not accepted:
+        return
+    rows = [values for _, values in accepted]
+
+    try:
+        db.session.execute(sa.insert(RDV.__table__), rows)
+        db.session.commit()
+    except sa.exc.IntegrityError:
+        # Réservation concurrente entre la vérification et l'INSERT : le lot est rejeté en entier
+        db.session.rollback()
+        for line, _ in accepted:
+            report.reject(line, {'slot': 'Conflit avec une réservation concurrente, réessayer'})
+        return
+    report.inserted += len(rows)
+    # Tout de suite : un import long (ou interrompu) ne laisse pas de créneaux
+    # déjà pris affichés comme libres
+    for date_obj in {values['date_rdv'] for values in rows}:
+        availability_cache.invalidate(date_obj)
+
+
+def import_rows(rows):
+    """
+    Valider et insérer des (numéro de ligne, dict) par lots de IMPORT_BATCH.
+    Retourne un ImportReport.
+    """
+    report = ImportReport()
+    batch = []
+    for line, row in rows:
+        values, errors = validate_import_row(row)
+        if errors:
+            report.reject(line, errors)
+            continue
+        batch.append((line, values))
+        if len(batch) >= IMPORT_BATCH:
+            _import_batch(batch, report)
+            batch = []
+    if batch:
+        _import_batch(batch, report)
+    return report
+
+
+# ============ CLI ============
+
+rdv_cli = AppGroup('rdv', help='Export et import des réservations')
+
+
+def _format_from_path(path, default='csv'):
+    return 'ndjson' if path and path.endswith(('.ndjson', '.jsonl')) else default
+
+
+@rdv_cli.command('export')
+@click.option('--format', 'export_format', type=click.Choice(EXPORT_FORMATS), default=None)
+@click.option('--from', 'date_from', default=None, help='Date de début (YYYY-MM-DD, incluse)')
+@click.option('--to', 'date_to', default=None, help='Date de fin (YYYY-MM-DD, exclue)')
+@click.option('--statut', default=None, help='Statuts séparés par des virgules')
+@click.option('-o', '--output', type=click.Path(dir_okay=False), default=None)
+def export_command(export_format, date_from, date_to, statut, output):
+    """Exporter les réservations (stdout par défaut)"""
+    try:
+        filters = parse_export_filters(date_from, date_to, statut)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    export_format = export_format or _format_from_path(output)
+    with click.open_file(output or '-', 'w', encoding='utf-8') as f:
+        for chunk in generate_export(filters, export_format):
+            f.write(chunk)
+
+
+@rdv_cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+@click.option('--format', 'import_format', type=click.Choice(EXPORT_FORMATS), default=None)
+def import_command(path, import_format):
+    """Importer des réservations depuis un fichier CSV ou NDJSON"""
+    import_format = import_format or _format_from_path(path)
+    with click.open_file(path, 'r', encoding='utf-8-sig') as f:
+        report = import_rows(read_import_rows(f, import_format))
+    for error in report.errors:
+        print(f"[warn] Ligne {error['line']}: {error['errors']}")
+    print(f"✅ {report.inserted} réservation(s) importée(s), {report.rejected} rejetée(s)")
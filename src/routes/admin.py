@@ -0,0 +1,80 @@
+import io
+from functools import wraps
+
+from flask import Blueprint, Response, jsonify, request, session, stream_with_context
+
+from current_user import current_user_is_admin
+from database.routing import read_replica
+from rdv_transfer import EXPORT_FORMATS, generate_export, import_rows, parse_export_filters, read_import_rows
+from routes.user import validate_csrf_token
+
+admin_bp = Blueprint('admin', __name__)
+
+
+def admin_required(f):
+    """Session d'un utilisateur admin"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return jsonify({'error': 'Non authentifié'}), 401
+        if not current_user_is_admin():
+            return jsonify({'error': 'Accès refusé'}), 403
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+# ============ EXPORT / IMPORT DES RÉSERVATIONS ============
+
+@admin_bp.route('/rdv/export', methods=['GET'])
+@admin_required
+@read_replica
+def export_rdv():
+    """
+    Export des réservations en streaming :
+    /admin/rdv/export?format=csv|ndjson&from=2025-01-01&to=2025-02-01&statut=pending,confirmed
+    """
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': 'format doit valoir csv ou ndjson'}), 400
+    try:
+        filters = parse_export_filters(request.args.get('from'), request.args.get('to'), request.args.get('statut'))
+    except ValueError:
+        return jsonify({'error': 'Paramètres de filtre invalides'}), 400
+
+    mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    response = Response(stream_with_context(generate_export(filters, export_format)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename=reservations.{export_format}'
+    return response
+
+
+@admin_bp.route('/rdv/import', methods=['POST'])
+@admin_required
+def import_rdv():
+    """
+    Import en masse : corps text/csv (avec en-tête) ou application/x-ndjson.
+    Retourne le nombre de lignes importées et le détail des lignes rejetées.
+    """
+    if not validate_csrf_token(request.headers.get('X-CSRF-Token') or ''):
+        return jsonify({'error': 'CSRF token invalide'}), 403
+
+    content_type = request.mimetype
+    if content_type == 'text/csv':
+        import_format = 'csv'
+    elif content_type in ('application/x-ndjson', 'application/jsonl'):
+        import_format = 'ndjson'
+    else:
+        return jsonify({'error': 'Content-Type doit être text/csv ou application/x-ndjson'}), 415
+
+    try:
+        # Lecture du corps au fil de l'eau, sans le charger en entier
+        stream = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='')
+        report = import_rows(read_import_rows(stream, import_format))
+    except UnicodeDecodeError:
+        return jsonify({'error': 'Le fichier doit être encodé en UTF-8'}), 400
+    except Exception as e:
+        print(f"Erreur lors de l'import des réservations: {e}")
+        return jsonify({'error': "Erreur lors de l'import des réservations"}), 500
+
+    return jsonify({'success': True, **report.to_dict()}), 200
+
+# ============ FIN EXPORT / IMPORT DES RÉSERVATIONS ============
@@ -0,0 +1,47 @@
+import os
+import secrets
+from functools import wraps
+
+from flask import Blueprint, Response, jsonify, request
+
+from database.db import db
+from database.pool import pool_snapshot
+from metrics import render_prometheus
+
+internal_bp = Blueprint('internal', __name__)
+
+
+def require_internal_token(f):
+    """
+    Endpoints d'exploitation : header X-Internal-Token == INTERNAL_METRICS_TOKEN.
+    Sans INTERNAL_METRICS_TOKEN configuré, les endpoints n'existent pas (404).
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        expected = os.environ.get('INTERNAL_METRICS_TOKEN')
+        if not expected:
+            return jsonify({'error': 'Route introuvable'}), 404
+        token = request.headers.get('X-Internal-Token') or ''
+        if not secrets.compare_digest(token, expected):
+            return jsonify({'error': 'Unauthorized'}), 401
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+@internal_bp.route('/pool', methods=['GET'])
+@require_internal_token
+def pool_stats():
+    """État du pool de connexions de ce worker (checked out, attente, overflow, timeouts)"""
+    engines = {}
+    for bind_key, engine in db.engines.items():
+        snapshot = pool_snapshot(engine)
+        if snapshot is not None:
+            engines[bind_key or 'primary'] = snapshot
+    return jsonify({'pid': os.getpid(), 'engines': engines}), 200
+
+
+@internal_bp.route('/metrics', methods=['GET'])
+@require_internal_token
+def prometheus_metrics():
+    """Métriques de tous les workers au format texte Prometheus"""
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
@@ -1,23 +1,24 @@
-from flask import Blueprint, jsonify, request, current_app
-from models.rdv import RDV
+from flask import Blueprint, jsonify, request
+from sqlalchemy.orm import load_only
+from models.rdv import RDV, ACTIVE_STATUSES
 from database.db import db
+from database.routing import read_replica
 from datetime import datetime, timedelta
 import os
 import re
-import threading
-from email_utils import send_email_rdv_confirmation
+from email_utils import queue_rdv_confirmation_emails
+from email_queue import notify_outbox
+from availability_cache import availability_cache
+from conditional import not_modified_response, with_etag, revision_etag
+from rate_limit import rate_limited, reservation_limit
 
 rdv_bp = Blueprint('rdv', __name__)
 
+# Plage maximale pour /rdv/disponibilites?from=&to= (un peu plus qu'un mois affiché)
+MAX_DISPONIBILITES_RANGE_DAYS = 62
 
-def send_email_async(rdv, app):
-    """Envoyer les emails dans un thread séparé pour ne pas bloquer"""
-    with app.app_context():
-        try:
-            send_email_rdv_confirmation(rdv)
-            print(f"✅ Emails envoyés pour la réservation {rdv.id}")
-        except Exception as e:
-            print(f"❌ Erreur lors de l'envoi des emails: {e}")
+MES_RESERVATIONS_PAGE_DEFAULT = 20
+MES_RESERVATIONS_PAGE_MAX = 100
 
 
 def validate_email(email):
@@ -60,33 +61,45 @@ def validate_rdv_form(data):
     return errors
 
 
-def is_slot_available(date_str, time_str):
-    """Vérifier si un créneau est disponible"""
-    try:
-        # Convertir la date string en objet date si nécessaire
-        if isinstance(date_str, str):
-            from datetime import datetime
-            try:
-                date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
-            except:
-                date_obj = date_str
-        else:
-            date_obj = date_str
+def insert_rdv_if_slot_free(values):
+    """
+    Insérer une réservation en une seule instruction SQL.
+    INSERT ... ON CONFLICT DO NOTHING sur l'index unique partiel
+    uq_rdv_active_slot : retourne le RDV créé, ou None si le créneau est déjà pris.
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"Base de données non supportée pour la réservation atomique: {dialect}")
+
+    stmt = (
+        insert(RDV)
+        .values(**values)
+        .on_conflict_do_nothing(
+            index_elements=[RDV.date_rdv, RDV.heure_rdv],
+            index_where=RDV.statut.in_(ACTIVE_STATUSES),
+        )
+        .returning(RDV)
+    )
+    return db.session.scalars(stmt).first()
 
-        # Chercher s'il y a déjà une réservation confirmée à cette date/heure
-        existing_rdv = RDV.query.filter(
-            RDV.date_rdv == date_obj,
-            RDV.heure_rdv == time_str,
-            RDV.statut.in_(['pending', 'confirmed'])
-        ).first()
 
-        return existing_rdv is None
-    except Exception as e:
-        print(f"Erreur dans is_slot_available: {e}")
-        return False
+def load_heures_occupees(date_obj):
+    """Heures des réservations actives d'une date (seule la colonne heure_rdv est lue)"""
+    rows = db.session.execute(
+        db.select(RDV.heure_rdv).where(
+            RDV.date_rdv == date_obj,
+            RDV.statut.in_(ACTIVE_STATUSES)
+        )
+    ).scalars().all()
+    return list(rows)
 
 
 @rdv_bp.route('/rdv/reserver', methods=['POST'])
+@rate_limited(reservation_limit)
 def reserver_rdv():
     """Créer une nouvelle réservation de RDV"""
     try:
@@ -97,24 +110,15 @@ def reserver_rdv():
         if errors:
             return jsonify({'error': 'Données invalides', 'details': errors}), 400
 
-        # Vérifier que le créneau est disponible
-        if not is_slot_available(data['date_rdv'], data['heure_rdv']):
-            return jsonify({
-                'error': 'Ce créneau est déjà réservé',
-                'details': {'slot': 'Ce créneau n\'est plus disponible. Veuillez en choisir un autre.'}
-            }), 409
-
-        # Créer la réservation
         # Convertir la date string en objet date
-        date_obj = data['date_rdv']
-        if isinstance(date_obj, str):
-            from datetime import datetime
-            try:
-                date_obj = datetime.strptime(date_obj, '%Y-%m-%d').date()
-            except:
-                pass  # Garder le string si la conversion échoue
+        try:
+            date_obj = datetime.strptime(data['date_rdv'], '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'error': 'Données invalides', 'details': {'date_rdv': 'Date invalide (YYYY-MM-DD)'}}), 400
 
-        rdv = RDV(
+        # Créer la réservation : la disponibilité du créneau est vérifiée par
+        # la base dans le même INSERT (pas de SELECT préalable, pas de course)
+        rdv = insert_rdv_if_slot_free(dict(
             prenom=data['prenom'],
             nom=data['nom'],
             email=data['email'],
@@ -128,15 +132,19 @@ def reserver_rdv():
             heure_rdv=data['heure_rdv'],
             statut='pending',
             user_id=data.get('user_id')
-        )
+        ))
+        if rdv is None:
+            db.session.rollback()
+            return jsonify({
+                'error': 'Ce créneau est déjà réservé',
+                'details': {'slot': 'Ce créneau n\'est plus disponible. Veuillez en choisir un autre.'}
+            }), 409
 
-        db.session.add(rdv)
+        # Les emails partent dans la même transaction que la réservation (outbox)
+        queue_rdv_confirmation_emails(rdv)
         db.session.commit()
-
-        # Envoyer les emails dans un thread séparé (non-bloquant)
-        email_thread = threading.Thread(target=send_email_async, args=(rdv, current_app._get_current_object()))
-        email_thread.daemon = True
-        email_thread.start()
+        notify_outbox()
+        availability_cache.slot_booked(date_obj, data['heure_rdv'])
 
         return jsonify({
             'success': True,
@@ -155,26 +163,89 @@ def get_disponibilites(date):
     """Récupérer les créneau occupés pour une date donnée"""
     try:
         # Convertir la date string en objet date
-        from datetime import datetime
         try:
             date_obj = datetime.strptime(date, '%Y-%m-%d').date()
-        except:
-            date_obj = date
+        except ValueError:
+            return jsonify({'error': 'Format de date invalide (YYYY-MM-DD)'}), 400
 
-        # Récupérer toutes les réservations confirmées/pending pour cette date
-        rdvs = RDV.query.filter(
-            RDV.date_rdv == date_obj,
-            RDV.statut.in_(['pending', 'confirmed'])
-        ).all()
+        # 304 sur la seule version partagée de la date, sans lire le cache
+        etag = revision_etag('disponibilites', availability_cache.versions, date_obj)
+        response = not_modified_response(etag, private=False)
+        if response is not None:
+            return response
 
-        # Extraire les heures occupées
-        heures_occupees = [rdv.heure_rdv for rdv in rdvs]
+        # Servi depuis le cache du worker ; la base n'est lue qu'en cas de miss
+        heures_occupees, total = availability_cache.get(date_obj, load_heures_occupees)
 
-        return jsonify({
+        return with_etag(jsonify({
             'date': date,
             'heures_occupees': heures_occupees,
-            'total_reservations': len(rdvs)
-        }), 200
+            'total_reservations': total
+        }), etag, private=False), 200
+
+    except Exception as e:
+        print(f"Erreur lors de la récupération des disponibilités: {e}")
+        return jsonify({'error': 'Erreur lors de la récupération des disponibilités'}), 500
+
+
+@rdv_bp.route('/rdv/disponibilites', methods=['GET'])
+def get_disponibilites_range():
+    """
+    Récupérer les créneaux occupés sur une plage de dates (vue calendrier)
+    en une seule requête SQL : /rdv/disponibilites?from=YYYY-MM-DD&to=YYYY-MM-DD
+    """
+    try:
+        try:
+            date_from = datetime.strptime(request.args.get('from', ''), '%Y-%m-%d').date()
+            date_to = datetime.strptime(request.args.get('to', ''), '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'error': 'Paramètres from et to requis (YYYY-MM-DD)'}), 400
+
+        if date_to < date_from:
+            return jsonify({'error': 'La date de fin doit être après la date de début'}), 400
+        if (date_to - date_from).days + 1 > MAX_DISPONIBILITES_RANGE_DAYS:
+            return jsonify({'error': f'Plage limitée à {MAX_DISPONIBILITES_RANGE_DAYS} jours'}), 400
+
+        dates = [date_from + timedelta(days=i) for i in range((date_to - date_from).days + 1)]
+
+        # L'ETag dépend uniquement des versions partagées du cache : un 304
+        # est renvoyé sans aucune requête SQL.
+        versions = availability_cache.versions_for(dates)
+        etag = revision_etag('disponibilites-range', availability_cache.versions, (date_from, date_to), versions)
+        response = not_modified_response(etag, private=False)
+        if response is not None:
+            return response
+
+        rows = db.session.execute(
+            db.select(RDV.date_rdv, RDV.heure_rdv, db.func.count())
+            .where(
+                RDV.date_rdv >= date_from,
+                RDV.date_rdv <= date_to,
+                RDV.statut.in_(ACTIVE_STATUSES)
+            )
+            .group_by(RDV.date_rdv, RDV.heure_rdv)
+            .order_by(RDV.date_rdv, RDV.heure_rdv)
+        ).all()
+
+        heures_par_jour = {date_obj: [] for date_obj in dates}
+        for date_rdv, heure_rdv, count in rows:
+            heures_par_jour[date_rdv].extend([heure_rdv] * count)
+
+        # Pré-remplir le cache par jour : les clics suivants sur une date n'iront pas en base
+        for date_obj, version in zip(dates, versions):
+            availability_cache.prime(date_obj, version, heures_par_jour[date_obj])
+
+        response = jsonify({
+            'from': date_from.isoformat(),
+            'to': date_to.isoformat(),
+            # Seuls les jours avec au moins une réservation sont listés
+            'jours': {
+                date_obj.isoformat(): sorted(set(heures))
+                for date_obj, heures in heures_par_jour.items() if heures
+            },
+            'total_reservations': sum(count for _, _, count in rows)
+        })
+        return with_etag(response, etag, private=False), 200
 
     except Exception as e:
         print(f"Erreur lors de la récupération des disponibilités: {e}")
@@ -182,17 +253,60 @@ def get_disponibilites(date):
 
 
 @rdv_bp.route('/rdv/mes-reservations', methods=['GET'])
+@read_replica
 def mes_reservations():
-    """Récupérer les réservations d'un utilisateur (optionnel si connecté)"""
+    """
+    Récupérer les réservations d'un utilisateur (optionnel si connecté),
+    paginées par curseur sur (date_rdv, id) via l'index idx_rdv_email_date :
+    /rdv/mes-reservations?email=...&scope=upcoming|past|all&limit=20&cursor=<next_cursor>
+    Les RDV à venir sont triés du plus proche au plus lointain, les autres du plus récent au plus ancien.
+    """
     try:
         email = request.args.get('email')
         if not email:
             return jsonify({'error': 'Email requis'}), 400
 
-        rdvs = RDV.query.filter_by(email=email).order_by(RDV.date_rdv.desc()).all()
+        scope = request.args.get('scope', 'all')
+        if scope not in ('upcoming', 'past', 'all'):
+            return jsonify({'error': 'scope doit valoir upcoming, past ou all'}), 400
+        limit = min(max(request.args.get('limit', MES_RESERVATIONS_PAGE_DEFAULT, type=int), 1), MES_RESERVATIONS_PAGE_MAX)
+
+        cursor = None
+        if request.args.get('cursor'):
+            try:
+                cursor_date, cursor_id = request.args['cursor'].split('_', 1)
+                cursor = (datetime.strptime(cursor_date, '%Y-%m-%d').date(), int(cursor_id))
+            except ValueError:
+                return jsonify({'error': 'Curseur invalide'}), 400
+
+        today = datetime.utcnow().date()
+        ascending = scope == 'upcoming'
+        query = db.select(RDV).options(load_only(
+            RDV.id, RDV.type_rdv, RDV.consultation_type, RDV.sujet,
+            RDV.date_rdv, RDV.heure_rdv, RDV.statut
+        )).where(RDV.email == email)
+
+        if scope == 'upcoming':
+            query = query.where(RDV.date_rdv >= today)
+        elif scope == 'past':
+            query = query.where(RDV.date_rdv < today)
+
+        position = db.tuple_(RDV.date_rdv, RDV.id)
+        if cursor:
+            query = query.where(position > cursor if ascending else position < cursor)
+        if ascending:
+            query = query.order_by(RDV.date_rdv.asc(), RDV.id.asc())
+        else:
+            query = query.order_by(RDV.date_rdv.desc(), RDV.id.desc())
+
+        rdvs = db.session.execute(query.limit(limit)).scalars().all()
+        next_cursor = None
+        if len(rdvs) == limit:
+            next_cursor = f'{rdvs[-1].date_rdv.isoformat()}_{rdvs[-1].id}'
 
         return jsonify({
-            'reservations': [rdv.to_dict() for rdv in rdvs]
+            'reservations': [rdv.to_summary_dict() for rdv in rdvs],
+            'next_cursor': next_cursor
         }), 200
 
     except Exception as e:
@@ -213,8 +327,11 @@ def annuler_rdv(rdv_id):
         if rdv.email != email:
             return jsonify({'error': 'Non autorisé'}), 401
 
+        was_active = rdv.statut in ACTIVE_STATUSES
         rdv.statut = 'cancelled'
         db.session.commit()
+        if was_active:
+            availability_cache.slot_released(rdv.date_rdv, rdv.heure_rdv)
 
         return jsonify({
             'success': True,
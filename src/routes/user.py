@@ -1,65 +1,27 @@
-from flask import Blueprint, jsonify, request, session
+from flask import Blueprint, Response, jsonify, request, session, stream_with_context
 from models.user import User, UserProgress, UserBookmark
 from database.db import db
+from database.routing import read_replica
 from datetime import datetime, timedelta
+import json
 import re
 import os
 import secrets
-import resend
-from jinja2 import Template
-
-# Initialize Resend API key
-resend.api_key = os.environ.get('RESEND_API_KEY')
+from email_queue import enqueue_email, notify_outbox
+from email_templates import render
+from password_hashing import PasswordHashingBusy
+from current_user import current_user, current_user_is_admin, current_user_snapshot, invalidate_user, user_cache
+from conditional import (
+    bookmark_revisions, conditional_json, not_modified_response, progress_revisions,
+    revision_etag, with_etag
+)
+from rate_limit import (
+    get_client_identifier, login_limit, forgot_password_limit,
+    resend_verification_limit, rate_limited, too_many_requests
+)
 
 user_bp = Blueprint('user', __name__)
 
-# ============ RATE LIMITING ============
-# Dictionnaire pour tracker les tentatives échouées : {username_or_ip: [timestamp1, timestamp2, ...]}
-login_attempts = {}
-
-def get_client_identifier():
-    """Récupérer l'identifiant du client (IP)"""
-    return request.remote_addr or request.headers.get('X-Forwarded-For', 'unknown').split(',')[0]
-
-def check_rate_limit(identifier, max_attempts=5, window_minutes=5):
-    """
-    Vérifier si le client a dépassé la limite de tentatives.
-    Retourne (is_limited: bool, remaining_time: int en secondes)
-    """
-    now = datetime.utcnow()
-    window = timedelta(minutes=window_minutes)
-
-    # Nettoyer les anciennes tentatives
-    if identifier in login_attempts:
-        login_attempts[identifier] = [
-            attempt_time for attempt_time in login_attempts[identifier]
-            if now - attempt_time < window
-        ]
-
-    # Vérifier si on a dépassé la limite
-    if identifier in login_attempts and len(login_attempts[identifier]) >= max_attempts:
-        # Calculer le temps avant que la première tentative sort de la fenêtre
-        oldest_attempt = login_attempts[identifier][0]
-        reset_time = oldest_attempt + window
-        remaining_seconds = int((reset_time - now).total_seconds())
-        return True, remaining_seconds
-
-    return False, 0
-
-def record_failed_attempt(identifier):
-    """Enregistrer une tentative échouée"""
-    now = datetime.utcnow()
-    if identifier not in login_attempts:
-        login_attempts[identifier] = []
-    login_attempts[identifier].append(now)
-
-def clear_attempts(identifier):
-    """Effacer les tentatives après une connexion réussie"""
-    if identifier in login_attempts:
-        del login_attempts[identifier]
-
-# ============ FIN RATE LIMITING ============
-
 # ============ CSRF PROTECTION ============
 def generate_csrf_token():
     """Générer un nouveau token CSRF"""
@@ -99,54 +61,16 @@ def require_csrf_token(f):
 # ============ FIN CSRF PROTECTION ============
 
 # ============ ÉTAPE 6 : EMAIL VERIFICATION ============
-def send_verification_email(user_email: str, verification_token: str, user_name: str = ''):
-    """Envoyer un email de vérification via Resend API"""
-    try:
-        resend_api_key = os.environ.get('RESEND_API_KEY')
-        frontend_url = os.environ.get('FRONTEND_URL', 'https://etudiantesolidaire.com')
-
-        if not resend_api_key:
-            print(f"⚠️ RESEND_API_KEY not set, skipping email to {user_email}", flush=True)
-            return True  # Retourner True pour ne pas bloquer l'inscription
-
-        # Créer le lien de vérification
-        verification_url = f"{frontend_url}/verify-email?token={verification_token}"
-
-        # Email HTML
-        html_content = f"""
-        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-            <h2>Bienvenue sur Étudiant Solidaire ! 🎓</h2>
-            <p>Bonjour {user_name},</p>
-            <p>Merci de vous être inscrit sur notre plateforme. Pour activer votre compte, veuillez vérifier votre adresse email en cliquant sur le bouton ci-dessous.</p>
-            <p style="margin: 30px 0;">
-                <a href="{verification_url}" style="background-color: #0066cc; color: white; padding: 12px 30px; text-decoration: none; border-radius: 5px; display: inline-block;">
-                    Vérifier mon email
-                </a>
-            </p>
-            <p>Ou copiez ce lien dans votre navigateur :</p>
-            <p><code>{verification_url}</code></p>
-            <p>Ce lien est valide pendant 24 heures.</p>
-            <hr style="border: none; border-top: 1px solid #ddd; margin: 20px 0;">
-            <p style="color: #666; font-size: 12px;">
-                Si vous n'avez pas créé ce compte, ignorez cet email.
-            </p>
-        </div>
-        """
-
-        resend.Emails.send({
-            "from": "noreply@etudiantesolidaire.com",
-            "to": user_email,
-            "subject": "Vérifiez votre email - Étudiant Solidaire",
-            "html": html_content
-        })
-
-        print(f"✅ Email de vérification envoyé à {user_email}", flush=True)
-        return True
-    except Exception as e:
-        print(f"❌ Erreur lors de l'envoi d'email : {str(e)}", flush=True)
-        import traceback
-        traceback.print_exc()
-        return True  # Retourner True pour ne pas bloquer l'inscription même si email échoue
+def queue_verification_email(user_email: str, verification_token: str, user_name: str = ''):
+    """Ajouter l'email de vérification à l'outbox (envoyé par le worker email)"""
+    frontend_url = os.environ.get('FRONTEND_URL', 'https://etudiantesolidaire.com')
+
+    # Créer le lien de vérification
+    verification_url = f"{frontend_url}/verify-email?token={verification_token}"
+
+    html_content = render('verification', user_name=user_name, verification_url=verification_url)
+
+    enqueue_email('verification', user_email, 'Vérifiez votre email - Étudiant Solidaire', html_content)
 
 def generate_verification_token():
     """Générer un token de vérification email"""
@@ -180,54 +104,16 @@ def validate_email(email):
     return bool(re.match(email_pattern, email))
 
 # ============ ÉTAPE 7 : PASSWORD RESET ============
-def send_password_reset_email(user_email: str, reset_token: str, user_name: str = ''):
-    """Envoyer un email de réinitialisation de mot de passe via Resend API"""
-    try:
-        resend_api_key = os.environ.get('RESEND_API_KEY')
-        frontend_url = os.environ.get('FRONTEND_URL', 'https://etudiantesolidaire.com')
-
-        if not resend_api_key:
-            print(f"⚠️ RESEND_API_KEY not set, skipping email to {user_email}", flush=True)
-            return True
-
-        # Créer le lien de réinitialisation
-        reset_url = f"{frontend_url}/reset-password?token={reset_token}"
-
-        # Email HTML
-        html_content = f"""
-        <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-            <h2>Réinitialiser votre mot de passe 🔐</h2>
-            <p>Bonjour {user_name},</p>
-            <p>Vous avez demandé la réinitialisation de votre mot de passe. Cliquez sur le bouton ci-dessous pour créer un nouveau mot de passe.</p>
-            <p style="margin: 30px 0;">
-                <a href="{reset_url}" style="background-color: #0066cc; color: white; padding: 12px 30px; text-decoration: none; border-radius: 5px; display: inline-block;">
-                    Réinitialiser mon mot de passe
-                </a>
-            </p>
-            <p>Ou copiez ce lien dans votre navigateur :</p>
-            <p><code>{reset_url}</code></p>
-            <p>Ce lien est valide pendant 1 heure.</p>
-            <hr style="border: none; border-top: 1px solid #ddd; margin: 20px 0;">
-            <p style="color: #666; font-size: 12px;">
-                Si vous n'avez pas demandé cette réinitialisation, ignorez cet email. Votre mot de passe reste inchangé.
-            </p>
-        </div>
-        """
-
-        resend.Emails.send({
-            "from": "noreply@etudiantesolidaire.com",
-            "to": user_email,
-            "subject": "Réinitialiser votre mot de passe - Étudiant Solidaire",
-            "html": html_content
-        })
-
-        print(f"✅ Email de réinitialisation envoyé à {user_email}", flush=True)
-        return True
-    except Exception as e:
-        print(f"❌ Erreur lors de l'envoi d'email : {str(e)}", flush=True)
-        import traceback
-        traceback.print_exc()
-        return True
+def queue_password_reset_email(user_email: str, reset_token: str, user_name: str = ''):
+    """Ajouter l'email de réinitialisation de mot de passe à l'outbox"""
+    frontend_url = os.environ.get('FRONTEND_URL', 'https://etudiantesolidaire.com')
+
+    # Créer le lien de réinitialisation
+    reset_url = f"{frontend_url}/reset-password?token={reset_token}"
+
+    html_content = render('password_reset', user_name=user_name, reset_url=reset_url)
+
+    enqueue_email('password_reset', user_email, 'Réinitialiser votre mot de passe - Étudiant Solidaire', html_content)
 
 def generate_password_reset_token():
     """Générer un token de réinitialisation de mot de passe"""
@@ -263,7 +149,7 @@ def register():
 
         if User.query.filter_by(username=data['username']).first():
             return jsonify({'error': "Ce nom d'utilisateur existe déjà"}), 400
-        if User.query.filter_by(email=data['email']).first():
+        if User.find_by_email(data['email']):
             return jsonify({'error': "Cet email est déjà utilisé"}), 400
 
         user = User(
@@ -285,11 +171,12 @@ def register():
         # ============ FIN ÉTAPE 6 ============
 
         db.session.add(user)
-        db.session.commit()
 
-        # Envoyer l'email de vérification
+        # L'email de vérification est écrit dans l'outbox avec l'utilisateur
         user_name = data.get('first_name', data.get('username', 'Utilisateur'))
-        send_verification_email(user.email, verification_token, user_name)
+        queue_verification_email(user.email, verification_token, user_name)
+        db.session.commit()
+        notify_outbox()
 
         session['user_id'] = user.id
         session['username'] = user.username
@@ -298,6 +185,9 @@ def register():
             'user': user.to_dict(),
             'email_verified': False
         }), 201
+    except PasswordHashingBusy:
+        db.session.rollback()
+        return jsonify({'error': 'Serveur occupé, réessayez dans quelques secondes'}), 503
     except Exception as e:
         db.session.rollback()
         print(f"❌ Erreur lors de l'inscription : {str(e)}", flush=True)
@@ -329,6 +219,7 @@ def verify_email(token):
         user.email_verification_token = None
         user.email_token_expires_at = None
         db.session.commit()
+        invalidate_user(user.id)
 
         return jsonify({
             'message': 'Email vérifié avec succès !',
@@ -339,6 +230,7 @@ def verify_email(token):
         return jsonify({'error': f'Erreur lors de la vérification: {str(e)}'}), 500
 
 @user_bp.route('/resend-verification-email', methods=['POST'])
+@rate_limited(resend_verification_limit)
 def resend_verification_email():
     """Renvoyer l'email de vérification"""
     try:
@@ -348,7 +240,7 @@ def resend_verification_email():
         if not email:
             return jsonify({'error': 'Email requis'}), 400
 
-        user = User.query.filter_by(email=email).first()
+        user = User.find_by_email(email)
 
         if not user:
             return jsonify({'error': 'Utilisateur non trouvé'}), 404
@@ -361,14 +253,12 @@ def resend_verification_email():
         verification_token = generate_verification_token()
         user.email_verification_token = verification_token
         user.email_token_expires_at = datetime.utcnow() + timedelta(hours=24)
-        db.session.commit()
 
-        # Envoyer l'email (non-bloquant)
-        try:
-            user_name = user.first_name or user.username
-            send_verification_email(user.email, verification_token, user_name)
-        except Exception as e:
-            print(f"⚠️ Email non-envoyé mais token généré: {str(e)}", flush=True)
+        # L'email est envoyé par le worker email (outbox)
+        user_name = user.first_name or user.username
+        queue_verification_email(user.email, verification_token, user_name)
+        db.session.commit()
+        notify_outbox()
 
         return jsonify({'message': 'Email de vérification renvoyé avec succès.'}), 200
     except Exception as e:
@@ -377,6 +267,7 @@ def resend_verification_email():
         return jsonify({'error': f'Erreur: {str(e)}'}), 500
 
 @user_bp.route('/forgot-password', methods=['POST'])
+@rate_limited(forgot_password_limit)
 def forgot_password():
     """Demander la réinitialisation du mot de passe"""
     try:
@@ -389,7 +280,7 @@ def forgot_password():
         if not validate_email(email):
             return jsonify({'error': 'Format email invalide'}), 400
 
-        user = User.query.filter(User.email.ilike(email)).first()
+        user = User.find_by_email(email)
 
         # On retourne toujours le même message pour ne pas révéler si un email existe
         if not user:
@@ -399,14 +290,12 @@ def forgot_password():
         reset_token = generate_password_reset_token()
         user.password_reset_token = reset_token
         user.password_reset_expires_at = datetime.utcnow() + timedelta(hours=1)
-        db.session.commit()
 
-        # Envoyer l'email (non-bloquant)
-        try:
-            user_name = user.first_name or user.username
-            send_password_reset_email(user.email, reset_token, user_name)
-        except Exception as e:
-            print(f"⚠️ Email de reset non-envoyé mais token généré: {str(e)}", flush=True)
+        # L'email est envoyé par le worker email (outbox)
+        user_name = user.first_name or user.username
+        queue_password_reset_email(user.email, reset_token, user_name)
+        db.session.commit()
+        notify_outbox()
 
         return jsonify({'message': 'Si cet email existe dans notre système, un lien de réinitialisation sera envoyé.'}), 200
     except Exception as e:
@@ -448,11 +337,15 @@ def reset_password(token):
         user.password_reset_token = None
         user.password_reset_expires_at = None
         db.session.commit()
+        invalidate_user(user.id)
 
         return jsonify({
             'message': 'Mot de passe réinitialisé avec succès ! Vous pouvez maintenant vous connecter.',
             'user': user.to_dict()
         }), 200
+    except PasswordHashingBusy:
+        db.session.rollback()
+        return jsonify({'error': 'Serveur occupé, réessayez dans quelques secondes'}), 503
     except Exception as e:
         db.session.rollback()
         print(f"❌ Erreur reset_password: {str(e)}", flush=True)
@@ -472,36 +365,34 @@ def login():
         if not data.get('username') or not data.get('password'):
             return jsonify({'error': 'Username et password sont requis'}), 400
 
-        # Vérifier le rate limiting
+        # Vérifier le rate limiting (partagé entre workers, voir rate_limit.py)
         client_id = get_client_identifier()
-        is_limited, remaining_time = check_rate_limit(client_id)
+        is_limited, remaining_time = login_limit.check(client_id)
         if is_limited:
-            minutes = remaining_time // 60
-            seconds = remaining_time % 60
-            return jsonify({
-                'error': f'Trop de tentatives échouées. Réessayez dans {minutes}m {seconds}s'
-            }), 429
-
-        user = User.query.filter(
-            (User.username == data['username']) | (User.email == data['username'])
-        ).first()
+            return too_many_requests(remaining_time, 'Trop de tentatives échouées')
+
+        user = User.find_by_login(data['username'])
         if not user or not user.check_password(data['password']):
             # Enregistrer la tentative échouée
-            record_failed_attempt(client_id)
+            login_limit.record(client_id)
             return jsonify({'error': 'Identifiants incorrects'}), 401
         if not user.is_active:
-            record_failed_attempt(client_id)
+            login_limit.record(client_id)
             return jsonify({'error': 'Compte désactivé'}), 401
 
         # Connexion réussie : effacer les tentatives échouées
-        clear_attempts(client_id)
+        login_limit.clear(client_id)
 
         user.last_login = datetime.utcnow()
         db.session.commit()
+        invalidate_user(user.id)
 
         session['user_id'] = user.id
         session['username'] = user.username
         return jsonify({'message': 'Connexion réussie', 'user': user.to_dict()}), 200
+    except PasswordHashingBusy:
+        db.session.rollback()
+        return jsonify({'error': 'Serveur occupé, réessayez dans quelques secondes'}), 503
     except Exception:
         return jsonify({'error': 'Erreur lors de la connexion'}), 500
 
@@ -514,10 +405,15 @@ def logout():
 def get_profile():
     if 'user_id' not in session:
         return jsonify({'error': 'Non authentifié'}), 401
-    user = User.query.get(session['user_id'])
+    # ETag = révision de l'utilisateur : un 304 ne lit ni le cache ni la base
+    etag = revision_etag('profile', user_cache.versions, session['user_id'])
+    response = not_modified_response(etag)
+    if response is not None:
+        return response
+    user = current_user_snapshot()
     if not user:
         return jsonify({'error': 'Utilisateur non trouvé'}), 404
-    return jsonify(user.to_dict()), 200
+    return with_etag(jsonify(user), etag), 200
 
 @user_bp.route('/profile', methods=['PUT'])
 def update_profile():
@@ -531,7 +427,7 @@ def update_profile():
         if not csrf_token or not validate_csrf_token(csrf_token):
             return jsonify({'error': 'CSRF token invalide'}), 403
 
-        user = User.query.get(session['user_id'])
+        user = current_user()
         if not user:
             return jsonify({'error': 'Utilisateur non trouvé'}), 404
 
@@ -549,12 +445,13 @@ def update_profile():
         if 'email' in data:
             if not validate_email(data['email']):
                 return jsonify({'error': 'Format email invalide'}), 400
-            existing_user = User.query.filter_by(email=data['email']).first()
+            existing_user = User.find_by_email(data['email'])
             if existing_user and existing_user.id != user.id:
                 return jsonify({'error': 'Cet email est déjà utilisé'}), 400
             user.email = data['email']
 
         db.session.commit()
+        invalidate_user(user.id)
         return jsonify(user.to_dict()), 200
     except Exception:
         db.session.rollback()
@@ -575,7 +472,7 @@ def change_password():
         if not data.get('current_password') or not data.get('new_password'):
             return jsonify({'error': 'Mot de passe actuel et nouveau mot de passe requis'}), 400
 
-        user = User.query.get(session['user_id'])
+        user = current_user()
         if not user:
             return jsonify({'error': 'Utilisateur non trouvé'}), 404
         if not user.check_password(data['current_password']):
@@ -588,46 +485,187 @@ def change_password():
 
         user.set_password(data['new_password'])
         db.session.commit()
+        invalidate_user(user.id)
         return jsonify({'message': 'Mot de passe modifié avec succès'}), 200
+    except PasswordHashingBusy:
+        db.session.rollback()
+        return jsonify({'error': 'Serveur occupé, réessayez dans quelques secondes'}), 503
     except Exception:
         db.session.rollback()
         return jsonify({'error': 'Erreur lors du changement de mot de passe'}), 500
 
 @user_bp.route('/progress', methods=['GET'])
+@read_replica
 def get_progress():
     if 'user_id' not in session:
         return jsonify({'error': 'Non authentifié'}), 401
-    progress = UserProgress.query.filter_by(user_id=session['user_id']).all()
-    return jsonify([p.to_dict() for p in progress]), 200
+    user_id = session['user_id']
+
+    def build():
+        return [p.to_dict() for p in UserProgress.query.filter_by(user_id=user_id).all()]
+
+    return conditional_json(revision_etag('progress', progress_revisions, user_id), build)
+
+PROGRESS_BATCH_MAX = 200
+
+
+def parse_progress_step(item):
+    """(valeurs, None) ou (None, message d'erreur) pour une étape envoyée par le client"""
+    if not isinstance(item, dict):
+        return None, 'Objet attendu'
+    category, step = item.get('category'), item.get('step')
+    if not isinstance(category, str) or not category.strip() or len(category) > 100:
+        return None, 'category requis (100 caractères max)'
+    if not isinstance(step, str) or not step.strip() or len(step) > 100:
+        return None, 'step requis (100 caractères max)'
+    notes = item.get('notes')
+    if notes is not None and not isinstance(notes, str):
+        return None, 'notes doit être une chaîne'
+    return {'category': category, 'step': step, 'completed': bool(item.get('completed', False)), 'notes': notes}, None
+
+
+def _existing_progress_steps(user_id, keys):
+    """(category, step) parmi `keys` qui ont déjà une ligne pour cet utilisateur"""
+    rows = db.session.execute(
+        db.select(UserProgress.category, UserProgress.step).where(
+            UserProgress.user_id == user_id,
+            db.tuple_(UserProgress.category, UserProgress.step).in_(list(keys)),
+        )
+    )
+    return {(row.category, row.step) for row in rows}
+
+
+def upsert_progress_steps(user_id, steps):
+    """
+    Créer ou mettre à jour plusieurs étapes avec
+    INSERT ... ON CONFLICT (user_id, category, step) DO UPDATE.
+    completed_at n'est posé que lors du passage à "complété" (et effacé si
+    l'étape ne l'est plus). notes absent (None) : '' pour une nouvelle étape,
+    notes existantes conservées sinon (une instruction pour les étapes avec
+    notes, une pour celles sans).
+    Retourne [(ligne à jour, créée ?)]. Le commit est fait par l'appelant.
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"Base de données non supportée pour l'upsert de progression: {dialect}")
+
+    now = datetime.utcnow()
+    # Une étape envoyée deux fois : la dernière l'emporte (un upsert ne peut pas toucher deux fois la même ligne)
+    unique_steps = {(s['category'], s['step']): s for s in steps}
+    if dialect == 'postgresql':
+        # xmax = 0 : ligne insérée par cette instruction (pas de conflit)
+        inserted_column = db.literal_column('(xmax = 0)').label('inserted')
+    else:
+        # SQLite sérialise les écritures : les étapes existantes sont lues avant l'upsert
+        existing = _existing_progress_steps(user_id, unique_steps.keys())
+        inserted_column = None
+
+    results = []
+    for keep_notes in (False, True):
+        group = [s for s in unique_steps.values() if (s['notes'] is None) == keep_notes]
+        if not group:
+            continue
+        stmt = insert(UserProgress).values([
+            dict(user_id=user_id, category=s['category'], step=s['step'], completed=s['completed'],
+                 notes='' if keep_notes else s['notes'], created_at=now,
+                 completed_at=now if s['completed'] else None)
+            for s in group
+        ])
+        excluded = stmt.excluded
+        set_ = {
+            'completed': excluded.completed,
+            'completed_at': db.case(
+                (db.and_(excluded.completed, db.not_(db.func.coalesce(UserProgress.completed, db.false()))),
+                 excluded.completed_at),
+                (excluded.completed, UserProgress.completed_at),
+                else_=None,
+            ),
+        }
+        if not keep_notes:
+            set_['notes'] = excluded.notes
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[UserProgress.user_id, UserProgress.category, UserProgress.step],
+            set_=set_,
+        )
+        options = {'populate_existing': True}
+        if inserted_column is not None:
+            for progress, inserted in db.session.execute(stmt.returning(UserProgress, inserted_column),
+                                                         execution_options=options):
+                results.append((progress, bool(inserted)))
+        else:
+            for progress in db.session.scalars(stmt.returning(UserProgress), execution_options=options):
+                results.append((progress, (progress.category, progress.step) not in existing))
+    return results
+
 
 @user_bp.route('/progress', methods=['POST'])
 def add_progress():
     if 'user_id' not in session:
         return jsonify({'error': 'Non authentifié'}), 401
+    values, error = parse_progress_step(request.get_json(silent=True))
+    if error:
+        return jsonify({'error': error}), 400
     try:
-        data = request.get_json() or {}
-        progress = UserProgress(
-            user_id=session['user_id'],
-            category=data['category'],
-            step=data['step'],
-            completed=data.get('completed', False),
-            notes=data.get('notes', '')
-        )
-        if progress.completed:
-            progress.completed_at = datetime.utcnow()
-        db.session.add(progress)
+        progress, inserted = upsert_progress_steps(session['user_id'], [values])[0]
         db.session.commit()
-        return jsonify(progress.to_dict()), 201
+        progress_revisions.bump(progress.user_id)
+        # 201 si l'étape vient d'être créée, 200 si elle existait déjà
+        return jsonify(progress.to_dict()), 201 if inserted else 200
     except Exception:
         db.session.rollback()
         return jsonify({'error': "Erreur lors de l'ajout du progrès"}), 500
 
+@user_bp.route('/progress/batch', methods=['POST'])
+def sync_progress():
+    """
+    Synchroniser plusieurs étapes en un aller-retour :
+    {"steps": [{"category": "visa", "step": "etape-1", "completed": true, "notes": "..."}, ...]}
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Non authentifié'}), 401
+    data = request.get_json(silent=True) or {}
+    items = data.get('steps')
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'steps doit être une liste non vide'}), 400
+    if len(items) > PROGRESS_BATCH_MAX:
+        return jsonify({'error': f'{PROGRESS_BATCH_MAX} étapes maximum par requête'}), 400
+
+    steps = []
+    errors = {}
+    for index, item in enumerate(items):
+        values, error = parse_progress_step(item)
+        if error:
+            errors[str(index)] = error
+        else:
+            steps.append(values)
+    if errors:
+        return jsonify({'error': 'Données invalides', 'details': errors}), 400
+
+    try:
+        rows = upsert_progress_steps(session['user_id'], steps)
+        db.session.commit()
+        progress_revisions.bump(session['user_id'])
+        return jsonify({'success': True, 'progress': [p.to_dict() for p, _ in rows]}), 200
+    except Exception as e:
+        db.session.rollback()
+        print(f"Erreur lors de la synchronisation du progrès: {e}")
+        return jsonify({'error': 'Erreur lors de la synchronisation du progrès'}), 500
+
 @user_bp.route('/bookmarks', methods=['GET'])
+@read_replica
 def get_bookmarks():
     if 'user_id' not in session:
         return jsonify({'error': 'Non authentifié'}), 401
-    bookmarks = UserBookmark.query.filter_by(user_id=session['user_id']).all()
-    return jsonify([b.to_dict() for b in bookmarks]), 200
+    user_id = session['user_id']
+
+    def build():
+        return [b.to_dict() for b in UserBookmark.query.filter_by(user_id=user_id).all()]
+
+    return conditional_json(revision_etag('bookmarks', bookmark_revisions, user_id), build)
 
 @user_bp.route('/bookmarks', methods=['POST'])
 def add_bookmark():
@@ -649,6 +687,7 @@ def add_bookmark():
         )
         db.session.add(bookmark)
         db.session.commit()
+        bookmark_revisions.bump(bookmark.user_id)
         return jsonify(bookmark.to_dict()), 201
     except Exception:
         db.session.rollback()
@@ -674,6 +713,7 @@ def delete_bookmark(bookmark_id):
             return jsonify({'error': 'Favori non trouvé'}), 404
         db.session.delete(bookmark)
         db.session.commit()
+        bookmark_revisions.bump(session['user_id'])
         return jsonify({'message': 'Favori supprimé'}), 200
     except Exception:
         db.session.rollback()
@@ -682,21 +722,92 @@ def delete_bookmark(bookmark_id):
 @user_bp.route('/check-auth', methods=['GET'])
 def check_auth():
     if 'user_id' in session:
-        user = User.query.get(session['user_id'])
+        etag = revision_etag('check-auth', user_cache.versions, session['user_id'])
+        response = not_modified_response(etag)
+        if response is not None:
+            return response
+        user = current_user_snapshot()
         if user:
-            return jsonify({'authenticated': True, 'user': user.to_dict()}), 200
+            return with_etag(jsonify({'authenticated': True, 'user': user}), etag), 200
     return jsonify({'authenticated': False}), 200
 
+# ============ LISTE ADMIN DES UTILISATEURS ============
+USERS_PAGE_DEFAULT = 50
+USERS_PAGE_MAX = 500
+USERS_STREAM_BATCH = 1000
+
+def parse_bool_arg(value):
+    """'true'/'1'/'yes' -> True, 'false'/'0'/'no' -> False, absent -> None"""
+    if value is None or value == '':
+        return None
+    lowered = value.lower()
+    if lowered in ('true', '1', 'yes'):
+        return True
+    if lowered in ('false', '0', 'no'):
+        return False
+    raise ValueError(value)
+
+def build_users_filters(args):
+    """Filtres SQL de /users à partir des paramètres de la requête"""
+    filters = []
+    is_active = parse_bool_arg(args.get('is_active'))
+    if is_active is not None:
+        filters.append(User.is_active.is_(is_active))
+    email_verified = parse_bool_arg(args.get('email_verified'))
+    if email_verified is not None:
+        filters.append(User.email_verified.is_(email_verified))
+    if args.get('created_from'):
+        filters.append(User.created_at >= datetime.fromisoformat(args['created_from']))
+    if args.get('created_to'):
+        filters.append(User.created_at < datetime.fromisoformat(args['created_to']))
+    return filters
+
 @user_bp.route('/users', methods=['GET'])
+@read_replica
 def get_all_users():
+    """
+    Liste des utilisateurs pour les admins, paginée par curseur sur users.id :
+    /users?limit=50&after_id=<next_cursor>&is_active=true&email_verified=false
+          &created_from=2025-01-01&created_to=2025-02-01
+    /users?format=ndjson exporte tous les utilisateurs filtrés en streaming.
+    """
     if 'user_id' not in session:
         return jsonify({'error': 'Non authentifié'}), 401
-    user = User.query.get(session['user_id'])
-    if not user or not getattr(user, 'is_admin', False):
+    if not current_user_is_admin():
         return jsonify({'error': 'Accès refusé'}), 403
-    users = User.query.all()
+
+    try:
+        filters = build_users_filters(request.args)
+        after_id = request.args.get('after_id', type=int)
+        limit = min(max(request.args.get('limit', USERS_PAGE_DEFAULT, type=int), 1), USERS_PAGE_MAX)
+    except ValueError:
+        return jsonify({'error': 'Paramètres de filtre invalides'}), 400
+
+    if after_id is not None:
+        filters.append(User.id > after_id)
+    query = db.select(User).where(*filters).order_by(User.id)
+
+    if request.args.get('format') == 'ndjson':
+        # Curseur côté serveur : les lignes sont lues et envoyées par lots,
+        # le worker ne garde jamais toute la liste en mémoire
+        def generate():
+            rows = db.session.execute(query.execution_options(yield_per=USERS_STREAM_BATCH)).scalars()
+            for row in rows:
+                yield json.dumps(row.to_dict()) + '\n'
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    users = db.session.execute(query.limit(limit)).scalars().all()
     users_list = [u.to_dict() for u in users]
-    return jsonify({'success': True, 'count': len(users_list), 'users': users_list}), 200
+    next_cursor = users[-1].id if len(users) == limit else None
+    return jsonify({
+        'success': True,
+        'count': len(users_list),
+        'users': users_list,
+        'next_cursor': next_cursor
+    }), 200
+
+# ============ FIN LISTE ADMIN DES UTILISATEURS ============
 
 @user_bp.route('/admin/promote', methods=['POST'])
 def promote_admin():
@@ -712,4 +823,5 @@ def promote_admin():
         return jsonify({'error': 'Utilisateur non trouvé'}), 404
     user.is_admin = True
     db.session.commit()
+    invalidate_user(user.id)
     return jsonify({'success': True, 'user': user.to_dict()}), 200
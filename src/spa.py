@@ -0,0 +1,64 @@
+"""
+Service du frontend (build Vite dans src/static) par l'application Flask.
+
+- /assets/* : fichiers dont le nom contient un hash du contenu, servis avec
+  `Cache-Control: public, max-age=1 an, immutable` (un nouveau build change
+  les noms, le navigateur ne revalide jamais).
+- toute autre URL hors /api : le fichier statique s'il existe (favicon...),
+  sinon index.html, servi avec `no-cache` pour que le navigateur revalide
+  (ETag / Last-Modified) et récupère le nouvel index après un déploiement.
+
+Les fichiers passent par send_file : le corps est envoyé via
+wsgi.file_wrapper (sendfile avec gunicorn), sans copie en Python.
+SPA_X_SENDFILE=1 délègue l'envoi à un proxy (nginx X-Accel / X-Sendfile).
+"""
+import os
+
+from flask import abort, jsonify
+from werkzeug.exceptions import NotFound
+
+from compression import send_precompressed
+
+ASSETS_MAX_AGE = int(os.environ.get('SPA_ASSETS_MAX_AGE', 365 * 24 * 3600))
+
+
+def spa_enabled(app):
+    default = '1' if os.path.isfile(os.path.join(app.static_folder, 'index.html')) else '0'
+    return os.environ.get('SPA_ENABLED', default) == '1'
+
+
+def init_spa(app):
+    """Enregistrer les routes du frontend. Retourne False si le mode SPA est désactivé."""
+    if not spa_enabled(app):
+        return False
+
+    app.config['USE_X_SENDFILE'] = os.environ.get('SPA_X_SENDFILE', '0') == '1'
+    static_folder = app.static_folder
+    assets_folder = os.path.join(static_folder, 'assets')
+
+    def send_index():
+        response = send_precompressed(static_folder, 'index.html', max_age=0)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+
+    @app.route('/assets/<path:filename>')
+    def spa_asset(filename):
+        response = send_precompressed(assets_folder, filename, max_age=ASSETS_MAX_AGE)
+        response.headers['Cache-Control'] = f'public, max-age={ASSETS_MAX_AGE}, immutable'
+        return response
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def spa_index(path):
+        if path == 'api' or path.startswith('api/'):
+            return jsonify({'error': 'Route introuvable'}), 404
+        if path.startswith('assets/'):
+            abort(404)
+        if path and path != 'index.html':
+            try:
+                return send_precompressed(static_folder, path, max_age=app.get_send_file_max_age(path))
+            except NotFound:
+                pass
+        return send_index()
+
+    return True
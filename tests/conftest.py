@@ -0,0 +1,78 @@
+"""
+Fixtures communes : application créée par main.create_app() sur une base
+SQLite jetable, migrée avec les migrations versionnées.
+
+    python -m pytest -q
+
+Les emails passent par l'outbox (EMAIL_WORKER_MODE=external : rien n'est
+envoyé) et le rate limiting est désactivé.
+"""
+import itertools
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+_DIRECTORY = tempfile.mkdtemp(prefix='etudiantesolidaire-tests-')
+# Avant l'import de main : l'application est créée à l'import
+os.environ.update({
+    'DATABASE_URL': f"sqlite:///{os.path.join(_DIRECTORY, 'test.db')}",
+    'DB_AUTO_MIGRATE': '0',
+    'EMAIL_WORKER_MODE': 'external',
+    'RATE_LIMIT_ENABLED': '0',
+    'PASSWORD_HASH_WORKERS': '0',
+    'AVAILABILITY_CACHE_FILE': os.path.join(_DIRECTORY, 'availability.bin'),
+    'USER_CACHE_FILE': os.path.join(_DIRECTORY, 'users.bin'),
+    'REVISIONS_DIR': _DIRECTORY,
+    'RATE_LIMIT_SQLITE_PATH': os.path.join(_DIRECTORY, 'ratelimit.db'),
+    'METRICS_DIR': os.path.join(_DIRECTORY, 'metrics'),
+})
+
+import sqlalchemy as sa  # noqa: E402
+
+from database import migrate  # noqa: E402
+
+migrate.upgrade(sa.create_engine(os.environ['DATABASE_URL']), echo=lambda *args: None)
+
+from main import app as flask_app  # noqa: E402
+from database.db import db  # noqa: E402
+from models.user import User  # noqa: E402
+
+_counter = itertools.count(1)
+
+
+@pytest.fixture
+def app():
+    with flask_app.app_context():
+        yield flask_app
+        db.session.rollback()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def user(app):
+    """Utilisateur vérifié, unique par test"""
+    n = next(_counter)
+    user = User(username=f'test{n}', email=f'test{n}@example.com', email_verified=True, password_hash='x')
+    db.session.add(user)
+    db.session.commit()
+    return user
+
+
+@pytest.fixture
+def logged_client(client, user):
+    with client.session_transaction() as session:
+        session['user_id'] = user.id
+    return client
+
+
+def unique_number():
+    return next(_counter)
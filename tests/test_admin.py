@@ -0,0 +1,17 @@
+"""Droit admin relu en base (jamais depuis le cache des utilisateurs)"""
+from database.db import db
+
+
+def test_revoked_admin_loses_access_immediately(logged_client, user):
+    user.is_admin = True
+    db.session.commit()
+    assert logged_client.get('/api/users').status_code == 200
+    # Mise en cache du snapshot (is_admin=True) par check-auth
+    assert logged_client.get('/api/check-auth').status_code == 200
+
+    # Retrait hors de l'API : aucun invalidate_user
+    db.session.execute(db.text('UPDATE users SET is_admin = :admin WHERE id = :id'), {'admin': False, 'id': user.id})
+    db.session.commit()
+
+    assert logged_client.get('/api/users').status_code == 403
+    assert logged_client.get('/api/admin/rdv/export').status_code == 403
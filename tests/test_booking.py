@@ -0,0 +1,58 @@
+"""Réservation atomique : un seul RDV actif par créneau (index uq_rdv_active_slot)"""
+from datetime import date, timedelta
+
+from conftest import unique_number
+from database.db import db
+from models.rdv import RDV
+from routes.rdv import insert_rdv_if_slot_free
+
+
+def booking(day, heure='10:00'):
+    return {
+        'prenom': 'Test', 'nom': 'Booking', 'email': 'booking@example.com', 'pays': 'FR',
+        'type_rdv': 'orientation', 'consultation_type': 'visio',
+        'date_rdv': day.isoformat(), 'heure_rdv': heure,
+    }
+
+
+def free_day():
+    return date(2090, 1, 1) + timedelta(days=unique_number())
+
+
+def test_second_booking_of_a_slot_gets_409(client):
+    day = free_day()
+    first = client.post('/api/rdv/reserver', json=booking(day))
+    second = client.post('/api/rdv/reserver', json=booking(day))
+
+    assert first.status_code == 201
+    assert second.status_code == 409
+    assert 'slot' in second.json['details']
+    assert db.session.query(RDV).filter_by(date_rdv=day, heure_rdv='10:00').count() == 1
+
+
+def test_other_hour_of_the_same_day_is_still_free(client):
+    day = free_day()
+    assert client.post('/api/rdv/reserver', json=booking(day, '10:00')).status_code == 201
+    assert client.post('/api/rdv/reserver', json=booking(day, '11:00')).status_code == 201
+
+
+def test_cancelled_booking_frees_the_slot(app):
+    day = free_day()
+    values = dict(booking(day), date_rdv=day, statut='pending')
+    rdv = insert_rdv_if_slot_free(values)
+    assert rdv is not None
+    assert insert_rdv_if_slot_free(values) is None
+
+    rdv.statut = 'cancelled'
+    db.session.commit()
+    assert insert_rdv_if_slot_free(values) is not None
+    db.session.commit()
+
+
+def test_booked_slot_is_listed_as_unavailable(client):
+    day = free_day()
+    client.post('/api/rdv/reserver', json=booking(day, '14:30'))
+    response = client.get(f'/api/rdv/disponibilites/{day.isoformat()}')
+
+    assert response.status_code == 200
+    assert '14:30' in response.get_data(as_text=True)
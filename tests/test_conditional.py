@@ -0,0 +1,40 @@
+"""ETag / 304 des disponibilités (une date et plage de dates)"""
+from datetime import date, timedelta
+
+import conditional
+from conftest import unique_number
+from test_booking import booking
+
+
+def urls():
+    day = date(2091, 1, 1) + timedelta(days=unique_number() * 10)
+    return day, [f'/api/rdv/disponibilites/{day.isoformat()}',
+                 f'/api/rdv/disponibilites?from={day.isoformat()}&to={(day + timedelta(days=3)).isoformat()}']
+
+
+def test_unchanged_availability_gets_304(client):
+    _, paths = urls()
+    for path in paths:
+        etag = client.get(path).headers['ETag']
+        assert client.get(path, headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_booking_changes_the_etag(client):
+    day, paths = urls()
+    etags = [client.get(path).headers['ETag'] for path in paths]
+    assert client.post('/api/rdv/reserver', json=booking(day)).status_code == 201
+
+    for path, etag in zip(paths, etags):
+        assert client.get(path, headers={'If-None-Match': etag}).status_code == 200
+
+
+def test_etags_expire_with_the_time_epoch(client, monkeypatch):
+    _, paths = urls()
+    monkeypatch.setattr(conditional, 'ETAG_MAX_AGE_SECONDS', 30)
+    monkeypatch.setattr(conditional.time, 'time', lambda: 1_000_000.0)
+    etags = [client.get(path).headers['ETag'] for path in paths]
+
+    # Écriture hors de l'API : aucun compteur incrémenté, l'époque suivante renvoie le corps
+    monkeypatch.setattr(conditional.time, 'time', lambda: 1_000_030.0)
+    for path, etag in zip(paths, etags):
+        assert client.get(path, headers={'If-None-Match': etag}).status_code == 200
@@ -0,0 +1,94 @@
+"""Outbox : envoi par tranches, replanification des seules tranches en échec"""
+from datetime import datetime
+
+import pytest
+
+import email_provider
+import email_queue
+from database.db import db
+from email_provider import EmailProviderError, ResendClient
+from models.outbox import EmailOutbox
+
+
+class FlakyClient(ResendClient):
+    """Client dont la requête numéro `fail_on` (à partir de 1) échoue"""
+
+    def __init__(self, fail_on=None):
+        super().__init__('test', api_url='http://resend.invalid')
+        self.fail_on = fail_on
+        self.payloads = []
+
+    def _post(self, path, payload):
+        self.payloads.append(payload)
+        if len(self.payloads) == self.fail_on:
+            raise EmailProviderError('503 indisponible', status_code=503)
+        if isinstance(payload, list):
+            return {'data': [{'id': f'id-{len(self.payloads)}-{i}'} for i in range(len(payload))]}
+        return {'id': f'id-{len(self.payloads)}'}
+
+
+@pytest.fixture
+def outbox(app, monkeypatch):
+    monkeypatch.setattr(email_provider, 'MAX_BATCH_SIZE', 2)
+    # Messages laissés par d'autres tests (réservations) : hors jeu
+    db.session.query(EmailOutbox).filter(EmailOutbox.status == 'pending').update({'status': 'skipped'})
+    db.session.commit()
+
+    def make(count):
+        messages = [email_queue.enqueue_email('test', f'user{i}@example.com', f'Sujet {i}', '<p>x</p>')
+                    for i in range(count)]
+        db.session.commit()
+        return [message.id for message in messages]
+    return make
+
+
+def deliver(monkeypatch, client, limit):
+    monkeypatch.setattr(email_queue, 'get_email_client', lambda: client)
+    messages = email_queue.claim_due_messages(limit)
+    return messages, email_queue.deliver_messages(messages)
+
+
+def test_all_chunks_accepted(outbox, monkeypatch):
+    ids = outbox(5)
+    client = FlakyClient()
+    messages, sent = deliver(monkeypatch, client, 5)
+
+    assert sent == 5
+    assert [len(p) if isinstance(p, list) else 1 for p in client.payloads] == [2, 2, 1]
+    assert {db.session.get(EmailOutbox, i).status for i in ids} == {'sent'}
+
+
+def test_only_messages_of_the_failed_chunk_are_retried(outbox, monkeypatch):
+    ids = outbox(5)
+    messages, sent = deliver(monkeypatch, FlakyClient(fail_on=2), 5)
+    by_id = {message.id: message for message in messages}
+    order = [message.id for message in messages]
+
+    assert sent == 3
+    failed = order[2:4]
+    for message_id in ids:
+        message = db.session.get(EmailOutbox, message_id)
+        if message_id in failed:
+            assert message.status == 'pending'
+            assert message.next_attempt_at > datetime.utcnow()
+            assert '503' in message.last_error
+        else:
+            assert message.status == 'sent'
+    assert set(by_id) == set(ids)
+
+    # Le nouvel essai ne renvoie que les messages en échec
+    for message_id in failed:
+        db.session.get(EmailOutbox, message_id).next_attempt_at = datetime.utcnow()
+    db.session.commit()
+    retry_client = FlakyClient()
+    retried, sent = deliver(monkeypatch, retry_client, 5)
+    assert sorted(message.id for message in retried) == sorted(failed)
+    assert sent == 2
+
+
+def test_message_is_abandoned_after_max_attempts(outbox, monkeypatch):
+    [message_id] = outbox(1)
+    monkeypatch.setattr(email_queue, 'MAX_ATTEMPTS', 1)
+    deliver(monkeypatch, FlakyClient(fail_on=1), 1)
+
+    assert db.session.get(EmailOutbox, message_id).status == 'failed'
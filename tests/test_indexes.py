@@ -0,0 +1,43 @@
+"""
+Les recherches d'authentification utilisent un index (database/index_checks.py).
+
+SQLite : base de test migrée. Postgres : TEST_POSTGRES_URL=postgresql://...
+(base jetable, migrée par le test), sinon ignoré.
+"""
+import os
+
+import pytest
+import sqlalchemy as sa
+
+from database import migrate
+from database.db import db, normalize_database_url
+from database.index_checks import auth_lookups, check_auth_indexes, explain, uses_index
+from models.user import User
+
+
+def assert_lookups_use_indexes(engine):
+    results = check_auth_indexes(engine)
+    assert set(results) == set(auth_lookups())
+    scans = {name: plan for name, (ok, plan) in results.items() if not ok}
+    assert not scans, f"Recherches sans index : {scans}"
+
+
+def test_auth_lookups_use_indexes_on_sqlite(app):
+    assert_lookups_use_indexes(db.engine)
+
+
+def test_unindexed_lookup_is_reported_as_scan(app):
+    # Contrôle du détecteur : une colonne sans index doit être vue comme un parcours
+    with db.engine.connect() as connection:
+        plan = explain(connection, sa.select(User.id).where(User.first_name == 'x'))
+        assert not uses_index(connection.dialect.name, plan)
+
+
+@pytest.mark.skipif(not os.environ.get('TEST_POSTGRES_URL'), reason='TEST_POSTGRES_URL non défini')
+def test_auth_lookups_use_indexes_on_postgres():
+    engine = sa.create_engine(normalize_database_url(os.environ['TEST_POSTGRES_URL']))
+    try:
+        migrate.upgrade(engine, echo=lambda *args: None)
+        assert_lookups_use_indexes(engine)
+    finally:
+        engine.dispose()
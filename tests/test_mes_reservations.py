@@ -0,0 +1,68 @@
+"""Historique des réservations paginé par curseur (date_rdv, id)"""
+from datetime import date, timedelta
+
+from conftest import unique_number
+from database.db import db
+from models.rdv import RDV
+
+
+def add_rdvs(email, days, heures=('09:00', '10:00')):
+    """Plusieurs RDV par jour : la pagination doit départager sur l'id"""
+    rdvs = [
+        RDV(prenom='Test', nom='Page', email=email, pays='FR', type_rdv='orientation',
+            consultation_type='visio', date_rdv=day, heure_rdv=heure, statut='pending')
+        for day in days for heure in heures
+    ]
+    db.session.add_all(rdvs)
+    db.session.commit()
+    return rdvs
+
+
+def all_pages(client, email, scope, limit):
+    ids, cursor, pages = [], None, 0
+    while True:
+        url = f'/api/rdv/mes-reservations?email={email}&scope={scope}&limit={limit}'
+        response = client.get(url + (f'&cursor={cursor}' if cursor else ''))
+        assert response.status_code == 200
+        ids += [rdv['id'] for rdv in response.json['reservations']]
+        cursor = response.json['next_cursor']
+        pages += 1
+        if cursor is None:
+            return ids, pages
+
+
+def test_pages_cover_every_reservation_once_in_order(client):
+    n = unique_number()
+    email = f'page{n}@example.com'
+    upcoming = add_rdvs(email, [date(2095, 1, 1) + timedelta(days=n * 10 + i) for i in range(3)])
+    past = add_rdvs(email, [date(2001, 1, 1) + timedelta(days=n * 10 + i) for i in range(2)])
+
+    ids, pages = all_pages(client, email, 'upcoming', limit=4)
+    expected = sorted(upcoming, key=lambda r: (r.date_rdv, r.id))
+    assert ids == [r.id for r in expected]
+    assert pages == 2
+
+    ids, _ = all_pages(client, email, 'all', limit=3)
+    expected = sorted(upcoming + past, key=lambda r: (r.date_rdv, r.id), reverse=True)
+    assert ids == [r.id for r in expected]
+
+    ids, _ = all_pages(client, email, 'past', limit=1)
+    assert ids == [r.id for r in sorted(past, key=lambda r: (r.date_rdv, r.id), reverse=True)]
+
+
+def test_exact_multiple_of_limit_ends_with_an_empty_page(client):
+    n = unique_number()
+    email = f'page{n}@example.com'
+    add_rdvs(email, [date(2095, 1, 1) + timedelta(days=n * 10)])
+
+    ids, pages = all_pages(client, email, 'upcoming', limit=2)
+    assert len(ids) == 2
+    assert pages == 2
+
+
+def test_invalid_cursor_and_scope_are_rejected(client):
+    url = '/api/rdv/mes-reservations?email=page@example.com'
+    assert client.get(url + '&cursor=hier_1').status_code == 400
+    assert client.get(url + '&cursor=2025-01-01').status_code == 400
+    assert client.get(url + '&scope=futur').status_code == 400
+    assert client.get('/api/rdv/mes-reservations').status_code == 400
@@ -0,0 +1,89 @@
+"""Métriques multiprocess : fichiers des workers morts repliés dans l'agrégat"""
+import json
+import os
+import threading
+
+import pytest
+
+import metrics
+
+DEAD_PID = 2 ** 22 + 12345  # au-delà de pid_max par défaut : jamais vivant
+
+
+def write_worker_file(directory, name, value):
+    # Écriture atomique, comme metrics.flush
+    metrics._write_json(os.path.join(directory, name),
+                        {'counters': [['http_requests_total', [['endpoint', 'a']], value]], 'histograms': []})
+
+
+def total(counters):
+    return sum(value for (name, _), value in counters.items() if name == 'http_requests_total')
+
+
+@pytest.fixture
+def metrics_directory(tmp_path, monkeypatch):
+    monkeypatch.setenv('METRICS_DIR', str(tmp_path))
+    monkeypatch.setattr(metrics, 'registry', metrics.Registry())
+    return str(tmp_path)
+
+
+def test_dead_and_superseded_worker_files_are_folded(metrics_directory):
+    write_worker_file(metrics_directory, f'metrics-{DEAD_PID}-1.json', 5)
+    write_worker_file(metrics_directory, f'metrics-{DEAD_PID + 1}.json', 7)  # ancien format
+    # pid réutilisé : le fichier le plus ancien du même pid est mort
+    write_worker_file(metrics_directory, f'metrics-{os.getpid()}-1.json', 11)
+
+    counters, _ = metrics.collect()
+
+    assert total(counters) == 23
+    assert sorted(os.listdir(metrics_directory)) == sorted(
+        [metrics.AGGREGATE_FILE, 'metrics.lock', metrics.registry.file_name()])
+    assert total(metrics.collect()[0]) == 23
+
+
+def test_files_listed_as_folded_are_not_counted_twice(metrics_directory):
+    # Arrêt entre l'écriture de l'agrégat et la suppression du fichier replié
+    name = f'metrics-{DEAD_PID}-1.json'
+    write_worker_file(metrics_directory, name, 5)
+    with open(os.path.join(metrics_directory, metrics.AGGREGATE_FILE), 'w') as f:
+        json.dump({'counters': [['http_requests_total', [['endpoint', 'a']], 5]], 'histograms': [],
+                   'folded': [name]}, f)
+
+    assert total(metrics.collect()[0]) == 5
+    assert name not in os.listdir(metrics_directory)
+
+
+def test_totals_stay_monotonic_while_workers_die(metrics_directory):
+    stop = threading.Event()
+    seen = [[] for _ in range(4)]
+
+    def scrape(values):
+        while not stop.is_set():
+            values.append(total(metrics.collect()[0]))
+
+    scrapers = [threading.Thread(target=scrape, args=(values,)) for values in seen]
+    for thread in scrapers:
+        thread.start()
+    for started in range(1, 1000):
+        write_worker_file(metrics_directory, f'metrics-{DEAD_PID}-{started}.json', 1)
+    stop.set()
+    for thread in scrapers:
+        thread.join()
+
+    assert total(metrics.collect()[0]) == 999
+    for values in seen:
+        assert values == sorted(values)
+        assert not values or values[-1] <= 999
+
+
+def test_scrape_waits_for_a_fold_in_progress(metrics_directory, monkeypatch):
+    # Seule la lecture est testée : le repli du scrape lui-même est désactivé
+    monkeypatch.setattr(metrics, '_fold_dead_workers', lambda directory: None)
+    results = []
+    with metrics._DirectoryLock(metrics_directory):
+        scraper = threading.Thread(target=lambda: results.append(metrics.collect()))
+        scraper.start()
+        scraper.join(0.2)
+        assert scraper.is_alive() and not results
+    scraper.join(5)
+    assert results
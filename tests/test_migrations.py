@@ -0,0 +1,61 @@
+"""Migrations versionnées : application, idempotence, verrou, 0005 sans annulation silencieuse"""
+import multiprocessing
+
+import pytest
+import sqlalchemy as sa
+
+from database import migrate
+
+
+def quiet(*args):
+    pass
+
+
+def engine_for(path):
+    return sa.create_engine(f'sqlite:///{path}')
+
+
+def test_upgrade_applies_every_migration_once(tmp_path):
+    engine = engine_for(tmp_path / 'fresh.db')
+    applied = migrate.upgrade(engine, echo=quiet)
+
+    assert applied == [m.version for m in migrate.discover_migrations()]
+    assert migrate.check_schema(engine) == (migrate.head_version(), migrate.head_version())
+    assert migrate.upgrade(engine, echo=quiet) == []
+
+
+def _upgrade_in_process(path, queue):
+    queue.put(migrate.upgrade(engine_for(path), echo=quiet))
+
+
+def test_concurrent_upgrades_apply_each_migration_once(tmp_path):
+    path = str(tmp_path / 'concurrent.db')
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    processes = [context.Process(target=_upgrade_in_process, args=(path, queue)) for _ in range(3)]
+    for process in processes:
+        process.start()
+    results = [queue.get(timeout=60) for _ in processes]
+    for process in processes:
+        process.join(timeout=60)
+
+    assert sorted(results, key=len) == [[], [], [m.version for m in migrate.discover_migrations()]]
+
+
+def test_duplicate_active_bookings_abort_0005_without_changing_them(tmp_path):
+    engine = engine_for(tmp_path / 'duplicates.db')
+    migrate.upgrade(engine, target=4, echo=quiet)
+    with engine.begin() as connection:
+        for statut in ('pending', 'confirmed', 'cancelled'):
+            connection.execute(sa.text(
+                "INSERT INTO rdv_reservations (prenom, nom, email, pays, type_rdv, consultation_type, "
+                "date_rdv, heure_rdv, statut) VALUES ('a', 'b', 'c', 'd', 'e', 'f', '2030-01-01', '10:00', :statut)"
+            ), {'statut': statut})
+
+    with pytest.raises(RuntimeError, match=r'2030-01-01 10:00 : ids 1, 2'):
+        migrate.upgrade(engine, echo=quiet)
+
+    with engine.connect() as connection:
+        assert migrate.current_version(connection) == 4
+        statuses = connection.execute(sa.text('SELECT statut FROM rdv_reservations ORDER BY id')).scalars().all()
+    assert statuses == ['pending', 'confirmed', 'cancelled']
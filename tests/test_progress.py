@@ -0,0 +1,66 @@
+"""Upsert des étapes de progression (POST /progress et /progress/batch)"""
+from database.db import db
+from models.user import UserProgress
+
+
+def stored(user, step='etape-1'):
+    db.session.expire_all()
+    return db.session.query(UserProgress).filter_by(user_id=user.id, category='visa', step=step).one()
+
+
+def test_post_creates_then_updates_the_same_row(logged_client, user):
+    created = logged_client.post('/api/progress', json={'category': 'visa', 'step': 'etape-1'})
+    updated = logged_client.post('/api/progress', json={'category': 'visa', 'step': 'etape-1', 'completed': True})
+
+    assert created.status_code == 201
+    assert updated.status_code == 200
+    assert updated.json['id'] == created.json['id']
+    assert db.session.query(UserProgress).filter_by(user_id=user.id).count() == 1
+
+
+def test_missing_notes_keep_existing_notes(logged_client, user):
+    logged_client.post('/api/progress', json={'category': 'visa', 'step': 'etape-1', 'notes': 'x'})
+    response = logged_client.post('/api/progress', json={'category': 'visa', 'step': 'etape-1', 'completed': True})
+
+    assert response.json['notes'] == 'x'
+    assert stored(user).notes == 'x'
+
+
+def test_explicit_notes_replace_existing_notes(logged_client, user):
+    logged_client.post('/api/progress', json={'category': 'visa', 'step': 'etape-1', 'notes': 'x'})
+    logged_client.post('/api/progress', json={'category': 'visa', 'step': 'etape-1', 'notes': ''})
+
+    assert stored(user).notes == ''
+
+
+def test_new_step_without_notes_stores_empty_notes_in_both_endpoints(logged_client, user):
+    logged_client.post('/api/progress', json={'category': 'visa', 'step': 'etape-1'})
+    logged_client.post('/api/progress/batch', json={'steps': [{'category': 'visa', 'step': 'etape-2'}]})
+
+    assert stored(user, 'etape-1').notes == ''
+    assert stored(user, 'etape-2').notes == ''
+
+
+def test_completed_at_is_kept_until_the_step_is_uncompleted(logged_client, user):
+    first = logged_client.post('/api/progress', json={'category': 'visa', 'step': 'etape-1', 'completed': True})
+    again = logged_client.post('/api/progress', json={'category': 'visa', 'step': 'etape-1', 'completed': True})
+    reopened = logged_client.post('/api/progress', json={'category': 'visa', 'step': 'etape-1', 'completed': False})
+
+    assert first.json['completed_at'] is not None
+    assert again.json['completed_at'] == first.json['completed_at']
+    assert reopened.json['completed_at'] is None
+
+
+def test_batch_mixes_inserts_and_updates(logged_client, user):
+    logged_client.post('/api/progress', json={'category': 'visa', 'step': 'etape-1', 'notes': 'garder'})
+    response = logged_client.post('/api/progress/batch', json={'steps': [
+        {'category': 'visa', 'step': 'etape-1', 'completed': True},
+        {'category': 'visa', 'step': 'etape-2', 'notes': 'nouvelle'},
+        {'category': 'visa', 'step': 'etape-2', 'notes': 'derniere'},
+    ]})
+
+    assert response.status_code == 200
+    steps = {p['step']: p for p in response.json['progress']}
+    assert steps['etape-1']['notes'] == 'garder' and steps['etape-1']['completed'] is True
+    assert steps['etape-2']['notes'] == 'derniere'
+    assert db.session.query(UserProgress).filter_by(user_id=user.id).count() == 2
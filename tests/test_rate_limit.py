@@ -0,0 +1,101 @@
+"""Token buckets (mémoire et SQL), purge des buckets inactifs, IP derrière proxy"""
+import os
+import tempfile
+
+import pytest
+import sqlalchemy as sa
+
+import rate_limit
+from rate_limit import MemoryBackend, RateLimit, SQLBackend, forwarded_client_ip
+
+
+def sqlite_backend():
+    path = os.path.join(tempfile.mkdtemp(prefix='ratelimit-'), 'ratelimit.db')
+    return SQLBackend(lambda: sa.create_engine(f'sqlite:///{path}'), create_table=True)
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def backend(request):
+    return MemoryBackend() if request.param == 'memory' else sqlite_backend()
+
+
+def test_bucket_allows_capacity_then_refuses(backend):
+    results = [backend.consume('login:1.2.3.4', capacity=3, rate=3 / 300)[0] for _ in range(4)]
+
+    assert results == [True, True, True, False]
+    assert backend.peek('login:1.2.3.4', capacity=3, rate=3 / 300) < 1
+    # Les autres clients ont leur propre bucket
+    assert backend.consume('login:5.6.7.8', capacity=3, rate=3 / 300)[0]
+
+
+def test_bucket_refills_over_time(backend, monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(rate_limit.time, 'time', lambda: now[0])
+    for _ in range(2):
+        backend.consume('k', capacity=2, rate=2 / 60)
+    assert not backend.consume('k', capacity=2, rate=2 / 60)[0]
+
+    now[0] += 30
+    assert backend.consume('k', capacity=2, rate=2 / 60)[0]
+    assert not backend.consume('k', capacity=2, rate=2 / 60)[0]
+
+
+def test_reset_empties_the_bucket(backend):
+    for _ in range(3):
+        backend.consume('k', capacity=3, rate=0.01)
+    backend.reset('k')
+    assert backend.peek('k', capacity=3, rate=0.01) == 3
+
+
+def test_prune_deletes_only_idle_buckets(monkeypatch):
+    backend = sqlite_backend()
+    monkeypatch.setattr(rate_limit.time, 'time', lambda: 1_000.0)
+    backend.consume('idle', capacity=5, rate=0.1)
+    monkeypatch.setattr(rate_limit.time, 'time', lambda: 2_000.0)
+    backend.consume('active', capacity=5, rate=0.1)
+
+    backend.prune(older_than=1_500.0)
+
+    with backend.engine.connect() as connection:
+        keys = connection.execute(sa.select(SQLBackend.table.c.key)).scalars().all()
+    assert keys == ['active']
+
+
+def test_rate_limit_hit_returns_retry_after(monkeypatch):
+    monkeypatch.setattr(rate_limit, 'ENABLED', True)
+    monkeypatch.setattr(rate_limit, 'backend', MemoryBackend())
+    limit = RateLimit('test', max_attempts=2, window_seconds=60)
+
+    assert limit.hit('ip') == (False, 0)
+    assert limit.hit('ip') == (False, 0)
+    assert limit.check('ip')[0]
+    is_limited, remaining_time = limit.hit('ip')
+    assert is_limited and 1 <= remaining_time <= 30
+
+    limit.clear('ip')
+    assert limit.check('ip') == (False, 0)
+
+
+def test_rate_limit_fails_open_when_backend_is_down(monkeypatch):
+    class BrokenBackend(MemoryBackend):
+        def consume(self, *args, **kwargs):
+            raise sa.exc.OperationalError('UPSERT', {}, Exception('database is locked'))
+
+    monkeypatch.setattr(rate_limit, 'ENABLED', True)
+    monkeypatch.setattr(rate_limit, 'backend', BrokenBackend())
+    assert RateLimit('test', max_attempts=1, window_seconds=60).hit('ip') == (False, 0)
+
+
+@pytest.mark.parametrize('peer, forwarded_for, hops, expected', [
+    ('10.0.0.1', None, 1, '10.0.0.1'),
+    ('10.0.0.1', '203.0.113.7', 1, '203.0.113.7'),
+    # Entrée falsifiée par le client à gauche : ignorée
+    ('10.0.0.1', '1.1.1.1, 203.0.113.7', 1, '203.0.113.7'),
+    ('10.0.0.1', '1.1.1.1, 203.0.113.7, 10.0.0.2', 2, '203.0.113.7'),
+    # Pas de proxy de confiance : X-Forwarded-For ignoré
+    ('10.0.0.1', '203.0.113.7', 0, '10.0.0.1'),
+    # Moins d'entrées que de proxies annoncés : en-tête incohérent
+    ('10.0.0.1', '203.0.113.7', 2, '10.0.0.1'),
+])
+def test_forwarded_client_ip(peer, forwarded_for, hops, expected):
+    assert forwarded_client_ip(peer, forwarded_for, hops) == expected
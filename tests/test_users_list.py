@@ -0,0 +1,66 @@
+"""Liste admin des utilisateurs paginée par curseur sur users.id"""
+import json
+from datetime import datetime, timedelta
+
+from conftest import unique_number
+from database.db import db
+from models.user import User
+
+
+def add_users(count, active_every=1):
+    """Utilisateurs créés dans une fenêtre created_at propre au test"""
+    n = unique_number()
+    start = datetime(2200, 1, 1) + timedelta(days=n)
+    users = [
+        User(username=f'list{n}_{i}', email=f'list{n}_{i}@example.com', password_hash='x',
+             created_at=start + timedelta(minutes=i), is_active=(i % active_every == 0))
+        for i in range(count)
+    ]
+    db.session.add_all(users)
+    db.session.commit()
+    window = f'created_from={start.isoformat()}&created_to={(start + timedelta(days=1)).isoformat()}'
+    return users, window
+
+
+def admin_client(logged_client, user):
+    user.is_admin = True
+    db.session.commit()
+    return logged_client
+
+
+def test_cursor_pages_return_each_user_once(logged_client, user):
+    client = admin_client(logged_client, user)
+    users, window = add_users(5)
+
+    ids, cursor, pages = [], None, 0
+    while True:
+        url = f'/api/users?limit=2&{window}' + (f'&after_id={cursor}' if cursor else '')
+        response = client.get(url)
+        assert response.status_code == 200
+        ids += [u['id'] for u in response.json['users']]
+        cursor = response.json['next_cursor']
+        pages += 1
+        if cursor is None:
+            break
+
+    assert ids == sorted(u.id for u in users)
+    assert pages == 3
+
+
+def test_filters_apply_across_pages_and_to_the_export(logged_client, user):
+    client = admin_client(logged_client, user)
+    users, window = add_users(6, active_every=2)
+    active_ids = [u.id for u in users if u.is_active]
+
+    first = client.get(f'/api/users?limit=2&is_active=true&{window}').json
+    second = client.get(f'/api/users?limit=2&is_active=true&{window}&after_id={first["next_cursor"]}').json
+    assert [u['id'] for u in first['users'] + second['users']] == active_ids
+    assert second['next_cursor'] is None
+
+    export = client.get(f'/api/users?format=ndjson&is_active=true&{window}')
+    assert [json.loads(line)['id'] for line in export.get_data(as_text=True).splitlines()] == active_ids
+
+
+def test_invalid_filters_are_rejected(logged_client, user):
+    client = admin_client(logged_client, user)
+    assert client.get('/api/users?created_from=demain').status_code == 400